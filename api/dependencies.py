@@ -8,12 +8,16 @@ from typing import Optional
 from fastapi import Depends, Header, HTTPException, Request
 
 from src.config import settings
+from src.services.cache import TTLCache
 from src.services.context_composer import ContextComposer
 from src.services.database_service import DatabaseService
 from src.services.embedding_service import EmbeddingService
+from src.services.filter_planner import FilterPlanner
 from src.services.gemini_service import GeminiService
 from src.services.qdrant_service import QdrantService
 from src.services.queue_service import QueueService
+from src.services.theme_index import ThemeIndex
+from src.services.usage_service import UsageService, reset_usage_scope, set_usage_route
 
 
 def get_db(request: Request) -> DatabaseService:
@@ -40,6 +44,52 @@ def get_composer(request: Request) -> ContextComposer:
     return request.app.state.composer
 
 
+def get_usage(request: Request) -> UsageService:
+    return request.app.state.usage
+
+
+def get_stats_cache(request: Request) -> TTLCache:
+    return request.app.state.stats_cache
+
+
+def get_facets_cache(request: Request) -> TTLCache:
+    return request.app.state.facets_cache
+
+
+def get_query_embedding_cache(request: Request) -> TTLCache:
+    return request.app.state.query_embedding_cache
+
+
+def get_reranker(request: Request):
+    """Reranker do RAG (None quando RERANK_MODE=none)."""
+    return request.app.state.reranker
+
+
+def get_theme_index(request: Request) -> ThemeIndex:
+    return request.app.state.theme_index
+
+
+def get_filter_planner(
+    db: DatabaseService = Depends(get_db),
+    qdrant: QdrantService = Depends(get_qdrant),
+) -> FilterPlanner:
+    """Busca unificada com filtros SQL (sem estado: montado por request)."""
+    return FilterPlanner(db, qdrant)
+
+
+async def track_usage_route(request: Request):
+    """
+    Associa as chamadas Google feitas durante o request ao template da rota
+    (ex: /api/v1/rag/query) para contabilidade de tokens por rota.
+    """
+    route = request.scope.get("route")
+    token = set_usage_route(getattr(route, "path", request.url.path))
+    try:
+        yield
+    finally:
+        reset_usage_scope(token)
+
+
 def verify_api_key(x_api_key: Optional[str] = Header(None)) -> Optional[str]:
     """
     Verifica X-API-Key header.
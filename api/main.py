@@ -5,20 +5,31 @@ Expoe o RAG como servico REST para integracao com MENTOR (React/Node).
 
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routers import rag, search, stats, videos
+from api.dependencies import track_usage_route
+from api.routers import compilations, rag, search, stats, videos
 from src.config import settings
+from src.metrics import HTTP_REQUEST_SECONDS, register_runtime_collector, render_latest
+from src.services.cache import TTLCache
 from src.services.context_composer import ContextComposer
 from src.services.database_service import DatabaseService
+from src.services.db_engine import dispose_engines
 from src.services.embedding_service import EmbeddingService
 from src.services.gemini_service import GeminiService
+from src.services.google_client import close_clients
 from src.services.qdrant_service import QdrantService
 from src.services.queue_service import QueueService
+from src.services.reranker import get_reranker
+from src.services.theme_classifier import load_theme_classifier
+from src.services.theme_index import ThemeIndex
+from src.services.usage_service import UsageService
 from src.services.video_processor import create_processor_callback
+from src.tracing import configure_tracing, extract_request_context, shutdown_tracing, span
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,17 +39,22 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Inicializa e finaliza servicos."""
     logger.info("Starting RAG Microservice...")
+    configure_tracing("rag-api")
 
     # Inicializar servicos
     app.state.db = DatabaseService(settings.postgres_url)
+    app.state.usage = UsageService(settings.postgres_url)
     app.state.gemini = GeminiService(
         api_key=settings.google_api_key,
         model=settings.gemini_model,
+        analysis_mode=settings.gemini_analysis_mode,
+        usage_service=app.state.usage,
     )
     app.state.embedding = EmbeddingService(
         api_key=settings.google_api_key,
         model=settings.embedding_model,
         dimensions=settings.embedding_dimensions,
+        usage_service=app.state.usage,
     )
     app.state.qdrant = QdrantService(
         host=settings.qdrant_host,
@@ -49,6 +65,16 @@ async def lifespan(app: FastAPI):
     app.state.queue = QueueService(settings.postgres_url)
     app.state.queue._ensure_table()
     app.state.composer = ContextComposer()
+    app.state.stats_cache = TTLCache("stats", ttl=settings.stats_cache_ttl)
+    app.state.facets_cache = TTLCache("facets", ttl=settings.facets_cache_ttl)
+    app.state.query_embedding_cache = TTLCache(
+        "query_embedding", ttl=settings.query_embedding_cache_ttl
+    )
+    app.state.reranker = get_reranker()
+    app.state.theme_index = ThemeIndex(app.state.qdrant, app.state.embedding)
+    if not app.state.theme_index.is_built():
+        logger.warning("Indice de temas vazio: rode scripts/build_theme_index.py")
+    register_runtime_collector(app.state.queue)
 
     # Iniciar worker se RUN_WORKER=1
     if os.environ.get("RUN_WORKER", "0") == "1":
@@ -57,6 +83,8 @@ async def lifespan(app: FastAPI):
             gemini_service=app.state.gemini,
             embedding_service=app.state.embedding,
             qdrant_service=app.state.qdrant,
+            theme_index=app.state.theme_index,
+            theme_classifier=load_theme_classifier(settings.theme_classifier_path),
         )
         app.state.queue.start_worker(callback)
         logger.info("Queue worker started")
@@ -68,6 +96,10 @@ async def lifespan(app: FastAPI):
     if app.state.queue.is_worker_running():
         app.state.queue.stop_worker()
         logger.info("Queue worker stopped")
+    app.state.usage.close()
+    close_clients()
+    dispose_engines()
+    shutdown_tracing()
     logger.info("RAG Microservice shutdown complete")
 
 
@@ -76,6 +108,7 @@ app = FastAPI(
     description="REST API for video RAG - MENTOR integration",
     version="1.0.0",
     lifespan=lifespan,
+    dependencies=[Depends(track_usage_route)],
 )
 
 # CORS
@@ -87,13 +120,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Span de servidor (continua traceparent do cliente, se enviado) e
+    histograma de latencia por rota (template, nao a URL com IDs).
+    """
+    start = time.perf_counter()
+    status = 500
+    with span(
+        f"{request.method} {request.url.path}",
+        parent=extract_request_context(request.headers),
+        **{"http.method": request.method},
+    ) as current:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            current.update_name(f"{request.method} {route}")
+            current.set_attribute("http.route", route)
+            current.set_attribute("http.status_code", status)
+            HTTP_REQUEST_SECONDS.labels(
+                method=request.method,
+                route=route,
+                status=str(status),
+            ).observe(time.perf_counter() - start)
+
+
 # Routers
 app.include_router(videos.router, prefix="/api/v1")
 app.include_router(search.router, prefix="/api/v1")
 app.include_router(rag.router, prefix="/api/v1")
 app.include_router(stats.router, prefix="/api/v1")
+app.include_router(compilations.router, prefix="/api/v1")
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Metricas no formato de exposicao Prometheus."""
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
@@ -0,0 +1,82 @@
+"""
+Router de compilados - monta a lista de edicao de um tema.
+"""
+
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.dependencies import (
+    get_db,
+    get_embedding,
+    get_filter_planner,
+    get_qdrant,
+    get_theme_index,
+    verify_api_key,
+)
+from api.schemas.requests import CompilationBuildRequest
+from api.schemas.responses import CompilationResponse, ThemeInfo, ThemeListResponse
+from src.services.compilation_builder import CompilationBuilder
+
+router = APIRouter(
+    prefix="/compilations", tags=["compilations"], dependencies=[Depends(verify_api_key)]
+)
+
+
+@router.post("/build", response_model=CompilationResponse)
+def build_compilation(
+    request: CompilationBuildRequest,
+    embedding_svc=Depends(get_embedding),
+    qdrant=Depends(get_qdrant),
+    db=Depends(get_db),
+    theme_index=Depends(get_theme_index),
+    planner=Depends(get_filter_planner),
+):
+    """
+    Seleciona clips do tema ate a duracao alvo (trim_in/trim_out de cada clip),
+    equilibrando relevancia e diversidade visual (MMR), em ordem de edicao.
+    """
+    filters = None
+    if request.filters:
+        filters = request.filters.model_dump(exclude_none=True)
+
+    builder = CompilationBuilder(db, embedding_svc, qdrant, theme_index, planner)
+    try:
+        plan = builder.build(
+            theme=request.theme,
+            target_duration_seconds=request.target_duration_seconds,
+            filters=filters,
+            query=request.query,
+            lambda_=1.0 - request.diversity,
+            candidates=request.candidates,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return CompilationResponse(**asdict(plan))
+
+
+@router.get("/themes", response_model=ThemeListResponse)
+def list_themes(theme_index=Depends(get_theme_index)):
+    """Temas do indice de centroides com a quantidade de clips de cada um."""
+    themes = theme_index.list_themes()
+    return ThemeListResponse(themes=[ThemeInfo(**asdict(t)) for t in themes])
+
+
+@router.get("/themes/suggest/{video_id}", response_model=ThemeListResponse)
+def suggest_themes(
+    video_id: int,
+    limit: int = Query(default=3, ge=1, le=10),
+    min_score: float = Query(default=0.0, ge=-1.0, le=1.0),
+    qdrant=Depends(get_qdrant),
+    theme_index=Depends(get_theme_index),
+):
+    """Temas mais proximos do clip pelo centroide (sem chamada ao Gemini)."""
+    vector = qdrant.get_unified_vector(video_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="Video not indexed")
+    matches = theme_index.nearest_themes(vector, limit=limit, min_score=min_score)
+    return ThemeListResponse(
+        video_id=video_id,
+        themes=[ThemeInfo(**asdict(m)) for m in matches],
+    )
@@ -4,18 +4,24 @@ Router de RAG - busca + geracao de resposta.
 
 import logging
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 
 from api.dependencies import (
     get_composer,
     get_db,
     get_embedding,
+    get_filter_planner,
     get_gemini,
-    get_qdrant,
+    get_reranker,
     verify_api_key,
 )
 from api.schemas.requests import RAGQueryRequest
 from api.schemas.responses import RAGResponse, RAGSource
+from src.config import settings
+from src.services.context_composer import GROUP_BY_FIELDS
+from src.services.database_service import VideoRAGContext
+from src.services.diversity import diversify
+from src.services.reranker import rerank
 
 logger = logging.getLogger(__name__)
 
@@ -26,28 +32,53 @@ router = APIRouter(prefix="/rag", tags=["rag"], dependencies=[Depends(verify_api
 def rag_query(
     request: RAGQueryRequest,
     embedding_svc=Depends(get_embedding),
-    qdrant=Depends(get_qdrant),
+    planner=Depends(get_filter_planner),
     db=Depends(get_db),
     gemini=Depends(get_gemini),
     composer=Depends(get_composer),
+    reranker=Depends(get_reranker),
 ):
     """
-    Query RAG: busca semantica + geracao de resposta via Gemini.
-    Suporta modo textual e modo com video direto.
+    Query RAG: busca semantica + rerank local + geracao de resposta via Gemini.
+    Suporta modo textual e modo com video direto. Com group_by, os
+    candidatos vem de grupos distintos (ate group_size por grupo) e o
+    prompt recebe so o melhor clip (apos rerank) de cada grupo.
     """
+    if request.group_by and request.diversify:
+        raise HTTPException(status_code=400, detail="group_by and diversify cannot be combined")
+
     # 1. Gerar embedding da query
     query_embedding = embedding_svc.generate(request.query)
 
-    # 2. Buscar na collection unificada
+    # 2. Buscar na collection unificada (conjunto amplo se houver reranker)
     filters = None
     if request.filters:
         filters = request.filters.model_dump(exclude_none=True)
 
-    search_results = qdrant.search_unified(
-        query_embedding=query_embedding,
-        limit=request.limit,
-        filters=filters if filters else None,
-    )
+    candidate_limit = request.limit
+    if reranker is not None:
+        candidate_limit = max(request.limit, settings.rerank_candidates)
+    if request.diversify:
+        candidate_limit = max(candidate_limit, settings.diversity_candidates)
+
+    if request.group_by:
+        groups = planner.search_unified_groups(
+            query_embedding=query_embedding,
+            group_by=GROUP_BY_FIELDS[request.group_by],
+            limit=candidate_limit,
+            group_size=request.group_size,
+            filters=filters if filters else None,
+            query_text=request.query,
+        )
+        search_results = [{**h, "group": g["key"]} for g in groups for h in g["hits"]]
+    else:
+        search_results = planner.search_unified(
+            query_embedding=query_embedding,
+            limit=candidate_limit,
+            filters=filters if filters else None,
+            query_text=request.query,
+            with_vectors=bool(request.diversify),
+        )
 
     if not search_results:
         return RAGResponse(
@@ -57,11 +88,39 @@ def rag_query(
             model_used=gemini.model,
         )
 
-    # 3. Buscar videos completos do DB
+    # 3. Buscar do DB apenas as colunas usadas no contexto RAG
     video_ids = [r["id"] for r in search_results]
-    videos_dict = db.get_videos_by_ids_dict(video_ids)
+    videos_dict = db.get_videos_by_ids_dict(video_ids, projection=VideoRAGContext)
+
+    # 4. Rerank local: so os melhores request.limit vao para o prompt.
+    # Com diversify, o rerank ordena todos e a diversificacao escolhe os request.limit
+    if request.diversify:
+        search_results = rerank(
+            reranker, request.query, search_results, len(search_results), videos=videos_dict
+        )
+        search_results = diversify(
+            search_results,
+            query_embedding,
+            request.limit,
+            method=request.diversify,
+            lambda_=settings.diversity_lambda,
+            relevance_key="rerank_score" if reranker is not None else None,
+        )
+    elif request.group_by:
+        # Rerank de todos os candidatos; o primeiro de cada grupo e o melhor dele
+        ranked = rerank(
+            reranker, request.query, search_results, len(search_results), videos=videos_dict
+        )
+        best_per_group = {}
+        for r in ranked:
+            best_per_group.setdefault(r["group"], r)
+        search_results = list(best_per_group.values())[: request.limit]
+    else:
+        search_results = rerank(
+            reranker, request.query, search_results, request.limit, videos=videos_dict
+        )
 
-    # 4. Montar contexto para RAG
+    # 5. Montar contexto para RAG
     sources = []
     clips_context = []
 
@@ -78,12 +137,14 @@ def rag_query(
                 video_id=video.id,
                 filename=video.filename,
                 score=r["score"],
+                rerank_score=r.get("rerank_score"),
                 category=video.category,
                 emotional_tone=video.emotional_tone,
+                group=r.get("group"),
             )
         )
 
-    # 5. Gerar resposta
+    # 6. Gerar resposta
     if request.include_video_analysis:
         # Modo com video: enviar videos diretamente para Gemini
         video_paths = [
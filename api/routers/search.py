@@ -2,11 +2,27 @@
 Router de busca semantica.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-
-from api.dependencies import get_db, get_embedding, get_qdrant, verify_api_key
-from api.schemas.requests import SearchRequest, SimilarRequest
-from api.schemas.responses import SearchHit, SearchResponse
+import json
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.dependencies import (
+    get_db,
+    get_embedding,
+    get_facets_cache,
+    get_filter_planner,
+    get_qdrant,
+    get_query_embedding_cache,
+    get_theme_index,
+    verify_api_key,
+)
+from api.schemas.requests import FacetRequest, SearchRequest, SimilarRequest
+from api.schemas.responses import FacetResponse, SearchGroup, SearchHit, SearchResponse
+from src.config import settings
+from src.services.context_composer import GROUP_BY_FIELDS
+from src.services.diversity import diversify
+from src.services.facets import FACET_FIELDS, FacetService
 
 router = APIRouter(prefix="/search", tags=["search"], dependencies=[Depends(verify_api_key)])
 
@@ -15,23 +31,70 @@ router = APIRouter(prefix="/search", tags=["search"], dependencies=[Depends(veri
 def search_videos(
     request: SearchRequest,
     embedding_svc=Depends(get_embedding),
-    qdrant=Depends(get_qdrant),
+    planner=Depends(get_filter_planner),
+    embedding_cache=Depends(get_query_embedding_cache),
 ):
-    """Busca semantica na collection unificada com filtros opcionais."""
-    # Gerar embedding da query
-    query_embedding = embedding_svc.generate(request.query)
+    """
+    Busca semantica na collection unificada com filtros opcionais (filtros
+    sem campo no payload, como event_date e tags, sao resolvidos no Postgres).
+    Com group_by, retorna os limit melhores grupos (uploader, evento do
+    Newsflare ou headline) com ate group_size resultados cada.
+    """
+    if request.group_by and request.diversify:
+        raise HTTPException(status_code=400, detail="group_by and diversify cannot be combined")
+
+    # Gerar embedding da query (ou reaproveitar o de /search/facets)
+    query_embedding = _query_embedding(embedding_svc, embedding_cache, request.query)
 
     # Montar filtros
     filters = None
     if request.filters:
         filters = request.filters.model_dump(exclude_none=True)
 
-    # Buscar no Qdrant
-    results = qdrant.search_unified(
+    if request.group_by:
+        groups = planner.search_unified_groups(
+            query_embedding=query_embedding,
+            group_by=GROUP_BY_FIELDS[request.group_by],
+            limit=request.limit,
+            group_size=request.group_size,
+            filters=filters if filters else None,
+            query_text=request.query,
+        )
+        search_groups = [
+            SearchGroup(
+                key=g["key"],
+                results=[_build_search_hit(h["id"], h["score"], h.get("payload", {})) for h in g["hits"]],
+            )
+            for g in groups
+        ]
+        hits = [hit for g in search_groups for hit in g.results]
+        return SearchResponse(
+            query=request.query,
+            total_results=len(hits),
+            results=hits,
+            groups=search_groups,
+        )
+
+    # Buscar no Qdrant (conjunto maior, com vetores, se for diversificar)
+    limit = request.limit
+    if request.diversify:
+        limit = max(request.limit, settings.diversity_candidates)
+
+    results = planner.search_unified(
         query_embedding=query_embedding,
-        limit=request.limit,
+        limit=limit,
         filters=filters if filters else None,
+        query_text=request.query,
+        with_vectors=bool(request.diversify),
     )
+    if request.diversify:
+        results = diversify(
+            results,
+            query_embedding,
+            request.limit,
+            method=request.diversify,
+            lambda_=settings.diversity_lambda,
+        )
 
     hits = []
     for r in results:
@@ -45,6 +108,48 @@ def search_videos(
     )
 
 
+@router.post("/facets", response_model=FacetResponse)
+def search_facets(
+    request: FacetRequest,
+    embedding_svc=Depends(get_embedding),
+    db=Depends(get_db),
+    qdrant=Depends(get_qdrant),
+    planner=Depends(get_filter_planner),
+    cache=Depends(get_facets_cache),
+    embedding_cache=Depends(get_query_embedding_cache),
+):
+    """
+    Contagens por category, camera_type, emotional_tone, compilation_themes...
+    para a query e os filtros atuais. Com query, sobre os top_k resultados;
+    sem query, sobre todos os videos filtrados. Cache por FACETS_CACHE_TTL
+    segundos por combinacao de query + filtros.
+    """
+    fields = request.fields or list(FACET_FIELDS)
+    unknown = sorted(set(fields) - set(FACET_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported facet fields: {unknown}")
+    filters = request.filters.model_dump(exclude_none=True) if request.filters else None
+
+    def _compute() -> FacetResponse:
+        query_embedding = (
+            _query_embedding(embedding_svc, embedding_cache, request.query) if request.query else None
+        )
+        result = FacetService(db, qdrant, planner).compute(
+            fields=tuple(fields),
+            filters=filters,
+            query_embedding=query_embedding,
+            query_text=request.query,
+            top_k=request.top_k,
+            limit=request.limit,
+        )
+        return FacetResponse(query=request.query, **asdict(result))
+
+    signature = json.dumps(
+        request.model_dump(mode="json", exclude_none=True) | {"fields": fields}, sort_keys=True
+    )
+    return cache.get_or_set(signature, _compute)
+
+
 @router.post("/similar/{video_id}", response_model=SearchResponse)
 def find_similar_videos(
     video_id: int,
@@ -71,6 +176,41 @@ def find_similar_videos(
     )
 
 
+@router.get("/themes/{theme}", response_model=SearchResponse)
+def browse_theme(
+    theme: str,
+    limit: int = Query(default=20, ge=1, le=100),
+    tagged_only: bool = Query(default=False, description="So clips marcados com o tema"),
+    qdrant=Depends(get_qdrant),
+    theme_index=Depends(get_theme_index),
+):
+    """
+    Clips mais proximos do centroide do tema (busca vetorial pura, sem
+    embedding da query). Sem tagged_only inclui clips antigos ainda sem temas.
+    """
+    centroid = theme_index.centroid(theme)
+    if centroid is None:
+        raise HTTPException(status_code=404, detail="Theme not indexed")
+
+    results = qdrant.search_unified(
+        query_embedding=centroid,
+        limit=limit,
+        filters={"compilation_theme": theme} if tagged_only else None,
+    )
+    hits = [_build_search_hit(r["id"], r["score"], r.get("payload", {})) for r in results]
+
+    return SearchResponse(
+        query=f"Theme {theme}",
+        total_results=len(hits),
+        results=hits,
+    )
+
+
+def _query_embedding(embedding_svc, cache, query: str) -> list[float]:
+    """Embedding da query, compartilhado por texto entre /search e /search/facets."""
+    return cache.get_or_set(query, lambda: embedding_svc.generate(query))
+
+
 def _build_search_hit(point_id: int, score: float, payload: dict) -> SearchHit:
     """Build SearchHit from Qdrant point data."""
     return SearchHit(
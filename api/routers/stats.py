@@ -2,10 +2,25 @@
 Router de estatisticas.
 """
 
-from fastapi import APIRouter, Depends
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-from api.dependencies import get_db, get_qdrant, get_queue, verify_api_key
-from api.schemas.responses import StatsResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.dependencies import (
+    get_db,
+    get_qdrant,
+    get_queue,
+    get_stats_cache,
+    get_usage,
+    verify_api_key,
+)
+from api.schemas.responses import StatsResponse, UsageStatsResponse
+from src.services.db_engine import pool_stats
+
+# Janela (dias) do resumo de uso embutido no /stats; o historico completo
+# fica em /stats/usage
+STATS_USAGE_DAYS = 1
 
 router = APIRouter(prefix="/stats", tags=["stats"], dependencies=[Depends(verify_api_key)])
 
@@ -15,22 +30,55 @@ def get_stats(
     db=Depends(get_db),
     queue=Depends(get_queue),
     qdrant=Depends(get_qdrant),
+    usage=Depends(get_usage),
+    cache=Depends(get_stats_cache),
+):
+    """
+    Retorna estatisticas completas do sistema.
+    O resultado fica em cache por STATS_CACHE_TTL segundos.
+    """
+
+    def _compute() -> StatsResponse:
+        # Qdrant em paralelo com as consultas ao banco
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            qdrant_future = executor.submit(qdrant.get_collection_stats)
+            db_stats = db.get_stats()
+            queue_stats = queue.get_stats()
+            usage_summary = usage.get_summary(days=STATS_USAGE_DAYS, top_videos=5)
+            qdrant_stats = qdrant_future.result()
+
+        return StatsResponse(
+            videos_total=db_stats["total"],
+            videos_analyzed=db_stats["analyzed"],
+            videos_pending=db_stats["pending"],
+            videos_analyzing=db_stats["analyzing"],
+            videos_failed=db_stats["failed"],
+            videos_with_metadata=db_stats["with_metadata"],
+            videos_with_unified_embedding=db_stats["with_unified_embedding"],
+            queue_pending=queue_stats.pending,
+            queue_processing=queue_stats.processing,
+            queue_completed=queue_stats.completed,
+            queue_failed=queue_stats.failed,
+            qdrant_collections=qdrant_stats,
+            usage=usage_summary,
+            db_pool=pool_stats(),
+        )
+
+    return cache.get_or_set("stats", _compute)
+
+
+@router.get("/usage", response_model=UsageStatsResponse)
+def get_usage_stats(
+    days: Optional[int] = Query(None, ge=1, description="Janela em dias (default: tudo)"),
+    top_videos: int = Query(20, ge=1, le=200),
+    video_id: Optional[int] = Query(None, description="Detalhar consumo de um video"),
+    usage=Depends(get_usage),
 ):
-    """Retorna estatisticas completas do sistema."""
-    db_stats = db.get_stats()
-    queue_stats = queue.get_stats()
-    qdrant_stats = qdrant.get_collection_stats()
-
-    return StatsResponse(
-        videos_total=db_stats["total"],
-        videos_analyzed=db_stats["analyzed"],
-        videos_pending=db_stats["pending"],
-        videos_failed=db_stats["failed"],
-        videos_with_metadata=db.count_with_metadata(),
-        videos_with_unified_embedding=db.count_with_unified_embedding(),
-        queue_pending=queue_stats.pending,
-        queue_processing=queue_stats.processing,
-        queue_completed=queue_stats.completed,
-        queue_failed=queue_stats.failed,
-        qdrant_collections=qdrant_stats,
-    )
+    """Tokens e custo agregados por etapa, modelo, rota e video."""
+    summary = usage.get_summary(days=days, top_videos=top_videos)
+    video_usage = None
+    if video_id is not None:
+        video_usage = usage.get_video_usage(video_id)
+        if not video_usage:
+            raise HTTPException(status_code=404, detail="No usage recorded for video")
+    return UsageStatsResponse(**summary, video_usage=video_usage)
@@ -2,23 +2,30 @@
 Router de videos - ingest, metadata, context.
 """
 
+import base64
+import json
 import logging
 import os
 import shutil
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 
 from api.dependencies import (
     get_composer,
     get_db,
-    get_embedding,
     get_qdrant,
     get_queue,
+    get_theme_index,
     verify_api_key,
 )
-from api.schemas.requests import NewsflareMetadata
+from api.schemas.requests import BulkMetadataRequest, NewsflareMetadata
 from api.schemas.responses import (
+    BulkMetadataConflict,
+    BulkMetadataResponse,
     DeleteResponse,
     IngestResponse,
     MetadataUpdateResponse,
@@ -27,22 +34,90 @@ from api.schemas.responses import (
     VideoSummary,
 )
 from src.config import settings
+from src.services.context_composer import change_impact, payload_changes
+from src.services.database_service import VideoSourceMetadata, VideoSummaryRow
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/videos", tags=["videos"], dependencies=[Depends(verify_api_key)])
 
 
+def _encode_cursor(video: VideoSummaryRow) -> str:
+    raw = json.dumps({"c": video.created_at.isoformat(), "i": video.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """event_date e TIMESTAMP sem fuso: datas com fuso ("...Z") viram UTC sem tzinfo."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _source_metadata(meta: NewsflareMetadata) -> dict:
+    """Colunas de Video preenchidas pela metadata Newsflare/MENTOR."""
+    meta_update = {}
+    if meta.newsflare_id:
+        meta_update["newsflare_id"] = meta.newsflare_id
+    if meta.description:
+        meta_update["source_description"] = meta.description
+    if meta.uploader:
+        meta_update["uploader"] = meta.uploader
+    if meta.filming_date:
+        meta_update["event_date"] = _naive_utc(meta.filming_date)
+    if meta.filming_location:
+        meta_update["filming_location"] = meta.filming_location
+    if meta.is_exclusive is not None:
+        meta_update["is_exclusive"] = meta.is_exclusive
+    if meta.category:
+        meta_update["category"] = meta.category
+    if meta.tags:
+        meta_update["source_tags"] = meta.tags
+    if meta.license_type:
+        meta_update["license_type"] = meta.license_type
+    if meta.extra:
+        meta_update["newsflare_metadata"] = meta.extra
+    meta_update["source"] = "newsflare"
+    return meta_update
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("", response_model=VideoListResponse)
 def list_videos(
-    status: str = None,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    source: Optional[str] = None,
+    compilation_theme: Optional[str] = Query(None, description="Codigo do tema de compilacao"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor da pagina anterior"),
+    include_total: bool = Query(False, description="Calcular total com os filtros (COUNT extra)"),
     db=Depends(get_db),
 ):
-    """Lista todos os videos, opcionalmente filtrados por status."""
-    videos = db.list_videos(status=status)
+    """Lista videos do mais recente ao mais antigo, paginados por cursor."""
+    filters = {
+        "status": status,
+        "category": category,
+        "source": source,
+        "compilation_theme": compilation_theme,
+    }
+    after = _decode_cursor(cursor) if cursor else None
+    videos, has_more = db.list_videos_keyset(limit=limit, after=after, **filters)
+    next_cursor = None
+    if has_more and videos and videos[-1].created_at is not None:
+        next_cursor = _encode_cursor(videos[-1])
     return VideoListResponse(
-        total=len(videos),
+        total=db.count_videos(**filters) if include_total else None,
         videos=[VideoSummary.model_validate(v) for v in videos],
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
     )
 
 
@@ -50,12 +125,14 @@ def list_videos(
 def ingest_video(
     file: UploadFile = File(...),
     metadata: str = Form(default="{}"),
+    auto_themes: bool = Form(default=False),
     db=Depends(get_db),
     queue=Depends(get_queue),
 ):
     """
     Ingesta um video: salva em uploads/, cria registro no DB, enfileira para processamento.
-    Metadata JSON opcional via form field.
+    Metadata JSON opcional via form field. Com auto_themes, o classificador local
+    atribui os temas e pula o prompt de compilation quando esta confiante.
     """
     import json
 
@@ -102,32 +179,10 @@ def ingest_video(
 
     # Aplicar metadata se fornecida
     if meta and meta.newsflare_id:
-        meta_update = {}
-        if meta.newsflare_id:
-            meta_update["newsflare_id"] = meta.newsflare_id
-        if meta.description:
-            meta_update["source_description"] = meta.description
-        if meta.uploader:
-            meta_update["uploader"] = meta.uploader
-        if meta.filming_date:
-            meta_update["event_date"] = meta.filming_date
-        if meta.filming_location:
-            meta_update["filming_location"] = meta.filming_location
-        if meta.is_exclusive is not None:
-            meta_update["is_exclusive"] = meta.is_exclusive
-        if meta.category:
-            meta_update["category"] = meta.category
-        if meta.tags:
-            meta_update["source_tags"] = meta.tags
-        if meta.license_type:
-            meta_update["license_type"] = meta.license_type
-        if meta.extra:
-            meta_update["newsflare_metadata"] = meta.extra
-        meta_update["source"] = "newsflare"
-        db.update_source_metadata(video.id, meta_update)
+        db.update_source_metadata(video.id, _source_metadata(meta))
 
     # Enfileirar para processamento
-    queue_id = queue.enqueue(video.id)
+    queue_id = queue.enqueue(video.id, options={"auto_themes": True} if auto_themes else None)
 
     return IngestResponse(
         video_id=video.id,
@@ -138,77 +193,144 @@ def ingest_video(
     )
 
 
+@router.post("/metadata/bulk", response_model=BulkMetadataResponse)
+def bulk_update_metadata(
+    request: BulkMetadataRequest,
+    db=Depends(get_db),
+    qdrant=Depends(get_qdrant),
+    queue=Depends(get_queue),
+):
+    """
+    Sync em lote de metadata Newsflare/MENTOR (itens por video_id ou newsflare_id).
+
+    Uma consulta resolve os newsflare_id e outra carrega a metadata atual;
+    so as colunas que mudaram vao para um UPDATE em executemany. Para videos
+    analyzed, os campos de payload alterados seguem em lotes de
+    batch_update_points e os re-embeddings sao enfileirados de uma vez
+    (coalescidos por video, como no update unitario).
+
+    newsflare_id e UNIQUE: itens que atribuem a um video o newsflare_id de
+    outro (no banco ou num item anterior do lote) sao ignorados e listados
+    em conflicts, em vez de derrubar o UPDATE do lote inteiro.
+    """
+    start = time.perf_counter()
+    owners = db.get_video_ids_by_newsflare_ids(
+        [item.newsflare_id for item in request.items if item.newsflare_id]
+    )
+    video_ids = {item.video_id for item in request.items if item.video_id is not None}
+    current = db.get_videos_by_ids_dict(
+        list(video_ids | set(owners.values())), projection=VideoSourceMetadata
+    )
+
+    # Itens repetidos do mesmo video: o ultimo valor de cada coluna prevalece
+    updates: dict[int, dict] = {}
+    not_found: list[str] = []
+    conflicts: list[BulkMetadataConflict] = []
+    claimed: dict[str, int] = {}
+    for item in request.items:
+        video_id = item.video_id if item.video_id is not None else owners.get(item.newsflare_id)
+        if video_id not in current:
+            not_found.append(str(item.video_id if item.video_id is not None else item.newsflare_id))
+            continue
+        if item.newsflare_id:
+            owner = claimed.get(item.newsflare_id, owners.get(item.newsflare_id, video_id))
+            if owner != video_id:
+                conflicts.append(
+                    BulkMetadataConflict(
+                        video_id=video_id, newsflare_id=item.newsflare_id, owner_video_id=owner
+                    )
+                )
+                continue
+            claimed[item.newsflare_id] = video_id
+        updates.setdefault(video_id, {}).update(_source_metadata(item))
+
+    changes: dict[int, dict] = {}
+    for video_id, meta_update in updates.items():
+        video = current[video_id]
+        changed = {k: v for k, v in meta_update.items() if getattr(video, k, None) != v}
+        if changed:
+            changes[video_id] = changed
+    db.update_source_metadata_bulk(changes)
+
+    payloads: dict[int, dict] = {}
+    reembed_ids: list[int] = []
+    for video_id, changed in changes.items():
+        video = current[video_id]
+        if video.processing_status != "analyzed" or not video.unified_embedding_id:
+            continue
+        impact = change_impact(changed)
+        if impact.payload:
+            payloads[video_id] = payload_changes(changed, video_id)
+        if impact.reembed:
+            reembed_ids.append(video_id)
+
+    payload_updated = qdrant.update_unified_payloads(payloads) if payloads else 0
+    if reembed_ids:
+        queue.enqueue_reembed_bulk(reembed_ids)
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(
+        f"Sync de metadata: {len(request.items)} itens, {len(changes)} alterados, "
+        f"{len(conflicts)} conflitos de newsflare_id, "
+        f"{payload_updated} payloads, {len(reembed_ids)} re-embeddings ({elapsed_ms}ms)"
+    )
+    return BulkMetadataResponse(
+        received=len(request.items),
+        updated=len(changes),
+        unchanged=len(updates) - len(changes),
+        not_found=not_found,
+        conflicts=conflicts,
+        payload_updated=payload_updated,
+        reembed_queued=len(reembed_ids),
+        elapsed_ms=elapsed_ms,
+    )
+
+
 @router.post("/{video_id}/metadata", response_model=MetadataUpdateResponse)
 def update_metadata(
     video_id: int,
     metadata: NewsflareMetadata,
     db=Depends(get_db),
     composer=Depends(get_composer),
-    embedding_svc=Depends(get_embedding),
     qdrant=Depends(get_qdrant),
+    queue=Depends(get_queue),
 ):
     """
-    Atualiza metadata de fonte de um video.
-    Se video ja esta analyzed, re-gera unified embedding.
+    Atualiza metadata de fonte de um video. Se o video ja esta analyzed:
+    campos do payload (ex: is_exclusive) vao para o Qdrant via set_payload e
+    campos do texto do embedding (ex: description) agendam um re-embedding
+    em background, coalescido por video. Campos que nao afetam a busca
+    (ex: license_type) so vao para o banco.
     """
     video = db.get_video(video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Montar update dict
-    meta_update = {}
-    if metadata.newsflare_id:
-        meta_update["newsflare_id"] = metadata.newsflare_id
-    if metadata.description:
-        meta_update["source_description"] = metadata.description
-    if metadata.uploader:
-        meta_update["uploader"] = metadata.uploader
-    if metadata.filming_date:
-        meta_update["event_date"] = metadata.filming_date
-    if metadata.filming_location:
-        meta_update["filming_location"] = metadata.filming_location
-    if metadata.is_exclusive is not None:
-        meta_update["is_exclusive"] = metadata.is_exclusive
-    if metadata.category:
-        meta_update["category"] = metadata.category
-    if metadata.tags:
-        meta_update["source_tags"] = metadata.tags
-    if metadata.license_type:
-        meta_update["license_type"] = metadata.license_type
-    if metadata.extra:
-        meta_update["newsflare_metadata"] = metadata.extra
-    meta_update["source"] = "newsflare"
+    meta_update = _source_metadata(metadata)
+    changed = {key for key, value in meta_update.items() if getattr(video, key, None) != value}
+    updated_video = db.update_source_metadata(video_id, meta_update)
 
-    db.update_source_metadata(video_id, meta_update)
-
-    # Re-gerar unified embedding se video ja foi analisado
-    regenerated = False
-    if video.processing_status == "analyzed":
-        try:
-            updated_video = db.get_video(video_id)
-            composed_text = composer.compose_embedding_text(updated_video)
-            if composed_text:
-                unified_emb = embedding_svc.generate_unified(composed_text)
-                payload = {
-                    "video_id": video_id,
-                    "filename": updated_video.filename,
-                    "category": updated_video.category,
-                    "emotional_tone": updated_video.emotional_tone,
-                    "intensity": updated_video.intensity,
-                    "viral_potential": updated_video.viral_potential,
-                    "is_exclusive": updated_video.is_exclusive or False,
-                    "source": updated_video.source or "local",
-                }
-                emb_id = qdrant.index_unified(video_id, unified_emb, payload)
-                db.update_unified_embedding(video_id, emb_id)
-                regenerated = True
-        except Exception as e:
-            logger.warning(f"Failed to regenerate unified embedding for video {video_id}: {e}")
+    payload_updated = False
+    reembed_queued = False
+    if video.processing_status == "analyzed" and changed:
+        impact = change_impact(changed)
+        if impact.payload:
+            try:
+                qdrant.update_unified_payload(
+                    video_id, composer.compose_unified_payload(updated_video)
+                )
+                payload_updated = True
+            except Exception as e:
+                logger.warning(f"Failed to update Qdrant payload for video {video_id}: {e}")
+        if impact.reembed:
+            queue.enqueue_reembed(video_id)
+            reembed_queued = True
 
     return MetadataUpdateResponse(
         video_id=video_id,
         updated=True,
-        unified_embedding_regenerated=regenerated,
+        payload_updated=payload_updated,
+        reembed_queued=reembed_queued,
         message="Metadata updated successfully",
     )
 
@@ -230,6 +352,7 @@ def delete_video(
     video_id: int,
     db=Depends(get_db),
     qdrant=Depends(get_qdrant),
+    theme_index=Depends(get_theme_index),
 ):
     """Remove video do sistema: DB, Qdrant e arquivo em disco."""
     video = db.get_video(video_id)
@@ -238,7 +361,11 @@ def delete_video(
 
     filename = video.filename
 
-    # Remove do Qdrant (todas as collections)
+    # Remove do Qdrant (todas as collections), descontando dos centroides de tema
+    try:
+        theme_index.remove_clip(video_id)
+    except Exception as e:
+        logger.warning(f"Failed to update theme centroids for video {video_id}: {e}")
     qdrant.delete(video_id)
 
     # Remove arquivo do disco
@@ -24,6 +24,18 @@ class NewsflareMetadata(BaseModel):
     extra: Optional[dict] = None
 
 
+class BulkMetadataItem(NewsflareMetadata):
+    """Metadata de um video no sync em lote: chave video_id ou newsflare_id."""
+
+    video_id: Optional[int] = None
+
+
+class BulkMetadataRequest(BaseModel):
+    """Sync em lote de metadata Newsflare/MENTOR."""
+
+    items: list[BulkMetadataItem] = Field(..., min_length=1, max_length=10_000)
+
+
 class SearchFilters(BaseModel):
     """Filtros para busca vetorial."""
 
@@ -44,6 +56,13 @@ class SearchFilters(BaseModel):
     visual_quality_score_min: Optional[float] = Field(None, ge=0.0, le=10.0)
     visual_quality_score_max: Optional[float] = Field(None, ge=0.0, le=10.0)
     location_environment: Optional[str] = None
+    # Resolvidos no Postgres (FilterPlanner): sem campo no payload do Qdrant
+    event_date_from: Optional[datetime] = None
+    event_date_to: Optional[datetime] = None
+    uploader: Optional[str] = None
+    visual_tags: Optional[list[str]] = Field(None, description="Contem todas estas tags visuais")
+    objects_detected: Optional[list[str]] = Field(None, description="Contem todos estes objetos")
+    narrative_tags: Optional[list[str]] = Field(None, description="Contem todas estas tags narrativas")
 
 
 class SearchRequest(BaseModel):
@@ -51,7 +70,26 @@ class SearchRequest(BaseModel):
 
     query: str = Field(..., min_length=1, description="Texto da busca")
     filters: Optional[SearchFilters] = None
-    limit: int = Field(default=10, ge=1, le=100)
+    limit: int = Field(default=10, ge=1, le=100, description="Resultados (grupos, com group_by)")
+    diversify: Optional[str] = Field(
+        None, pattern="^(mmr|dpp)$", description="Diversifica os resultados (mmr ou dpp)"
+    )
+    group_by: Optional[str] = Field(
+        None,
+        pattern="^(uploader|newsflare_event|event)$",
+        description="Agrupa os resultados (uploader, newsflare_event ou event)",
+    )
+    group_size: int = Field(default=1, ge=1, le=10, description="Resultados por grupo")
+
+
+class FacetRequest(BaseModel):
+    """Request de contagens por valor (facets) para a busca atual."""
+
+    query: Optional[str] = Field(None, description="Sem query, conta sobre todos os videos filtrados")
+    filters: Optional[SearchFilters] = None
+    fields: Optional[list[str]] = Field(None, description="Campos (padrao: todos os suportados)")
+    limit: int = Field(default=20, ge=1, le=100, description="Valores por campo")
+    top_k: int = Field(default=200, ge=1, le=1000, description="Resultados da query considerados")
 
 
 class RAGQueryRequest(BaseModel):
@@ -60,6 +98,15 @@ class RAGQueryRequest(BaseModel):
     query: str = Field(..., min_length=1, description="Pergunta do usuario")
     filters: Optional[SearchFilters] = None
     limit: int = Field(default=5, ge=1, le=20)
+    diversify: Optional[str] = Field(
+        None, pattern="^(mmr|dpp)$", description="Diversifica os clips enviados ao Gemini"
+    )
+    group_by: Optional[str] = Field(
+        None,
+        pattern="^(uploader|newsflare_event|event)$",
+        description="Candidatos agrupados (uploader, newsflare_event ou event)",
+    )
+    group_size: int = Field(default=1, ge=1, le=5, description="Candidatos por grupo")
     include_video_analysis: bool = Field(
         default=False, description="Se True, envia videos para Gemini analisar diretamente"
     )
@@ -70,3 +117,16 @@ class SimilarRequest(BaseModel):
     """Request de busca por videos similares."""
 
     limit: int = Field(default=10, ge=1, le=50)
+
+
+class CompilationBuildRequest(BaseModel):
+    """Request de montagem de compilado por tema."""
+
+    theme: str = Field(..., description="Codigo do tema (COMPILATION_THEMES)")
+    target_duration_seconds: float = Field(..., gt=0, le=3600, description="Duracao alvo")
+    query: Optional[str] = Field(None, description="Texto livre somado a descricao do tema")
+    filters: Optional[SearchFilters] = None
+    diversity: float = Field(
+        default=0.3, ge=0.0, le=1.0, description="0 = so relevancia, 1 = so diversidade"
+    )
+    candidates: int = Field(default=300, ge=1, le=1000)
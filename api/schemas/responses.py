@@ -96,10 +96,13 @@ class VideoSummary(BaseModel):
 
 
 class VideoListResponse(BaseModel):
-    """Resposta de listagem de videos."""
+    """Resposta de listagem de videos (paginada por cursor)."""
 
-    total: int
+    # Total com os filtros aplicados; so calculado com include_total=true
+    total: Optional[int] = None
     videos: list[VideoSummary] = Field(default_factory=list)
+    next_cursor: Optional[str] = None
+    has_more: bool = False
 
 
 class SearchHit(BaseModel):
@@ -107,6 +110,8 @@ class SearchHit(BaseModel):
 
     id: int
     filename: Optional[str] = None
+    # Cosseno (busca densa) ou RRF (hibrida, por posicao): so comparavel
+    # dentro da mesma resposta
     score: float
     category: Optional[str] = None
     emotional_tone: Optional[str] = None
@@ -122,12 +127,38 @@ class SearchHit(BaseModel):
     compilation_themes: Optional[list] = None
 
 
+class SearchGroup(BaseModel):
+    """Resultados de um grupo (busca com group_by)."""
+
+    # Valor do campo de agrupamento ("video:<id>" para video sem o campo)
+    key: str
+    results: list[SearchHit] = Field(default_factory=list)
+
+
 class SearchResponse(BaseModel):
     """Resposta de busca semantica."""
 
     query: str
     total_results: int
     results: list[SearchHit] = Field(default_factory=list)
+    # So com group_by; results traz os mesmos hits em sequencia
+    groups: Optional[list[SearchGroup]] = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class FacetResponse(BaseModel):
+    """Contagens por valor de cada campo para a query/filtros."""
+
+    query: Optional[str] = None
+    # Videos considerados: filtrados (sem query) ou resultados da query
+    total: int
+    # query | qdrant | postgres
+    backend: str
+    facets: dict[str, list[FacetCount]]
 
 
 class RAGSource(BaseModel):
@@ -135,9 +166,14 @@ class RAGSource(BaseModel):
 
     video_id: int
     filename: Optional[str] = None
+    # Score da busca (cosseno ou RRF, ver SearchHit.score)
     score: float
+    # Score apos o rerank (None sem reranker)
+    rerank_score: Optional[float] = None
     category: Optional[str] = None
     emotional_tone: Optional[str] = None
+    # Grupo do clip (so com group_by)
+    group: Optional[str] = None
 
 
 class RAGResponse(BaseModel):
@@ -155,6 +191,7 @@ class StatsResponse(BaseModel):
     videos_total: int = 0
     videos_analyzed: int = 0
     videos_pending: int = 0
+    videos_analyzing: int = 0
     videos_failed: int = 0
     videos_with_metadata: int = 0
     videos_with_unified_embedding: int = 0
@@ -163,6 +200,37 @@ class StatsResponse(BaseModel):
     queue_completed: int = 0
     queue_failed: int = 0
     qdrant_collections: Optional[dict] = None
+    usage: Optional[dict] = None
+    db_pool: Optional[dict] = None
+
+
+class UsageBreakdown(BaseModel):
+    """Consumo agregado de chamadas Google."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cost_usd: float = 0.0
+    avg_latency_ms: float = 0.0
+
+
+class VideoUsage(UsageBreakdown):
+    """Consumo agregado de um video."""
+
+    video_id: int
+
+
+class UsageStatsResponse(BaseModel):
+    """Tokens e custo por etapa, modelo, rota e video."""
+
+    window_days: Optional[int] = None
+    totals: UsageBreakdown
+    by_stage: dict[str, UsageBreakdown] = Field(default_factory=dict)
+    by_model: dict[str, UsageBreakdown] = Field(default_factory=dict)
+    by_route: dict[str, UsageBreakdown] = Field(default_factory=dict)
+    top_videos: list[VideoUsage] = Field(default_factory=list)
+    video_usage: Optional[dict[str, dict]] = None
 
 
 class IngestResponse(BaseModel):
@@ -180,13 +248,86 @@ class MetadataUpdateResponse(BaseModel):
 
     video_id: int
     updated: bool
+    # Sempre False: o embedding e regenerado em background (reembed_queued)
     unified_embedding_regenerated: bool = False
+    payload_updated: bool = False
+    reembed_queued: bool = False
     message: str
 
 
+class BulkMetadataConflict(BaseModel):
+    """Item ignorado: o newsflare_id ja pertence a outro video."""
+
+    video_id: int
+    newsflare_id: str
+    owner_video_id: int
+
+
+class BulkMetadataResponse(BaseModel):
+    """Resultado do sync de metadata em lote."""
+
+    received: int
+    updated: int
+    unchanged: int
+    # Itens sem video correspondente (video_id ou newsflare_id informado)
+    not_found: list[str] = []
+    # Itens com newsflare_id de outro video (UNIQUE); nada deles foi gravado
+    conflicts: list[BulkMetadataConflict] = []
+    payload_updated: int = 0
+    reembed_queued: int = 0
+    elapsed_ms: float
+
+
 class DeleteResponse(BaseModel):
     """Resposta de delecao de video."""
 
     video_id: int
     deleted: bool
     message: str
+
+
+class CompilationClipResponse(BaseModel):
+    """Corte da lista de edicao."""
+
+    order: int
+    video_id: int
+    filename: str
+    file_path: Optional[str] = None
+    trim_in_ms: int
+    trim_out_ms: int
+    duration_ms: int
+    money_shot_ms: Optional[int] = None
+    relevance: float
+    event_headline: Optional[str] = None
+    narration_suggestion: Optional[str] = None
+    emotional_tone: Optional[str] = None
+    camera_type: Optional[str] = None
+    audio_usability: Optional[str] = None
+
+
+class CompilationResponse(BaseModel):
+    """Lista de edicao de um compilado."""
+
+    theme: str
+    theme_description: str
+    target_duration_ms: int
+    total_duration_ms: int
+    candidates_considered: int
+    clips: list[CompilationClipResponse]
+    elapsed_ms: float
+
+
+class ThemeInfo(BaseModel):
+    """Tema de compilado com a contagem de clips no centroide."""
+
+    theme: str
+    description: str
+    clip_count: int
+    score: Optional[float] = None
+
+
+class ThemeListResponse(BaseModel):
+    """Temas do indice de centroides (lista ou sugestoes para um video)."""
+
+    video_id: Optional[int] = None
+    themes: list[ThemeInfo]
@@ -31,7 +31,9 @@ def init_queue_worker():
     from src.services.gemini_service import GeminiService
     from src.services.qdrant_service import QdrantService
     from src.services.queue_service import QueueService
+    from src.services.usage_service import UsageService
     from src.services.video_processor import create_processor_callback
+    from src.tracing import configure_tracing
 
     # Verificar se API key esta configurada
     if not settings.google_api_key:
@@ -41,15 +43,22 @@ def init_queue_worker():
         return None
 
     try:
+        configure_tracing("streamlit-worker")
+
         # Inicializar servicos
         db_service = DatabaseService(settings.postgres_url)
+        usage_service = UsageService(settings.postgres_url)
         gemini_service = GeminiService(
-            settings.google_api_key, settings.gemini_model
+            settings.google_api_key,
+            settings.gemini_model,
+            settings.gemini_analysis_mode,
+            usage_service,
         )
         embedding_service = EmbeddingService(
             settings.google_api_key,
             settings.embedding_model,
             settings.embedding_dimensions,
+            usage_service,
         )
         qdrant_service = QdrantService(
             settings.qdrant_host,
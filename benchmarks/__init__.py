@@ -0,0 +1,5 @@
+"""
+Benchmarks de busca e ingest com servicos externos simulados.
+
+Ver benchmarks/run.py.
+"""
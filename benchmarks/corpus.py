@@ -0,0 +1,202 @@
+"""
+Corpus sintetico de videos analisados para os benchmarks.
+
+Os campos sao sorteados de um vocabulario fixo com seed, entao o mesmo
+tamanho gera sempre o mesmo corpus. Os vetores vem do mesmo HashingEmbedder
+usado pelo cliente Gemini falso: queries com palavras do corpus encontram
+os clips que as contem, como numa busca real.
+"""
+
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterator
+
+from qdrant_client.models import PointStruct
+from sqlalchemy import insert
+
+from src.compilation_themes import COMPILATION_THEMES
+from src.models import Video
+from src.services.context_composer import ContextComposer
+from src.services.database_service import DatabaseService
+from src.services.qdrant_service import QdrantService
+
+if TYPE_CHECKING:
+    from benchmarks.fakes import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["animals", "weather", "accidents", "sports", "rescue", "nature", "funny"]
+TONES = ["tenso", "engracado", "emocionante", "assustador", "inspirador", "calmo"]
+CAMERA_TYPES = ["cctv", "dashcam", "cellphone", "drone", "bodycam", "gopro", "professional"]
+ENVIRONMENTS = ["urban", "rural", "highway", "forest", "ocean", "indoor", "mountain", "river"]
+COUNTRIES = ["Brasil", "EUA", "Australia", "India", "Japao", "Canada", "Africa do Sul"]
+SUBJECTS = [
+    "urso", "cachorro", "gato", "tubarao", "baleia", "cavalo", "carro", "caminhao",
+    "moto", "onibus", "barco", "aviao", "policial", "bombeiro", "crianca", "skatista",
+    "surfista", "tornado", "raio", "enchente", "avalanche", "incendio", "granizo", "onda",
+]
+ACTIONS = [
+    "atravessa", "invade", "resgata", "persegue", "derrapa", "salta", "colide",
+    "escapa", "ataca", "destroi", "surpreende", "brinca", "foge", "cai",
+]
+PLACES = [
+    "rodovia", "supermercado", "praia", "quintal", "estacionamento", "ponte",
+    "floresta", "estadio", "cozinha", "rio", "montanha", "avenida", "fazenda",
+]
+THEME_CODES = sorted(COMPILATION_THEMES)
+
+DEFAULT_SEED = 42
+
+
+def synthetic_analysis(rng: random.Random) -> dict:
+    """
+    Analise FULL sorteada (formato das respostas Gemini).
+
+    As secoes visual/narrative/compilation tambem sao repetidas no nivel raiz,
+    para que o mesmo JSON sirva a qualquer prompt de analise.
+    """
+    subject, action, place = rng.choice(SUBJECTS), rng.choice(ACTIONS), rng.choice(PLACES)
+    duration_ms = rng.randint(5_000, 90_000)
+    trim_in = rng.randint(0, duration_ms // 4)
+    trim_out = rng.randint(trim_in + 1_000, duration_ms)
+    visual = {
+        "visual_description": f"{subject} {action} na {place}, filmado de perto",
+        "visual_tags": [subject, place, rng.choice(SUBJECTS)],
+        "objects_detected": [subject, rng.choice(SUBJECTS)],
+        "scenes": [{"start": 0, "end": duration_ms // 1000, "description": place}],
+        "visual_style": rng.choice(CAMERA_TYPES),
+        "color_palette": ["cinza", "verde"],
+        "movement_intensity": round(rng.uniform(0, 10), 1),
+        "duration_estimate": duration_ms / 1000,
+    }
+    narrative = {
+        "narrative_description": f"Momento em que {subject} {action} na {place}",
+        "narrative_tags": [action, subject, rng.choice(ACTIONS)],
+        "emotional_tone": rng.choice(TONES),
+        "themes": {rng.choice(CATEGORIES): round(rng.uniform(0, 10), 1)},
+        "storytelling_elements": {"climax": f"{subject} {action}"},
+        "target_audience": "geral",
+        "viral_potential": round(rng.uniform(0, 10), 1),
+        "intensity": round(rng.uniform(0, 10), 1),
+        "key_moments": [{"timestamp": trim_in / 1000, "description": action}],
+    }
+    compilation = {
+        "event_headline": f"{subject.capitalize()} {action} na {place}",
+        "trim_in_ms": trim_in,
+        "trim_out_ms": trim_out,
+        "money_shot_ms": rng.randint(trim_in, trim_out),
+        "camera_type": rng.choice(CAMERA_TYPES),
+        "audio_usability": rng.choice(["usable", "replace", "silent", "mixed"]),
+        "audio_usability_reason": "",
+        "compilation_themes": rng.sample(THEME_CODES, rng.randint(1, 3)),
+        "narration_suggestion": f"Olha so esse {subject}",
+        "location_country": rng.choice(COUNTRIES),
+        "location_environment": rng.choice(ENVIRONMENTS),
+        "standalone_score": round(rng.uniform(0, 10), 1),
+        "visual_quality_score": round(rng.uniform(0, 10), 1),
+    }
+    return {
+        "visual": visual,
+        "narrative": narrative,
+        "compilation": compilation,
+        **visual,
+        **narrative,
+        **compilation,
+    }
+
+
+def synthetic_video_row(video_id: int, rng: random.Random) -> dict:
+    """Colunas de um Video ja analisado (status analyzed, com unified_embedding_id)."""
+    analysis = synthetic_analysis(rng)
+    created_at = datetime(2025, 1, 1) + timedelta(minutes=video_id)
+    return {
+        "id": video_id,
+        "filename": f"clip_{video_id:07d}.mp4",
+        "file_path": f"/videos/clip_{video_id:07d}.mp4",
+        "file_size_bytes": rng.randint(1_000_000, 80_000_000),
+        "duration_seconds": analysis["duration_estimate"],
+        "mime_type": "video/mp4",
+        "processing_status": "analyzed",
+        "category": rng.choice(CATEGORIES),
+        "source": rng.choice(["local", "newsflare"]),
+        "is_exclusive": rng.random() < 0.2,
+        **{
+            column: analysis[column]
+            for column in (
+                "visual_description", "visual_tags", "objects_detected", "scenes",
+                "visual_style", "color_palette", "movement_intensity",
+                "narrative_description", "narrative_tags", "emotional_tone", "themes",
+                "storytelling_elements", "target_audience", "viral_potential",
+                "intensity", "key_moments", "event_headline", "trim_in_ms",
+                "trim_out_ms", "money_shot_ms", "camera_type", "audio_usability",
+                "compilation_themes", "narration_suggestion", "location_country",
+                "location_environment", "standalone_score", "visual_quality_score",
+            )
+        },
+        "unified_embedding_id": str(video_id),
+        "created_at": created_at,
+        "updated_at": created_at,
+        "analyzed_at": created_at,
+    }
+
+
+def iter_batches(size: int, batch_size: int, seed: int = DEFAULT_SEED) -> Iterator[list[dict]]:
+    """Linhas de video 1..size em lotes (geradas sob demanda, sem manter o corpus em memoria)."""
+    rng = random.Random(seed)
+    batch = []
+    for video_id in range(1, size + 1):
+        batch.append(synthetic_video_row(video_id, rng))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_corpus(
+    db: DatabaseService,
+    qdrant: QdrantService,
+    embedder: "HashingEmbedder",
+    size: int,
+    batch_size: int = 1000,
+    seed: int = DEFAULT_SEED,
+) -> None:
+    """
+    Insere size videos no banco e os vetores unificados no Qdrant.
+
+    O texto embedado (e o indexado no BM25, se a collection for hibrida) e o
+    mesmo que o ContextComposer gera em producao.
+    """
+    composer = ContextComposer()
+    loaded = 0
+    for batch in iter_batches(size, batch_size, seed):
+        with db.SessionLocal() as session:
+            session.execute(insert(Video), batch)
+            session.commit()
+
+        points = []
+        for row in batch:
+            video = Video(**row)
+            vector = embedder.embed(composer.compose_embedding_text(video))
+            points.append(
+                PointStruct(
+                    id=row["id"],
+                    vector=qdrant.unified_vectors(vector, composer.compose_lexical_text(video)),
+                    payload=composer.compose_unified_payload(video),
+                )
+            )
+        qdrant.client.upsert(collection_name=qdrant.unified_collection, points=points)
+
+        loaded += len(batch)
+        if loaded % (batch_size * 50) == 0 or loaded == size:
+            logger.info(f"Corpus: {loaded}/{size} videos carregados")
+
+
+def synthetic_queries(count: int, seed: int = DEFAULT_SEED) -> list[str]:
+    """Queries em linguagem natural com o vocabulario do corpus."""
+    rng = random.Random(seed + 1)
+    return [
+        f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(PLACES)}"
+        for _ in range(count)
+    ]
@@ -0,0 +1,265 @@
+"""
+Servicos externos simulados para os benchmarks.
+
+- HashingEmbedder: vetores deterministicos (soma de vetores por palavra),
+  textos com palavras em comum ficam proximos no espaco cosseno.
+- FakeGenAIClient: substitui o genai.Client (models.embed_content,
+  models.generate_content, files.upload/get/delete) com latencia configuravel.
+  E registrado no google_client, entao GeminiService e EmbeddingService
+  rodam sem alteracoes, passando pelo rate limiter e pelas metricas.
+- InMemoryQueue: fila com a interface do QueueService, para quando nao ha
+  PostgreSQL disponivel.
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_analysis
+from src.services import google_client
+from src.services.queue_service import (
+    OPTION_REEMBED,
+    OPTION_REQUEUE,
+    PRIORITY_REEMBED,
+    QueueStats,
+    QueueTask,
+)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Embedding deterministico por feature hashing de palavras."""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self._token_vector = lru_cache(maxsize=65536)(self._compute_token_vector)
+
+    def _compute_token_vector(self, token: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+        return np.random.default_rng(seed).standard_normal(self.dimensions, dtype=np.float32)
+
+    def embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            vector += self._token_vector(token)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            vector[0] = 1.0
+            norm = 1.0
+        return (vector / norm).tolist()
+
+
+class FakeLatency:
+    """Latencia simulada por endpoint, com jitter deterministico."""
+
+    def __init__(
+        self,
+        embed_ms: float = 0.0,
+        generate_ms: float = 0.0,
+        upload_ms: float = 0.0,
+        jitter: float = 0.1,
+        seed: int = 0,
+    ):
+        self.embed_ms = embed_ms
+        self.generate_ms = generate_ms
+        self.upload_ms = upload_ms
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, base_ms: float) -> None:
+        if base_ms <= 0:
+            return
+        with self._lock:
+            factor = 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(base_ms * factor / 1000)
+
+
+class _FakeModels:
+    def __init__(self, embedder: HashingEmbedder, latency: FakeLatency, seed: int):
+        self.embedder = embedder
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def embed_content(self, model: str, contents, config=None):
+        self.latency.sleep(self.latency.embed_ms)
+        values = self.embedder.embed(contents if isinstance(contents, str) else str(contents))
+        return SimpleNamespace(
+            embeddings=[SimpleNamespace(values=values, statistics=None)],
+            metadata=None,
+        )
+
+    def generate_content(self, model: str, contents, config=None):
+        self.latency.sleep(self.latency.generate_ms)
+        if isinstance(contents, str):
+            # RAG textual: prompt unico com o contexto dos clips
+            text = f"Resposta simulada ({len(contents)} caracteres de contexto)."
+        else:
+            # Prompts de analise recebem o video como Part
+            with self._lock:
+                analysis = synthetic_analysis(self._rng)
+            text = json.dumps(analysis, ensure_ascii=False)
+        return SimpleNamespace(text=text, usage_metadata=None)
+
+
+class _FakeFiles:
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self._counter = itertools.count(1)
+
+    def _handle(self, name: str):
+        return SimpleNamespace(
+            name=name,
+            uri=f"https://fake.invalid/{name}",
+            mime_type="video/mp4",
+            state="ACTIVE",
+        )
+
+    def upload(self, file, config=None):
+        self.latency.sleep(self.latency.upload_ms)
+        return self._handle(f"files/bench-{next(self._counter)}")
+
+    def get(self, name: str):
+        return self._handle(name)
+
+    def delete(self, name: str) -> None:
+        pass
+
+
+class FakeGenAIClient:
+    """Substituto do genai.Client com as chamadas usadas pelo pipeline."""
+
+    def __init__(self, embedder: HashingEmbedder, latency: Optional[FakeLatency] = None, seed: int = 0):
+        latency = latency or FakeLatency()
+        self.models = _FakeModels(embedder, latency, seed)
+        self.files = _FakeFiles(latency)
+
+
+def install_fake_client(api_key: str, client: FakeGenAIClient) -> None:
+    """
+    Registra o cliente falso para api_key em todas as API versions, no
+    lugar do genai.Client que get_genai_client criaria.
+    """
+    with google_client._lock:
+        for version in google_client.version_selector.versions:
+            google_client._clients[(api_key, version)] = client
+
+
+class InMemoryQueue:
+    """
+    Fila por prioridade em memoria (enqueue, enqueue_reembed[_bulk],
+    claim_next, complete, fail, get_stats) com a mesma semantica do QueueService.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._heap: list[tuple[int, int]] = []
+        self._tasks: dict[int, QueueTask] = {}
+        self._by_video: dict[int, int] = {}
+
+    def enqueue(
+        self, video_id: int, priority: int = 0, options: Optional[dict] = None
+    ) -> Optional[int]:
+        with self._lock:
+            if video_id in self._by_video:
+                return None
+            queue_id = next(self._ids)
+            self._tasks[queue_id] = QueueTask(
+                id=queue_id,
+                video_id=video_id,
+                status="pending",
+                priority=priority,
+                attempts=0,
+                max_attempts=3,
+                error_message=None,
+                created_at=datetime.utcnow(),
+                options=options or {},
+            )
+            self._by_video[video_id] = queue_id
+            heapq.heappush(self._heap, (-priority, queue_id))
+            return queue_id
+
+    def enqueue_reembed(self, video_id: int) -> bool:
+        with self._lock:
+            queue_id = self._by_video.get(video_id)
+            task = self._tasks.get(queue_id)
+            if task is None:
+                queue_id = next(self._ids)
+                self._by_video[video_id] = queue_id
+            elif task.status == "pending":
+                return False
+            elif task.status == "processing":
+                task.options = {**task.options, OPTION_REQUEUE: True}
+                return False
+            self._tasks[queue_id] = QueueTask(
+                id=queue_id,
+                video_id=video_id,
+                status="pending",
+                priority=PRIORITY_REEMBED,
+                attempts=0,
+                max_attempts=3,
+                error_message=None,
+                created_at=datetime.utcnow(),
+                options={OPTION_REEMBED: True},
+            )
+            heapq.heappush(self._heap, (-PRIORITY_REEMBED, queue_id))
+            return True
+
+    def enqueue_reembed_bulk(self, video_ids: list[int]) -> int:
+        return sum(self.enqueue_reembed(video_id) for video_id in set(video_ids))
+
+    def claim_next(self, lock_timeout_minutes: int = 10) -> Optional[QueueTask]:
+        with self._lock:
+            if not self._heap:
+                return None
+            _, queue_id = heapq.heappop(self._heap)
+            task = self._tasks[queue_id]
+            task.status = "processing"
+            task.attempts += 1
+            return task
+
+    def complete(self, queue_id: int) -> None:
+        with self._lock:
+            task = self._tasks[queue_id]
+            if task.options.get(OPTION_REQUEUE):
+                task.status = "pending"
+                task.attempts = 0
+                task.priority = PRIORITY_REEMBED
+                task.options = {OPTION_REEMBED: True}
+                heapq.heappush(self._heap, (-PRIORITY_REEMBED, queue_id))
+            else:
+                task.status = "completed"
+
+    def fail(self, queue_id: int, error_message: str) -> None:
+        with self._lock:
+            task = self._tasks[queue_id]
+            task.error_message = error_message
+            if task.attempts < task.max_attempts:
+                task.status = "pending"
+                heapq.heappush(self._heap, (-task.priority, queue_id))
+            else:
+                task.status = "failed"
+
+    def get_stats(self) -> QueueStats:
+        with self._lock:
+            counts = {"pending": 0, "processing": 0, "completed": 0, "failed": 0}
+            for task in self._tasks.values():
+                counts[task.status] += 1
+            return QueueStats(total=len(self._tasks), **counts)
+
+    def is_worker_running(self) -> bool:
+        return False
@@ -0,0 +1,11 @@
+-- Migration 006: Add per-stage processing checkpoints
+-- Purpose: Persist the output of each processing stage (upload, visual, narrative,
+-- compilation, embeddings) so queue retries resume from the failed stage.
+
+CREATE TABLE IF NOT EXISTS video_checkpoints (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    stage VARCHAR(50) NOT NULL,
+    data JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (video_id, stage)
+);
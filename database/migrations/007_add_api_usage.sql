@@ -0,0 +1,27 @@
+-- Migration 007: Add per-call token and cost accounting
+-- Purpose: Record usage_metadata of every Gemini / embedding call, attributed to
+-- video, processing stage and API route.
+
+CREATE TABLE IF NOT EXISTS api_usage (
+    id BIGSERIAL PRIMARY KEY,
+    service VARCHAR(20) NOT NULL,
+    stage VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    video_id INTEGER REFERENCES videos(id) ON DELETE SET NULL,
+    route VARCHAR(200),
+    prompt_tokens INTEGER DEFAULT 0,
+    output_tokens INTEGER DEFAULT 0,
+    total_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,
+    input_chars INTEGER DEFAULT 0,
+    estimated BOOLEAN DEFAULT FALSE,
+    cost_usd DOUBLE PRECISION DEFAULT 0,
+    latency_ms DOUBLE PRECISION,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Indices
+CREATE INDEX IF NOT EXISTS idx_api_usage_created_at ON api_usage(created_at);
+CREATE INDEX IF NOT EXISTS idx_api_usage_video_id ON api_usage(video_id) WHERE video_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_api_usage_stage ON api_usage(stage);
+CREATE INDEX IF NOT EXISTS idx_api_usage_route ON api_usage(route) WHERE route IS NOT NULL;
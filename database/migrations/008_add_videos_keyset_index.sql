@@ -0,0 +1,9 @@
+-- Migration 008: Keyset pagination indexes for video listing
+-- Purpose: GET /api/v1/videos pages by (created_at, id) instead of OFFSET.
+
+-- Ordem da listagem (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_videos_created_at_id ON videos(created_at DESC, id DESC);
+
+-- Listagem filtrada por status (filtro mais usado na biblioteca)
+CREATE INDEX IF NOT EXISTS idx_videos_status_created_at_id
+    ON videos(processing_status, created_at DESC, id DESC);
@@ -0,0 +1,5 @@
+-- Migration 009: Propagate tracing context through the processing queue
+-- Purpose: The worker continues the trace of the request that enqueued the video
+-- (W3C traceparent serialized as JSON).
+
+ALTER TABLE processing_queue ADD COLUMN IF NOT EXISTS trace_context TEXT;
@@ -0,0 +1,8 @@
+-- Migration 010: Local theme classifier
+-- Purpose: Record classifier scores for compilation_themes assigned without the
+-- Gemini compilation prompt, and carry per-item ingest options in the queue
+-- (e.g. {"auto_themes": true}).
+
+ALTER TABLE videos ADD COLUMN IF NOT EXISTS compilation_theme_scores JSONB;
+
+ALTER TABLE processing_queue ADD COLUMN IF NOT EXISTS options JSONB DEFAULT '{}';
@@ -0,0 +1,12 @@
+-- Migration 011: Incremental Qdrant payload sync
+-- Purpose: Remember how far scripts/sync_payloads.py got (videos.updated_at)
+-- so each run only diffs rows changed since the previous one.
+
+CREATE TABLE IF NOT EXISTS sync_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    watermark TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Varredura incremental por (updated_at, id)
+CREATE INDEX IF NOT EXISTS idx_videos_updated_at_id ON videos(updated_at, id);
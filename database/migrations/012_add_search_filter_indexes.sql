@@ -0,0 +1,6 @@
+-- Migration 012: Indexes for Postgres-side search filters
+-- Purpose: FilterPlanner resolves event_date, uploader and tag containment
+-- (visual_tags, objects_detected, narrative_tags) in Postgres before the
+-- vector search. event_date and the tag GIN indexes already exist (004, 003).
+
+CREATE INDEX IF NOT EXISTS idx_videos_uploader ON videos(uploader);
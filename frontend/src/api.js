@@ -38,6 +38,14 @@ export async function search(query, filters = {}, limit = 10) {
   })
 }
 
+export async function facets(query, filters = {}, fields = null) {
+  return request(`${BASE}/search/facets`, {
+    method: 'POST',
+    headers: jsonHeaders(),
+    body: JSON.stringify({ query, filters, fields }),
+  })
+}
+
 export async function similar(videoId, limit = 5) {
   return request(`${BASE}/search/similar/${videoId}`, {
     method: 'POST',
@@ -99,9 +107,11 @@ export async function deleteVideo(videoId) {
   })
 }
 
-export async function listVideos(status = '') {
-  const url = status
-    ? `${BASE}/videos?status=${encodeURIComponent(status)}`
-    : `${BASE}/videos`
+export async function listVideos(status = '', cursor = '') {
+  const params = new URLSearchParams()
+  if (status) params.set('status', status)
+  if (cursor) params.set('cursor', cursor)
+  const query = params.toString()
+  const url = query ? `${BASE}/videos?${query}` : `${BASE}/videos`
   return request(url, { headers: headers() })
 }
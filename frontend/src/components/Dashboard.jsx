@@ -30,7 +30,7 @@ export default function Dashboard() {
   const total = data.videos_total || 1
   const pipeline = [
     { key: 'pending', label: 'Pending', count: data.videos_pending },
-    { key: 'analyzing', label: 'Analyzing', count: (data.videos_total - data.videos_analyzed - data.videos_pending - data.videos_failed) },
+    { key: 'analyzing', label: 'Analyzing', count: data.videos_analyzing ?? (data.videos_total - data.videos_analyzed - data.videos_pending - data.videos_failed) },
     { key: 'analyzed', label: 'Analyzed', count: data.videos_analyzed },
     { key: 'failed', label: 'Failed', count: data.videos_failed },
   ].filter(s => s.count > 0)
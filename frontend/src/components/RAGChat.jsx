@@ -125,7 +125,7 @@ export default function RAGChat() {
               <div className="chat-sources">
                 {msg.sources.map((s, j) => (
                   <span key={j} className="source-chip">
-                    {s.filename || `Video #${s.video_id}`} ({s.score.toFixed(2)})
+                    {s.filename || `Video #${s.video_id}`} ({(s.rerank_score ?? s.score).toFixed(3)})
                   </span>
                 ))}
               </div>
@@ -1,15 +1,30 @@
 import { useState } from 'react'
-import { search, videoContext } from '../api'
+import { facets, search, videoContext } from '../api'
 
-function scoreColor(score) {
-  if (score >= 0.8) return 'var(--green)'
-  if (score >= 0.5) return 'var(--yellow)'
+// Campo do facet -> filtro aplicado ao clicar num valor
+const FACET_FILTERS = {
+  category: 'category',
+  emotional_tone: 'emotional_tone',
+  camera_type: 'camera_type',
+  compilation_themes: 'compilation_theme',
+}
+
+// Com busca hibrida o score e do RRF (posicao nos rankings denso e BM25),
+// nao cosseno: barra e cor sao relativas ao melhor resultado da resposta
+function relativeScore(score, best) {
+  return best > 0 ? score / best : 0
+}
+
+function scoreColor(relative) {
+  if (relative >= 0.8) return 'var(--green)'
+  if (relative >= 0.5) return 'var(--yellow)'
   return 'var(--red)'
 }
 
 export default function Search() {
   const [query, setQuery] = useState('')
   const [results, setResults] = useState(null)
+  const [facetCounts, setFacetCounts] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   const [showFilters, setShowFilters] = useState(false)
@@ -50,8 +65,12 @@ export default function Search() {
       if (filters.standalone_score_max) f.standalone_score_max = parseFloat(filters.standalone_score_max)
       if (filters.visual_quality_score_min) f.visual_quality_score_min = parseFloat(filters.visual_quality_score_min)
       if (filters.visual_quality_score_max) f.visual_quality_score_max = parseFloat(filters.visual_quality_score_max)
-      const res = await search(query, f)
+      const [res, fc] = await Promise.all([
+        search(query, f),
+        facets(query, f, Object.keys(FACET_FILTERS)).catch(() => null),
+      ])
       setResults(res)
+      setFacetCounts(fc)
       setExpandedId(null)
     } catch (e) {
       setError(e.message)
@@ -83,6 +102,8 @@ export default function Search() {
     setFilters(prev => ({ ...prev, [key]: value }))
   }
 
+  const bestScore = results ? Math.max(0, ...results.results.map(r => r.score)) : 0
+
   return (
     <div>
       <h2>Search</h2>
@@ -221,6 +242,25 @@ export default function Search() {
           <div className="text-muted text-sm mb-16">
             {results.total_results} result{results.total_results !== 1 ? 's' : ''} for "{results.query}"
           </div>
+          {facetCounts && (
+            <div className="mb-16">
+              {Object.entries(facetCounts.facets).filter(([, values]) => values.length > 0).map(([field, values]) => (
+                <div key={field} className="badges">
+                  <span className="text-muted text-sm">{field}:</span>
+                  {values.slice(0, 8).map((v) => (
+                    <span
+                      key={v.value}
+                      className="badge"
+                      style={{ cursor: 'pointer' }}
+                      onClick={() => { updateFilter(FACET_FILTERS[field], v.value); setShowFilters(true) }}
+                    >
+                      {v.value} ({v.count})
+                    </span>
+                  ))}
+                </div>
+              ))}
+            </div>
+          )}
           <div className="results-list">
             {results.results.map((r) => (
               <div key={r.id}>
@@ -238,13 +278,13 @@ export default function Search() {
                     <div
                       className="score-bar-fill"
                       style={{
-                        width: `${(r.score * 100).toFixed(0)}%`,
-                        background: scoreColor(r.score),
+                        width: `${(relativeScore(r.score, bestScore) * 100).toFixed(0)}%`,
+                        background: scoreColor(relativeScore(r.score, bestScore)),
                       }}
                     />
                   </div>
                   <div className="badges">
-                    <span className="badge">Score: {r.score.toFixed(3)}</span>
+                    <span className="badge">Score: {r.score.toFixed(4)}</span>
                     {r.emotional_tone && <span className="badge tone">{r.emotional_tone}</span>}
                     {r.intensity != null && <span className="badge intensity">Int: {r.intensity}</span>}
                     {r.viral_potential != null && <span className="badge viral">Viral: {r.viral_potential}</span>}
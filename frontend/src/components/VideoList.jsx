@@ -13,6 +13,7 @@ export default function VideoList() {
   const [detailLoading, setDetailLoading] = useState(false)
   const [similarResults, setSimilarResults] = useState(null)
   const [statusFilter, setStatusFilter] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
 
   useEffect(() => {
     loadVideos()
@@ -24,6 +25,21 @@ export default function VideoList() {
     try {
       const res = await listVideos(status)
       setVideos(res.videos)
+      setNextCursor(res.next_cursor)
+    } catch (e) {
+      setError(e.message)
+    } finally {
+      setLoading(false)
+    }
+  }
+
+  async function loadMore() {
+    if (!nextCursor) return
+    setLoading(true)
+    try {
+      const res = await listVideos(statusFilter, nextCursor)
+      setVideos(prev => [...prev, ...res.videos])
+      setNextCursor(res.next_cursor)
     } catch (e) {
       setError(e.message)
     } finally {
@@ -119,6 +135,18 @@ export default function VideoList() {
           {videos.length === 0 && !loading && (
             <div className="empty">No videos found.</div>
           )}
+
+          {nextCursor && (
+            <button
+              type="button"
+              className="btn btn-sm btn-outline"
+              onClick={loadMore}
+              disabled={loading}
+              style={{ marginTop: 8 }}
+            >
+              {loading ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
 
         <div>
@@ -16,7 +16,7 @@ from src.components import (
     queue_status_badge,
     calculate_total_pages,
 )
-from src.services.database_service import DatabaseService
+from src.services.database_service import DatabaseService, VideoLibraryItem
 from src.services.queue_service import QueueService
 
 
@@ -174,6 +174,7 @@ try:
     videos, total = db.list_videos_paginated(
         page=st.session_state.videos_page,
         per_page=VIDEOS_PER_PAGE,
+        projection=VideoLibraryItem,
     )
     total_pages = calculate_total_pages(total, VIDEOS_PER_PAGE)
 
@@ -8,7 +8,7 @@ import streamlit as st
 from src.config import settings
 from src.components import video_player, video_thumbnail
 from src.models import SearchResult, SearchResponse
-from src.services.database_service import DatabaseService
+from src.services.database_service import DatabaseService, VideoFileInfo
 from src.services.embedding_service import EmbeddingService
 from src.services.gemini_service import GeminiService
 from src.services.qdrant_service import QdrantService
@@ -256,7 +256,7 @@ if query:
                 video_ids = [hit.id for hit in dual_results]
 
                 # Buscar todos os videos de uma vez (evita N+1 queries)
-                videos_dict = db.get_videos_by_ids_dict(video_ids)
+                videos_dict = db.get_videos_by_ids_dict(video_ids, projection=VideoFileInfo)
 
                 for hit in dual_results:
                     payload = hit.payload
@@ -15,7 +15,7 @@ import streamlit as st
 
 from src.config import settings
 from src.components import video_player
-from src.services.database_service import DatabaseService
+from src.services.database_service import DatabaseService, VideoSummaryRow
 from src.services.gemini_service import GeminiService
 
 
@@ -201,7 +201,7 @@ with tab_acervo:
         db = get_db_service()
 
         # Listar videos analisados
-        videos = db.list_videos(status="analyzed")
+        videos = db.list_videos(status="analyzed", projection=VideoSummaryRow)
 
         if not videos:
             st.info(
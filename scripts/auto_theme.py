@@ -0,0 +1,188 @@
+"""
+Script: classificador local de compilation_themes (sem chamadas ao Gemini).
+
+    train   Treina a regressao logistica com os clips rotulados pelo Gemini
+            (vetores visual + narrativo da collection dual), reporta precisao
+            e recall num holdout e salva em THEME_CLASSIFIER_PATH.
+    assign  Atribui temas aos clips sem compilation_themes (ex: analisados no
+            modo dual) quando a confianca passa de --min-confidence; grava temas
+            e scores no banco, no payload da collection unificada e nos
+            centroides de tema, e agenda re-embedding dos clips indexados
+            (os temas entram no texto do embedding e do BM25).
+
+Uso:
+    python scripts/auto_theme.py train
+    python scripts/auto_theme.py assign [--min-confidence 0.9] [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+
+sys.path.insert(0, ".")
+
+import numpy as np
+
+from src.config import settings
+from src.services.database_service import DatabaseService, VideoThemeLabels
+from src.services.qdrant_service import QdrantService
+from src.services.queue_service import QueueService
+from src.services.theme_classifier import ThemeClassifier, load_theme_classifier, theme_features
+from src.services.theme_index import ThemeIndex
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Pontos lidos por chamada ao Qdrant
+BATCH_SIZE = 512
+# Fracao dos clips rotulados reservada para avaliacao
+HOLDOUT_FRACTION = 0.2
+
+
+def iter_dual_batches(db: DatabaseService, qdrant: QdrantService):
+    """Lotes de (ids, features, labels) a partir da collection dual e do banco."""
+    offset = None
+    while True:
+        points, offset = qdrant.client.scroll(
+            collection_name=qdrant.dual_collection,
+            limit=BATCH_SIZE,
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        points = [p for p in points if p.vector and "visual" in p.vector and "narrative" in p.vector]
+        if points:
+            labels = db.get_videos_by_ids_dict([p.id for p in points], projection=VideoThemeLabels)
+            ids = [p.id for p in points if p.id in labels]
+            features = np.array(
+                [
+                    theme_features(p.vector["visual"], p.vector["narrative"])
+                    for p in points
+                    if p.id in labels
+                ]
+            )
+            yield ids, features, [labels[i] for i in ids]
+        if offset is None:
+            return
+
+
+def train(db: DatabaseService, qdrant: QdrantService) -> None:
+    features, labels = [], []
+    for _, batch_features, batch_labels in iter_dual_batches(db, qdrant):
+        for row, label in zip(batch_features, batch_labels):
+            # So rotulos do Gemini; temas do proprio classificador nao realimentam o treino
+            if label.compilation_themes and label.compilation_theme_scores is None:
+                features.append(row)
+                labels.append(label.compilation_themes)
+    if not labels:
+        logger.error("Nenhum clip rotulado encontrado para treino")
+        return
+    x = np.array(features)
+    logger.info(f"Treinando com {len(labels)} clips rotulados ({x.shape[1]} dimensoes)")
+
+    order = np.random.default_rng(0).permutation(len(labels))
+    split = int(len(labels) * (1 - HOLDOUT_FRACTION))
+    if split < len(labels):
+        train_idx, test_idx = order[:split], order[split:]
+        model = ThemeClassifier.fit(x[train_idx], [labels[i] for i in train_idx])
+        report(model, x[test_idx], [labels[i] for i in test_idx])
+
+    model = ThemeClassifier.fit(x, labels)
+    model.save(settings.theme_classifier_path)
+    logger.info(f"Classificador salvo em {settings.theme_classifier_path} ({len(model.themes)} temas)")
+
+
+def report(model: ThemeClassifier, features: np.ndarray, labels: list[list[str]]) -> None:
+    """Precisao/recall no holdout, no total e entre os clips acima da confianca minima."""
+    predictions = model.predict(features, threshold=settings.theme_classifier_threshold)
+    for name, min_confidence in (("todos", 0.0), ("confiantes", settings.theme_classifier_min_confidence)):
+        hits = predicted = expected = covered = 0
+        for prediction, label in zip(predictions, labels):
+            if prediction.confidence < min_confidence:
+                continue
+            covered += 1
+            hits += len(set(prediction.themes) & set(label))
+            predicted += len(prediction.themes)
+            expected += len(label)
+        precision = hits / predicted if predicted else 0.0
+        recall = hits / expected if expected else 0.0
+        logger.info(
+            f"Holdout ({name}): {covered}/{len(labels)} clips, "
+            f"precisao {precision:.2f}, recall {recall:.2f}"
+        )
+
+
+def assign(
+    db: DatabaseService,
+    qdrant: QdrantService,
+    queue: QueueService,
+    min_confidence: float,
+    dry_run: bool,
+) -> None:
+    model = load_theme_classifier(settings.theme_classifier_path)
+    if model is None:
+        logger.error(f"Classificador nao encontrado em {settings.theme_classifier_path}; rode 'train'")
+        return
+    theme_index = ThemeIndex(qdrant)
+
+    assigned = uncertain = reembed_queued = 0
+    for ids, features, labels in iter_dual_batches(db, qdrant):
+        pending = [i for i, label in enumerate(labels) if not label.compilation_themes]
+        if not pending:
+            continue
+        indexed = []
+        predictions = model.predict(features[pending], threshold=settings.theme_classifier_threshold)
+        for index, prediction in zip(pending, predictions):
+            video_id = ids[index]
+            if not prediction.themes or prediction.confidence < min_confidence:
+                uncertain += 1
+                continue
+            assigned += 1
+            if dry_run:
+                logger.info(f"Video {video_id}: {prediction.themes} (confianca {prediction.confidence})")
+                continue
+            db.update_theme_scores(video_id, prediction.scores, themes=prediction.themes)
+            vector = qdrant.get_unified_vector(video_id)
+            if vector is not None:
+                theme_index.update_clip(video_id, vector, prediction.themes)
+                qdrant.update_unified_payload(video_id, {"compilation_themes": prediction.themes})
+                indexed.append(video_id)
+        # Payload ja filtra pelos temas; vetores denso e BM25 sao refeitos pelo worker
+        if indexed:
+            reembed_queued += queue.enqueue_reembed_bulk(indexed)
+        logger.info(f"{assigned} clips com temas atribuidos, {uncertain} abaixo da confianca")
+
+    action = "seriam atribuidos" if dry_run else "atribuidos"
+    logger.info(
+        f"Concluido: {assigned} {action}, {uncertain} deixados para o prompt de compilation, "
+        f"{reembed_queued} re-embeddings agendados"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classificador local de temas de compilado")
+    parser.add_argument("command", choices=["train", "assign"])
+    parser.add_argument(
+        "--min-confidence",
+        type=float,
+        default=settings.theme_classifier_min_confidence,
+        help="Confianca minima para gravar os temas (assign)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="So lista o que seria atribuido")
+    args = parser.parse_args()
+
+    db = DatabaseService(settings.postgres_url)
+    qdrant = QdrantService(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        collection=settings.qdrant_collection,
+        vector_size=settings.embedding_dimensions,
+    )
+    if args.command == "train":
+        train(db, qdrant)
+    else:
+        assign(db, qdrant, QueueService(settings.postgres_url), args.min_confidence, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Benchmark dos modos de analise FULL: multi (3 chamadas) vs single (1 chamada).
+
+Mede, por video e por modo:
+- latencia total (upload + analise)
+- chamadas generate_content e tokens (usage_metadata)
+- qualidade dos campos (preenchimento, contagem de tags, temas validos)
+- concordancia entre os modos (tags, tom emocional, temas de compilacao)
+
+Uso:
+    python scripts/benchmark_analysis_modes.py video1.mp4 video2.mp4
+    python scripts/benchmark_analysis_modes.py uploads/*.mp4 --repeat 2 --output bench.json
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from src.config import settings
+from src.models import FullVideoAnalysis
+from src.services.gemini_service import ANALYSIS_MODES, GeminiService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class UsageRecorder:
+    """Envolve client.models.generate_content e acumula usage_metadata de cada resposta."""
+
+    def __init__(self, gemini: GeminiService):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self._original = gemini.client.models.generate_content
+        gemini.client.models.generate_content = self._generate_content
+
+    def _generate_content(self, *args, **kwargs):
+        response = self._original(*args, **kwargs)
+        self.calls += 1
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_token_count or 0
+            self.output_tokens += usage.candidates_token_count or 0
+            self.total_tokens += usage.total_token_count or 0
+        return response
+
+    def reset(self) -> None:
+        self.calls = self.prompt_tokens = self.output_tokens = self.total_tokens = 0
+
+
+def score_analysis(analysis: FullVideoAnalysis) -> dict:
+    """Metricas de qualidade dos campos retornados (independentes de referencia)."""
+    fields = {
+        **analysis.visual.model_dump(),
+        **analysis.narrative.model_dump(),
+        **analysis.compilation.model_dump(),
+    }
+    filled = sum(1 for v in fields.values() if v not in (None, "", [], {}))
+    compilation = analysis.compilation
+    return {
+        "fields_filled_ratio": round(filled / len(fields), 3),
+        "visual_tags": len(analysis.visual.visual_tags),
+        "narrative_tags": len(analysis.narrative.narrative_tags),
+        "objects_detected": len(analysis.visual.objects_detected),
+        "scenes": len(analysis.visual.scenes),
+        "key_moments": len(analysis.narrative.key_moments),
+        "compilation_themes": len(compilation.compilation_themes),
+        "trim_valid": compilation.trim_out_ms > compilation.trim_in_ms,
+        "money_shot_in_trim": (
+            compilation.trim_in_ms <= compilation.money_shot_ms <= compilation.trim_out_ms
+        ),
+        "headline_chars": len(compilation.event_headline),
+    }
+
+
+def _jaccard(a: list[str], b: list[str]) -> float:
+    sa = {x.lower() for x in a}
+    sb = {x.lower() for x in b}
+    if not sa and not sb:
+        return 1.0
+    return round(len(sa & sb) / len(sa | sb), 3)
+
+
+def agreement(a: FullVideoAnalysis, b: FullVideoAnalysis) -> dict:
+    """Concordancia entre duas analises do mesmo video."""
+    return {
+        "visual_tags_jaccard": _jaccard(a.visual.visual_tags, b.visual.visual_tags),
+        "narrative_tags_jaccard": _jaccard(a.narrative.narrative_tags, b.narrative.narrative_tags),
+        "compilation_themes_jaccard": _jaccard(
+            a.compilation.compilation_themes, b.compilation.compilation_themes
+        ),
+        "same_emotional_tone": (
+            a.narrative.emotional_tone.lower() == b.narrative.emotional_tone.lower()
+        ),
+        "same_camera_type": a.compilation.camera_type == b.compilation.camera_type,
+    }
+
+
+def run_benchmark(video_paths: list[str], modes: list[str], repeat: int) -> dict:
+    gemini = GeminiService(settings.google_api_key, settings.gemini_model)
+    recorder = UsageRecorder(gemini)
+
+    runs = []
+    last_analysis: dict[tuple[str, str], FullVideoAnalysis] = {}
+
+    for path in video_paths:
+        for mode in modes:
+            for i in range(repeat):
+                recorder.reset()
+                start = time.perf_counter()
+                try:
+                    analysis = gemini.analyze_video_full(path, mode=mode)
+                    error = None
+                except Exception as e:
+                    analysis = None
+                    error = str(e)[:300]
+                latency = time.perf_counter() - start
+
+                run = {
+                    "video": path,
+                    "mode": mode,
+                    "repeat": i,
+                    "latency_s": round(latency, 3),
+                    "calls": recorder.calls,
+                    "prompt_tokens": recorder.prompt_tokens,
+                    "output_tokens": recorder.output_tokens,
+                    "total_tokens": recorder.total_tokens,
+                    "error": error,
+                }
+                if analysis is not None:
+                    run["quality"] = score_analysis(analysis)
+                    last_analysis[(path, mode)] = analysis
+                runs.append(run)
+                logger.info(
+                    f"[{mode}] {path}: {latency:.1f}s, {recorder.calls} chamadas, "
+                    f"{recorder.total_tokens} tokens" + (f" ERRO: {error}" if error else "")
+                )
+
+    summary = {}
+    for mode in modes:
+        ok = [r for r in runs if r["mode"] == mode and r["error"] is None]
+        if not ok:
+            summary[mode] = {"runs": 0}
+            continue
+        summary[mode] = {
+            "runs": len(ok),
+            "errors": sum(1 for r in runs if r["mode"] == mode and r["error"]),
+            "latency_s_mean": round(statistics.mean(r["latency_s"] for r in ok), 3),
+            "latency_s_max": round(max(r["latency_s"] for r in ok), 3),
+            "total_tokens_mean": round(statistics.mean(r["total_tokens"] for r in ok), 1),
+            "prompt_tokens_mean": round(statistics.mean(r["prompt_tokens"] for r in ok), 1),
+            "output_tokens_mean": round(statistics.mean(r["output_tokens"] for r in ok), 1),
+            "fields_filled_ratio_mean": round(
+                statistics.mean(r["quality"]["fields_filled_ratio"] for r in ok), 3
+            ),
+            "visual_tags_mean": round(statistics.mean(r["quality"]["visual_tags"] for r in ok), 1),
+            "narrative_tags_mean": round(
+                statistics.mean(r["quality"]["narrative_tags"] for r in ok), 1
+            ),
+        }
+
+    agreements = []
+    if len(modes) == 2:
+        for path in video_paths:
+            a = last_analysis.get((path, modes[0]))
+            b = last_analysis.get((path, modes[1]))
+            if a and b:
+                agreements.append({"video": path, **agreement(a, b)})
+
+    return {
+        "model": settings.gemini_model,
+        "modes": modes,
+        "repeat": repeat,
+        "summary": summary,
+        "agreement": agreements,
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("videos", nargs="+", help="Caminhos dos videos de teste")
+    parser.add_argument("--modes", nargs="+", default=list(ANALYSIS_MODES), choices=ANALYSIS_MODES)
+    parser.add_argument("--repeat", type=int, default=1, help="Execucoes por video e modo")
+    parser.add_argument("--output", default="analysis_modes_benchmark.json")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.videos, args.modes, args.repeat)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for mode, stats in results["summary"].items():
+        logger.info(f"Resumo [{mode}]: {json.dumps(stats)}")
+    logger.info(f"Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
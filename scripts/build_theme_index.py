@@ -0,0 +1,52 @@
+"""
+Script: (re)constroi os centroides dos temas de compilado na collection
+"{QDRANT_COLLECTION}_themes".
+
+Faz uma chamada de embedding por tema (descricao da taxonomia) e uma
+varredura da collection unificada; depois disso ingest, reanalise e delecao
+mantem os centroides atualizados incrementalmente. Rode apos migracoes em
+massa (migrate_to_unified, enable_hybrid_search) ou periodicamente quando
+houver workers em varios processos.
+
+Uso:
+    python scripts/build_theme_index.py
+"""
+
+import logging
+import sys
+
+sys.path.insert(0, ".")
+
+from src.config import settings
+from src.services.embedding_service import EmbeddingService
+from src.services.qdrant_service import QdrantService
+from src.services.rate_limiter import PRIORITY_BACKGROUND, request_priority
+from src.services.theme_index import ThemeIndex
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    embedding_svc = EmbeddingService(
+        api_key=settings.google_api_key,
+        model=settings.embedding_model,
+        dimensions=settings.embedding_dimensions,
+    )
+    qdrant = QdrantService(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        collection=settings.qdrant_collection,
+        vector_size=settings.embedding_dimensions,
+    )
+    theme_index = ThemeIndex(qdrant, embedding_svc)
+
+    counts = theme_index.rebuild()
+    for theme, count in sorted(counts.items(), key=lambda item: -item[1]):
+        logger.info(f"  {theme}: {count} clips")
+    logger.info(f"Centroides de {len(counts)} temas gravados em {theme_index.collection}")
+
+
+if __name__ == "__main__":
+    with request_priority(PRIORITY_BACKGROUND):
+        main()
@@ -0,0 +1,106 @@
+"""
+Script de migracao: adiciona o vetor esparso BM25 (busca hibrida) a uma
+collection unificada criada antes dele.
+
+O Qdrant nao permite incluir um novo vetor esparso numa collection existente,
+entao os pontos sao copiados (vetor denso + payload, sem novas chamadas de
+embedding) para uma collection temporaria ja com o vetor esparso calculado a
+partir do banco, e depois de volta para a collection original recriada.
+
+Uso:
+    python scripts/enable_hybrid_search.py
+"""
+
+import logging
+import sys
+
+sys.path.insert(0, ".")
+
+from qdrant_client.models import PointStruct
+
+from src.config import settings
+from src.services.context_composer import ContextComposer
+from src.services.database_service import DatabaseService
+from src.services.qdrant_service import QdrantService, dense_vector
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Pontos lidos/gravados por chamada ao Qdrant
+BATCH_SIZE = 256
+
+
+def copy_points(qdrant: QdrantService, source: str, target: str, build_vectors) -> int:
+    """
+    Copia todos os pontos de source para target, em lotes.
+    build_vectors(points) retorna os vetores de cada ponto do lote.
+    """
+    copied = 0
+    offset = None
+    while True:
+        points, offset = qdrant.client.scroll(
+            collection_name=source,
+            limit=BATCH_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            qdrant.client.upsert(
+                collection_name=target,
+                points=[
+                    PointStruct(id=p.id, vector=vector, payload=p.payload)
+                    for p, vector in zip(points, build_vectors(points))
+                ],
+            )
+            copied += len(points)
+            logger.info(f"{source} -> {target}: {copied} pontos")
+        if offset is None:
+            return copied
+
+
+def main():
+    db = DatabaseService(settings.postgres_url)
+    qdrant = QdrantService(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        collection=settings.qdrant_collection,
+        vector_size=settings.embedding_dimensions,
+    )
+    source = qdrant.unified_collection
+    if qdrant.has_sparse_vector():
+        logger.info(f"{source} ja tem o vetor esparso; nada a fazer")
+        return
+
+    composer = ContextComposer()
+    # Daqui em diante unified_vectors gera denso + BM25
+    qdrant.hybrid_enabled = True
+
+    def with_sparse(points) -> list:
+        videos = db.get_videos_by_ids_dict([p.id for p in points])
+        return [
+            qdrant.unified_vectors(
+                dense_vector(p.vector),
+                composer.compose_lexical_text(videos[p.id]) if p.id in videos else None,
+            )
+            for p in points
+        ]
+
+    # 1. Copia para uma collection temporaria com o vetor esparso
+    staging = source + "_hybrid_tmp"
+    if qdrant.client.collection_exists(staging):
+        qdrant.client.delete_collection(staging)
+    qdrant.create_unified_collection(staging, qdrant.vector_size)
+    copy_points(qdrant, source, staging, with_sparse)
+
+    # 2. Recria a collection original no formato hibrido e copia de volta
+    qdrant.client.delete_collection(source)
+    qdrant.create_unified_collection(source, qdrant.vector_size)
+    restored = copy_points(qdrant, staging, source, lambda points: [p.vector for p in points])
+    qdrant.client.delete_collection(staging)
+
+    logger.info(f"Busca hibrida ativada em {source}: {restored} pontos com vetor BM25")
+
+
+if __name__ == "__main__":
+    main()
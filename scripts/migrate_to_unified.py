@@ -15,10 +15,14 @@ from src.services.context_composer import ContextComposer
 from src.services.database_service import DatabaseService
 from src.services.embedding_service import EmbeddingService
 from src.services.qdrant_service import QdrantService
+from src.services.rate_limiter import PRIORITY_BACKGROUND, request_priority
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# unified_embedding_id gravados no banco a cada BATCH_SIZE videos
+BATCH_SIZE = 100
+
 
 def main():
     logger.info("Iniciando migracao para unified embeddings...")
@@ -45,6 +49,13 @@ def main():
     success = 0
     skipped = 0
     failed = 0
+    # IDs indexados no Qdrant ainda nao gravados no banco (gravados em lote)
+    pending_ids: dict[int, str] = {}
+
+    def flush_pending():
+        if pending_ids:
+            db.update_unified_embeddings(pending_ids)
+            pending_ids.clear()
 
     for video in videos:
         try:
@@ -65,20 +76,18 @@ def main():
             unified_emb = embedding_svc.generate_unified(composed_text)
 
             # Payload para Qdrant
-            payload = {
-                "video_id": video.id,
-                "filename": video.filename,
-                "category": video.category,
-                "emotional_tone": video.emotional_tone,
-                "intensity": video.intensity,
-                "viral_potential": video.viral_potential,
-                "is_exclusive": video.is_exclusive or False,
-                "source": video.source or "local",
-            }
+            payload = composer.compose_unified_payload(video)
 
             # Indexar
-            emb_id = qdrant.index_unified(video.id, unified_emb, payload)
-            db.update_unified_embedding(video.id, emb_id)
+            emb_id = qdrant.index_unified(
+                video.id,
+                unified_emb,
+                payload,
+                lexical_text=composer.compose_lexical_text(video),
+            )
+            pending_ids[video.id] = emb_id
+            if len(pending_ids) >= BATCH_SIZE:
+                flush_pending()
 
             success += 1
             logger.info(f"[OK] Video {video.id} ({video.filename}) - unified embedding criado")
@@ -87,8 +96,11 @@ def main():
             failed += 1
             logger.error(f"[FAIL] Video {video.id} ({video.filename}): {e}")
 
+    flush_pending()
     logger.info(f"Migracao concluida: {success} sucesso, {skipped} pulados, {failed} falhas")
 
 
 if __name__ == "__main__":
-    main()
+    # Backfill: cede a vez para buscas interativas no rate limiter
+    with request_priority(PRIORITY_BACKGROUND):
+        main()
@@ -0,0 +1,74 @@
+"""
+Script: reconcilia o payload da collection unificada com o Postgres, sem
+gerar embeddings (ver src/services/payload_sync.py).
+
+Incremental por padrao: so compara os videos com updated_at posterior ao
+watermark da execucao anterior (tabela sync_watermarks, migration 011).
+
+Uso:
+    python scripts/sync_payloads.py                 # uma passada incremental
+    python scripts/sync_payloads.py --full          # compara todos os videos
+    python scripts/sync_payloads.py --interval 300  # repete a cada 5 minutos
+    python scripts/sync_payloads.py --full --reembed-missing
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+sys.path.insert(0, ".")
+
+from src.config import settings
+from src.services.database_service import DatabaseService
+from src.services.payload_sync import SYNC_BATCH_SIZE, PayloadSync
+from src.services.qdrant_service import QdrantService
+from src.services.queue_service import QueueService
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync Postgres -> payload do Qdrant")
+    parser.add_argument("--full", action="store_true", help="Ignora o watermark")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+    parser.add_argument(
+        "--reembed-missing",
+        action="store_true",
+        help="Enfileira re-embedding dos videos indexados no banco mas ausentes no Qdrant",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=None, help="Segundos entre passadas (padrao: uma so)"
+    )
+    args = parser.parse_args()
+
+    db = DatabaseService(settings.postgres_url)
+    qdrant = QdrantService(
+        host=settings.qdrant_host,
+        port=settings.qdrant_port,
+        collection=settings.qdrant_collection,
+        vector_size=settings.embedding_dimensions,
+    )
+    sync = PayloadSync(db, qdrant)
+
+    queue = QueueService(settings.postgres_url) if args.reembed_missing else None
+
+    while True:
+        result = sync.run(full=args.full, batch_size=args.batch_size)
+        if result.missing_ids and queue is not None:
+            queued = queue.enqueue_reembed_bulk(result.missing_ids)
+            logger.info(f"{queued} re-embeddings enfileirados para pontos ausentes")
+        elif result.missing_ids:
+            logger.warning(
+                f"{len(result.missing_ids)} videos sem ponto na collection unificada "
+                f"(use --reembed-missing)"
+            )
+        if not args.interval:
+            break
+        args.full = False
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
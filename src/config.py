@@ -28,6 +28,23 @@ class Settings(BaseSettings):
     gemini_model: str = "gemini-3-pro-preview"
     embedding_model: str = "gemini-embedding-001"
     embedding_dimensions: int = 768
+    # Modo da analise FULL: "multi" (3 chamadas) ou "single" (1 chamada)
+    gemini_analysis_mode: str = "multi"
+
+    # Rate limiting por processo (requisicoes/minuto e chamadas simultaneas).
+    # Com varios processos (API + workers), divida a quota entre eles.
+    gemini_rpm: int = 60
+    gemini_max_concurrency: int = 4
+    embedding_rpm: int = 1500
+    embedding_max_concurrency: int = 16
+    files_rpm: int = 120
+    files_max_concurrency: int = 4
+    google_max_retries: int = 5
+
+    # Pool HTTP compartilhado pelos clientes Google (keep-alive entre chamadas)
+    google_http_max_connections: int = 32
+    google_http_max_keepalive: int = 16
+    google_http_keepalive_expiry: float = 60.0
 
     # ========================================================================
     # POSTGRESQL
@@ -39,6 +56,15 @@ class Settings(BaseSettings):
     postgres_user: str = "curator"
     postgres_password: str = "curator_pass_2026"
 
+    # Pool de conexoes (um engine compartilhado por processo)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # statement_timeout por conexao em ms (0 = sem limite)
+    db_statement_timeout_ms: int = 30000
+
     @property
     def postgres_url(self) -> str:
         return (
@@ -53,6 +79,51 @@ class Settings(BaseSettings):
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
     qdrant_collection: str = "videos"
+    # Busca hibrida: BM25 (vetor esparso) + denso, fundidos por RRF
+    hybrid_search_enabled: bool = True
+    # Candidatos buscados em cada ramo (esparso e denso) antes da fusao
+    hybrid_prefetch_limit: int = 100
+
+    # ========================================================================
+    # RERANKING (RAG)
+    # ========================================================================
+
+    # none | features | cross_encoder (ONNX, requer onnxruntime + tokenizers)
+    rerank_mode: str = "features"
+    # Candidatos buscados no Qdrant antes do rerank (os top `limit` vao ao Gemini)
+    rerank_candidates: int = 30
+    rerank_model_path: str = "./models/cross-encoder/model.onnx"
+    rerank_tokenizer_path: str = "./models/cross-encoder/tokenizer.json"
+
+    # ========================================================================
+    # DIVERSIFICACAO (MMR / DPP)
+    # ========================================================================
+
+    # Peso da relevancia (1.0 = sem diversidade) em diversify=mmr|dpp
+    diversity_lambda: float = 0.7
+    # Candidatos buscados (com vetores) antes de diversificar
+    diversity_candidates: int = 50
+
+    # ========================================================================
+    # FILTROS RESOLVIDOS NO POSTGRES (event_date, uploader, tags)
+    # ========================================================================
+
+    # Ate este numero de videos, os IDs vao ao Qdrant como filtro has_id;
+    # acima disso o filtro e aplicado depois da busca vetorial
+    filter_max_ids: int = 10000
+    # Teto de candidatos buscados no Qdrant para o pos-filtro
+    filter_post_max_candidates: int = 1000
+
+    # ========================================================================
+    # CLASSIFICADOR LOCAL DE TEMAS (scripts/auto_theme.py)
+    # ========================================================================
+
+    theme_classifier_path: str = "./models/theme_classifier.npz"
+    # Probabilidade minima para atribuir um tema
+    theme_classifier_threshold: float = 0.5
+    # Confianca minima para pular o prompt de compilation (ingest com auto_themes)
+    # e para gravar temas no backlog
+    theme_classifier_min_confidence: float = 0.9
 
     # ========================================================================
     # FASTAPI
@@ -61,6 +132,22 @@ class Settings(BaseSettings):
     fastapi_port: int = 8000
     fastapi_host: str = "0.0.0.0"
     api_key: str = ""  # Chave simples para autenticacao MENTOR
+    # TTL (s) do cache de /stats (dashboard pode consultar a cada segundo)
+    stats_cache_ttl: float = 2.0
+    # TTL (s) do cache de /search/facets, por query + filtros
+    facets_cache_ttl: float = 30.0
+    # TTL (s) do cache de embeddings de query, por texto (compartilhado por
+    # /search e /search/facets: a UI pede os dois para cada busca)
+    query_embedding_cache_ttl: float = 300.0
+
+    # ========================================================================
+    # TRACING (OpenTelemetry)
+    # ========================================================================
+
+    # none | console | file | otlp
+    tracing_exporter: str = "none"
+    tracing_file_path: str = "./traces.jsonl"
+    otlp_endpoint: str = "http://localhost:4318/v1/traces"
 
     # ========================================================================
     # UPLOAD
@@ -0,0 +1,196 @@
+"""
+Metricas Prometheus do pipeline e da API.
+
+- http_request_duration_seconds: latencia por rota (template) e status
+- pipeline_stage_duration_seconds: upload Gemini, cada prompt de analise,
+  embeddings, upserts Qdrant e escritas no banco
+- queue_*: profundidade da fila, latencia do claim e ocupacao do worker
+- cache_*, db_pool_*, rate_limiter_*: lidos no momento do scrape
+
+Exposto em GET /metrics pela API (api/main.py).
+"""
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from src.tracing import span
+
+# Etapas longas (analise de video) chegam a minutos
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latencia das requisicoes HTTP",
+    ["method", "route", "status"],
+)
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Duracao de cada etapa do pipeline (chamadas externas e escritas)",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "pipeline_stage_errors_total",
+    "Falhas por etapa do pipeline",
+    ["stage"],
+)
+
+QUEUE_CLAIM_SECONDS = Histogram(
+    "queue_claim_duration_seconds",
+    "Latencia de QueueService.claim_next",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+QUEUE_TASKS = Counter(
+    "queue_tasks_total",
+    "Itens da fila processados pelo worker",
+    ["result"],
+)
+
+WORKER_BUSY = Gauge(
+    "queue_worker_busy",
+    "Workers processando um item neste momento",
+)
+
+WORKER_BUSY_SECONDS = Counter(
+    "queue_worker_busy_seconds_total",
+    "Tempo gasto processando itens (rate() = utilizacao do worker)",
+)
+
+
+@contextmanager
+def stage_timer(stage: str, **span_attributes):
+    """
+    Mede a duracao do bloco em pipeline_stage_duration_seconds{stage} e
+    abre um span de mesmo nome (tracing).
+    """
+    start = time.perf_counter()
+    try:
+        with span(stage, **span_attributes):
+            yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable:
+    """Decorator equivalente a stage_timer para metodos inteiros."""
+
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def worker_busy():
+    """Marca o worker como ocupado durante o processamento de um item."""
+    WORKER_BUSY.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        WORKER_BUSY_SECONDS.inc(time.perf_counter() - start)
+        WORKER_BUSY.dec()
+
+
+class RuntimeCollector:
+    """
+    Coleta no momento do scrape: profundidade da fila, caches, pool de
+    conexoes e buckets do rate limiter.
+    """
+
+    def __init__(self, queue=None):
+        self.queue = queue
+
+    def collect(self):
+        from src.services.cache import cache_stats
+        from src.services.db_engine import pool_stats
+        from src.services.rate_limiter import get_rate_limiter
+
+        if self.queue is not None:
+            depth = GaugeMetricFamily(
+                "queue_depth", "Itens na fila por status", labels=["status"]
+            )
+            try:
+                stats = self.queue.get_stats()
+                for status in ("pending", "processing", "completed", "failed"):
+                    depth.add_metric([status], getattr(stats, status))
+            except Exception:
+                pass
+            yield depth
+
+        hits = CounterMetricFamily("cache_hits", "Hits por cache", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Misses por cache", labels=["cache"])
+        hit_rate = GaugeMetricFamily("cache_hit_ratio", "Hits / consultas", labels=["cache"])
+        for name, stats in cache_stats().items():
+            hits.add_metric([name], stats["hits"])
+            misses.add_metric([name], stats["misses"])
+            hit_rate.add_metric([name], stats["hit_rate"])
+        yield hits
+        yield misses
+        yield hit_rate
+
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Conexoes em uso", labels=["database"]
+        )
+        wait = CounterMetricFamily(
+            "db_pool_wait_seconds", "Tempo aguardando conexao do pool", labels=["database"]
+        )
+        for database, stats in pool_stats().items():
+            checked_out.add_metric([database], stats["checked_out"])
+            wait.add_metric([database], stats["wait_seconds_total"])
+        yield checked_out
+        yield wait
+
+        throttled = CounterMetricFamily(
+            "rate_limiter_throttled", "Respostas 429/5xx por bucket", labels=["bucket"]
+        )
+        limiter_wait = CounterMetricFamily(
+            "rate_limiter_wait_seconds", "Tempo aguardando o bucket", labels=["bucket"]
+        )
+        for bucket, stats in get_rate_limiter().stats().items():
+            throttled.add_metric([bucket], stats["throttled"])
+            limiter_wait.add_metric([bucket], stats["wait_seconds"])
+        yield throttled
+        yield limiter_wait
+
+
+_runtime_collector: Optional[RuntimeCollector] = None
+
+
+def register_runtime_collector(queue=None) -> RuntimeCollector:
+    """Registra (uma vez) o coletor de runtime; chamadas seguintes trocam a fila."""
+    global _runtime_collector
+    if _runtime_collector is None:
+        _runtime_collector = RuntimeCollector(queue)
+        REGISTRY.register(_runtime_collector)
+    else:
+        _runtime_collector.queue = queue
+    return _runtime_collector
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Payload no formato de exposicao Prometheus e o content-type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
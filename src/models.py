@@ -17,6 +17,7 @@ from sqlalchemy import (
     BigInteger,
     TIMESTAMP,
     CheckConstraint,
+    ForeignKey,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base
@@ -81,6 +82,8 @@ class Video(Base):
     audio_usability = Column(String(20))
     audio_usability_reason = Column(Text)
     compilation_themes = Column(JSONB, default=[])
+    # Probabilidades do classificador local quando os temas vieram dele (nao do Gemini)
+    compilation_theme_scores = Column(JSONB)
     narration_suggestion = Column(Text)
     location_country = Column(String(200))
     location_environment = Column(String(50))
@@ -133,6 +136,62 @@ class Video(Base):
         return f"<Video(id={self.id}, filename='{self.filename}')>"
 
 
+class VideoCheckpoint(Base):
+    """Tabela video_checkpoints - saida persistida de cada etapa do processamento."""
+
+    __tablename__ = "video_checkpoints"
+
+    video_id = Column(
+        Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True
+    )
+    stage = Column(String(50), primary_key=True)
+    data = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP, default=func.now())
+
+    def __repr__(self):
+        return f"<VideoCheckpoint(video_id={self.video_id}, stage='{self.stage}')>"
+
+
+class SyncWatermark(Base):
+    """Tabela sync_watermarks - ate onde cada job incremental ja processou."""
+
+    __tablename__ = "sync_watermarks"
+
+    name = Column(String(100), primary_key=True)
+    watermark = Column(TIMESTAMP, nullable=False)
+    updated_at = Column(TIMESTAMP, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<SyncWatermark(name='{self.name}', watermark={self.watermark})>"
+
+
+class ApiUsage(Base):
+    """Tabela api_usage - tokens e custo de cada chamada a API Google."""
+
+    __tablename__ = "api_usage"
+
+    id = Column(
+        BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True
+    )
+    service = Column(String(20), nullable=False)
+    stage = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="SET NULL"))
+    route = Column(String(200))
+    prompt_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    total_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)
+    input_chars = Column(Integer, default=0)
+    estimated = Column(Boolean, default=False)
+    cost_usd = Column(Float, default=0.0)
+    latency_ms = Column(Float)
+    created_at = Column(TIMESTAMP, default=func.now())
+
+    def __repr__(self):
+        return f"<ApiUsage(stage='{self.stage}', model='{self.model}', tokens={self.total_tokens})>"
+
+
 # ============================================================================
 # PYDANTIC
 # ============================================================================
@@ -213,12 +272,24 @@ class CompilationAnalysis(BaseModel):
     )
 
 
+class ThemeOnlyCompilation(BaseModel):
+    """
+    Compilation parcial do classificador local de temas (sem o prompt): so
+    headline e temas. Os campos editoriais nao analisados ficam NULL no banco.
+    """
+
+    event_headline: str = Field(..., description="Primeira frase da narrativa")
+    compilation_themes: list[str] = Field(
+        default_factory=list, description="Temas da taxonomia de compilados"
+    )
+
+
 class FullVideoAnalysis(BaseModel):
     """Resultado completo com 3 analises (visual + narrativa + compilation)."""
 
     visual: VisualAnalysis
     narrative: NarrativeAnalysis
-    compilation: CompilationAnalysis
+    compilation: CompilationAnalysis | ThemeOnlyCompilation
 
     @property
     def duration_estimate(self) -> Optional[float]:
@@ -0,0 +1,116 @@
+"""
+TTLCache - Cache em memoria com expiracao, usado para respostas caras e
+consultadas com frequencia (ex: /stats do dashboard).
+
+- get_or_set() calcula o valor uma unica vez por chave expirada, mesmo com
+  varias threads pedindo ao mesmo tempo (as demais aguardam o resultado).
+  O lock da chave vive enquanto a chave estiver no cache (removido na
+  eviccao, no invalidate ou se a factory falhar sem valor gravado), entao
+  quem aguardava reaproveita o valor calculado.
+- Contadores de hit/miss por cache, agregados em cache_stats().
+"""
+
+import threading
+import time
+import weakref
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+# Caches ativos por nome (para observabilidade)
+_registry: "weakref.WeakValueDictionary[str, TTLCache]" = weakref.WeakValueDictionary()
+
+
+class TTLCache:
+    """Cache chave -> valor com TTL fixo e tamanho maximo."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        maxsize: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        _registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def _lookup(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # Remove a entrada que expira primeiro
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+                self._key_locks.pop(oldest, None)
+            self._data[key] = (self._clock() + self.ttl, value)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula via factory (uma vez por chave)."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Outra thread pode ter calculado enquanto aguardavamos
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > self._clock():
+                    return entry[1]
+            try:
+                value = factory()
+            except Exception:
+                # Sem valor gravado, o lock da chave nao deve sobreviver ao erro
+                with self._lock:
+                    if key not in self._data:
+                        self._key_locks.pop(key, None)
+                raise
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Remove uma chave (ou todas, se key=None)."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+                self._key_locks.clear()
+            else:
+                self._data.pop(key, None)
+                self._key_locks.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cache_stats() -> dict[str, dict]:
+    """Estatisticas de todos os caches ativos, por nome."""
+    return {name: cache.stats() for name, cache in list(_registry.items())}
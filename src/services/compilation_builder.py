@@ -0,0 +1,227 @@
+"""
+CompilationBuilder - Monta a lista de edicao de um compilado por tema.
+
+1. Vetor do tema: centroide do ThemeIndex (sem chamada de embedding) ou
+   embedding da descricao da taxonomia + texto livre opcional
+2. Busca na collection unificada filtrada pelo tema (payload index),
+   trazendo os vetores densos dos candidatos
+3. Duracao util de cada clip a partir de trim_in_ms/trim_out_ms (banco)
+4. MMR vetorizado sobre os embeddings reais: cada passo escolhe o clip com
+   maior lambda * relevancia - (1 - lambda) * similaridade maxima aos ja
+   escolhidos, entre os que ainda cabem no orcamento de duracao
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from src.compilation_themes import COMPILATION_THEMES
+from src.metrics import stage_timer
+from src.services.database_service import DatabaseService, VideoClipTrim
+from src.services.diversity import mmr, normalize
+from src.services.embedding_service import EmbeddingService
+from src.services.filter_planner import FilterPlanner
+from src.services.qdrant_service import QdrantService
+from src.services.theme_index import ThemeIndex
+
+logger = logging.getLogger(__name__)
+
+# O compilado pode passar do alvo em ate 5% para acomodar o ultimo clip
+DURATION_TOLERANCE = 0.05
+# Clips mais curtos que isso nao rendem no corte
+MIN_CLIP_MS = 1_000
+
+
+@dataclass
+class CompilationClip:
+    """Um corte da lista de edicao."""
+
+    order: int
+    video_id: int
+    filename: str
+    file_path: Optional[str]
+    trim_in_ms: int
+    trim_out_ms: int
+    duration_ms: int
+    money_shot_ms: Optional[int]
+    relevance: float
+    event_headline: Optional[str]
+    narration_suggestion: Optional[str]
+    emotional_tone: Optional[str]
+    camera_type: Optional[str]
+    audio_usability: Optional[str]
+
+
+@dataclass
+class CompilationPlan:
+    """Resultado do montador: clips em ordem de edicao e totais."""
+
+    theme: str
+    theme_description: str
+    target_duration_ms: int
+    total_duration_ms: int
+    candidates_considered: int
+    clips: list[CompilationClip] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+
+def clip_window_ms(video: VideoClipTrim) -> Optional[tuple[int, int]]:
+    """(trim_in, trim_out) do clip; sem trim valido usa o video inteiro."""
+    trim_in = video.trim_in_ms or 0
+    trim_out = video.trim_out_ms or 0
+    if trim_out - trim_in >= MIN_CLIP_MS:
+        return trim_in, trim_out
+    if video.duration_seconds and video.duration_seconds * 1000 >= MIN_CLIP_MS:
+        return 0, int(video.duration_seconds * 1000)
+    return None
+
+
+def select_with_budget(
+    vectors: np.ndarray,
+    relevance: np.ndarray,
+    durations_ms: np.ndarray,
+    target_ms: int,
+    lambda_: float = 0.7,
+    tolerance: float = DURATION_TOLERANCE,
+) -> list[int]:
+    """
+    MMR com orcamento de duracao (indices dos clips escolhidos, em ordem).
+
+    Args:
+        vectors: Embeddings normalizados (n x d)
+        relevance: Similaridade de cada clip com a query (n)
+        durations_ms: Duracao util de cada clip (n)
+        target_ms: Duracao alvo do compilado
+        lambda_: 1.0 = so relevancia, 0.0 = so diversidade
+    """
+    if len(relevance) == 0:
+        return []
+    return mmr(
+        vectors @ vectors.T,
+        relevance,
+        lambda_=lambda_,
+        costs=durations_ms,
+        budget=target_ms * (1 + tolerance),
+        target=target_ms,
+    )
+
+
+class CompilationBuilder:
+    """Seleciona e ordena clips de um tema para uma duracao alvo."""
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        embedding_service: EmbeddingService,
+        qdrant_service: QdrantService,
+        theme_index: Optional[ThemeIndex] = None,
+        filter_planner: Optional[FilterPlanner] = None,
+    ):
+        self.db = db_service
+        self.embedding = embedding_service
+        self.qdrant = qdrant_service
+        self.theme_index = theme_index
+        # Com planner, filtros SQL (event_date, tags...) tambem valem
+        self.search = filter_planner or qdrant_service
+
+    def build(
+        self,
+        theme: str,
+        target_duration_seconds: float,
+        filters: Optional[dict] = None,
+        query: Optional[str] = None,
+        lambda_: float = 0.7,
+        candidates: int = 300,
+    ) -> CompilationPlan:
+        """
+        Monta a lista de edicao.
+
+        Args:
+            theme: Codigo do tema (COMPILATION_THEMES)
+            target_duration_seconds: Duracao alvo do compilado
+            filters: Filtros da busca (mesmo formato de search_unified)
+            query: Texto livre somado a descricao do tema
+            lambda_: Peso da relevancia no MMR (1 - lambda_ = diversidade)
+            candidates: Clips do tema considerados
+
+        Raises:
+            ValueError: Tema fora da taxonomia
+        """
+        if theme not in COMPILATION_THEMES:
+            raise ValueError(f"Tema desconhecido: {theme}")
+        start = time.perf_counter()
+        description = COMPILATION_THEMES[theme]
+        target_ms = int(target_duration_seconds * 1000)
+        query_text = f"{description}. {query}" if query else description
+
+        # Sem texto livre o centroide do tema ja e a query
+        query_embedding = None
+        if not query and self.theme_index is not None:
+            query_embedding = self.theme_index.centroid(theme)
+        if query_embedding is None:
+            query_embedding = self.embedding.generate(query_text, stage="embedding_compilation")
+        hits = self.search.search_unified(
+            query_embedding=query_embedding,
+            limit=candidates,
+            filters={**(filters or {}), "compilation_theme": theme},
+            query_text=query_text,
+            with_vectors=True,
+        )
+        videos = self.db.get_videos_by_ids_dict(
+            [h["id"] for h in hits], projection=VideoClipTrim
+        )
+
+        usable = []
+        for hit in hits:
+            video = videos.get(hit["id"])
+            window = clip_window_ms(video) if video else None
+            if window and hit.get("vector") is not None:
+                usable.append((hit, video, window))
+
+        plan = CompilationPlan(
+            theme=theme,
+            theme_description=description,
+            target_duration_ms=target_ms,
+            total_duration_ms=0,
+            candidates_considered=len(usable),
+        )
+        if usable:
+            with stage_timer("compilation_select", candidates=len(usable)):
+                vectors = normalize(np.array([h["vector"] for h, _, _ in usable]))
+                # Relevancia como cosseno com a query (o score da busca pode ser RRF)
+                relevance = vectors @ normalize(query_embedding)
+                durations = np.array([w[1] - w[0] for _, _, w in usable])
+                order = select_with_budget(vectors, relevance, durations, target_ms, lambda_)
+
+            for position, index in enumerate(order, 1):
+                hit, video, (trim_in, trim_out) = usable[index]
+                plan.clips.append(
+                    CompilationClip(
+                        order=position,
+                        video_id=video.id,
+                        filename=video.filename,
+                        file_path=video.file_path,
+                        trim_in_ms=trim_in,
+                        trim_out_ms=trim_out,
+                        duration_ms=trim_out - trim_in,
+                        money_shot_ms=video.money_shot_ms,
+                        relevance=round(float(relevance[index]), 4),
+                        event_headline=video.event_headline,
+                        narration_suggestion=video.narration_suggestion,
+                        emotional_tone=video.emotional_tone,
+                        camera_type=video.camera_type,
+                        audio_usability=video.audio_usability,
+                    )
+                )
+            plan.total_duration_ms = sum(c.duration_ms for c in plan.clips)
+
+        plan.elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(
+            f"Compilado {theme}: {len(plan.clips)} clips, "
+            f"{plan.total_duration_ms / 1000:.1f}s de {target_duration_seconds:.0f}s "
+            f"({plan.candidates_considered} candidatos, {plan.elapsed_ms}ms)"
+        )
+        return plan
@@ -2,10 +2,172 @@
 ContextComposer - Compoe texto rico de todas as camadas de um video para embedding unificado.
 """
 
-from typing import Optional
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, Optional
 
 from src.compilation_themes import COMPILATION_THEMES
 
+# Colunas de Video lidas por compose_embedding_text / compose_lexical_text:
+# mudar qualquer uma exige novo embedding unificado (e novo vetor BM25)
+EMBEDDED_FIELDS = frozenset(
+    {
+        # Fonte
+        "source_description",
+        "category",
+        "filming_location",
+        "source_tags",
+        # Visual
+        "visual_description",
+        "visual_tags",
+        "objects_detected",
+        "visual_style",
+        "scenes",
+        # Narrativa
+        "narrative_description",
+        "narrative_tags",
+        "emotional_tone",
+        "themes",
+        "target_audience",
+        "key_moments",
+        # Audio
+        "audio_description",
+        "audio_transcript",
+        # Compilation
+        "event_headline",
+        "compilation_themes",
+        "camera_type",
+        "location_country",
+        "location_environment",
+        "narration_suggestion",
+        # Legado
+        "analysis_description",
+        "tags",
+        # Somente no texto lexical
+        "newsflare_id",
+        "filename",
+    }
+)
+
+# Campo do payload da collection unificada -> coluna de Video
+PAYLOAD_FIELDS = {
+    "video_id": "id",
+    "filename": "filename",
+    "category": "category",
+    "emotional_tone": "emotional_tone",
+    "intensity": "intensity",
+    "viral_potential": "viral_potential",
+    "is_exclusive": "is_exclusive",
+    "source": "source",
+    # Compilation
+    "camera_type": "camera_type",
+    "audio_usability": "audio_usability",
+    "compilation_themes": "compilation_themes",
+    "standalone_score": "standalone_score",
+    "visual_quality_score": "visual_quality_score",
+    "location_country": "location_country",
+    "location_environment": "location_environment",
+    "event_headline": "event_headline",
+}
+
+# Chaves de agrupamento da busca (group_by) -> campo keyword do payload
+GROUP_BY_FIELDS = {
+    "uploader": "group_uploader",
+    "newsflare_event": "group_newsflare_event",
+    "event": "group_event",
+}
+
+# Campo de agrupamento do payload -> coluna de Video de onde e derivado
+GROUP_KEY_COLUMNS = {
+    "group_uploader": "uploader",
+    "group_newsflare_event": "newsflare_id",
+    "group_event": "event_headline",
+}
+
+# Todos os campos do payload mantidos a partir do banco
+UNIFIED_PAYLOAD_KEYS = (*PAYLOAD_FIELDS, *GROUP_KEY_COLUMNS)
+
+# Prefixo do newsflare_id que identifica o evento (clips do mesmo upload
+# compartilham o trecho antes do primeiro "-" ou "_")
+NEWSFLARE_EVENT_PATTERN = re.compile(r"^[^-_]+")
+
+# Chave do event_headline: as EVENT_KEY_WORDS primeiras palavras com pelo
+# menos EVENT_KEY_MIN_WORD letras (numeros e palavras curtas ficam de fora)
+EVENT_KEY_MIN_WORD = 3
+EVENT_KEY_WORDS = 4
+
+
+def _fold(text: str) -> str:
+    """Minusculas e sem acentos."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def group_key(field: str, value, video_id: int) -> str:
+    """
+    Valor do campo de agrupamento (GROUP_KEY_COLUMNS) para a coluna de origem.
+
+    - uploader: nome sem caixa/acentos
+    - newsflare_event: prefixo do newsflare_id (NEWSFLARE_EVENT_PATTERN)
+    - event: as EVENT_KEY_WORDS primeiras palavras significativas do
+      event_headline, ordenadas. Headlines que abrem com o mesmo assunto
+      ("Flood hits Sao Paulo ..." com complementos diferentes) caem no mesmo
+      grupo; o mesmo evento descrito com outras palavras iniciais nao
+
+    Sem valor, o video forma um grupo proprio ("video:<id>"): o group query
+    do Qdrant descarta pontos sem o campo.
+    """
+    key = None
+    if value:
+        text = str(value).strip()
+        if field == "group_uploader":
+            key = _fold(text)
+        elif field == "group_newsflare_event":
+            match = NEWSFLARE_EVENT_PATTERN.match(text)
+            key = match.group(0) if match else None
+        elif field == "group_event":
+            words = []
+            for word in re.findall(r"\w+", _fold(text)):
+                if len(word) >= EVENT_KEY_MIN_WORD and not word.isdigit() and word not in words:
+                    words.append(word)
+            key = " ".join(sorted(words[:EVENT_KEY_WORDS]))
+    return key or f"video:{video_id}"
+
+
+@dataclass
+class ChangeImpact:
+    """O que uma alteracao de colunas exige na collection unificada."""
+
+    # Texto do embedding/BM25 mudou: novo vetor (job de re-embedding)
+    reembed: bool
+    # Algum campo do payload mudou: set_payload basta para filtros e resultados
+    payload: bool
+
+
+def change_impact(changed_fields: Iterable[str]) -> ChangeImpact:
+    """Classifica colunas alteradas de um video (ex: license_type nao afeta nada)."""
+    changed = set(changed_fields)
+    return ChangeImpact(
+        reembed=bool(changed & EMBEDDED_FIELDS),
+        payload=bool(
+            changed & (set(PAYLOAD_FIELDS.values()) | set(GROUP_KEY_COLUMNS.values()))
+        ),
+    )
+
+
+def payload_changes(changed_values: dict, video_id: int) -> dict:
+    """Campos do payload afetados por colunas alteradas ({coluna: valor novo})."""
+    payload = {
+        key: changed_values[column]
+        for key, column in PAYLOAD_FIELDS.items()
+        if column in changed_values
+    }
+    for key, column in GROUP_KEY_COLUMNS.items():
+        if column in changed_values:
+            payload[key] = group_key(key, changed_values[column], video_id)
+    return payload
+
 
 class ContextComposer:
     """
@@ -113,6 +275,29 @@ class ContextComposer:
 
         return ". ".join(parts) if parts else ""
 
+    def compose_lexical_text(self, video) -> str:
+        """
+        Texto do indice lexical (BM25) da busca hibrida: o mesmo texto do
+        embedding unificado mais identificadores que so fazem sentido em
+        busca exata (newsflare_id, nome do arquivo).
+        """
+        parts = [self.compose_embedding_text(video)]
+        if getattr(video, "newsflare_id", None):
+            parts.append(video.newsflare_id)
+        if getattr(video, "filename", None):
+            parts.append(video.filename)
+        return ". ".join(p for p in parts if p)
+
+    def compose_unified_payload(self, video) -> dict:
+        """Payload do ponto na collection unificada (filtros e campos de resultado)."""
+        payload = {key: getattr(video, column, None) for key, column in PAYLOAD_FIELDS.items()}
+        payload["is_exclusive"] = payload["is_exclusive"] or False
+        payload["source"] = payload["source"] or "local"
+        payload["compilation_themes"] = payload["compilation_themes"] or []
+        for key, column in GROUP_KEY_COLUMNS.items():
+            payload[key] = group_key(key, getattr(video, column, None), video.id)
+        return payload
+
     def compose_rag_context(self, video, score: float = 0.0) -> dict:
         """
         Monta dict com todo o contexto disponivel para gerar resposta RAG.
@@ -2,23 +2,243 @@
 DatabaseService - CRUD PostgreSQL para videos.
 """
 
+from dataclasses import dataclass, fields
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import String, cast, func, literal, or_, select, true, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
 
-from src.models import Video, VideoAnalysis, DualVideoAnalysis, FullVideoAnalysis
+from src.metrics import timed
+from src.models import (
+    CompilationAnalysis,
+    Video,
+    VideoAnalysis,
+    VideoCheckpoint,
+    DualVideoAnalysis,
+    FullVideoAnalysis,
+    SyncWatermark,
+)
+from src.services.db_engine import get_engine
+
+
+# Filtros de busca com coluna homonima em Video (campos do payload do Qdrant)
+SEARCH_EQUALITY_FILTERS = (
+    "category",
+    "is_exclusive",
+    "emotional_tone",
+    "source",
+    "camera_type",
+    "audio_usability",
+    "location_environment",
+)
+# Filtros {campo}_min / {campo}_max
+SEARCH_RANGE_FILTERS = ("intensity", "viral_potential", "standalone_score", "visual_quality_score")
+# Contem todas as tags (JSONB @>)
+SEARCH_TAG_FILTERS = ("visual_tags", "objects_detected", "narrative_tags")
+# Campos de facet que sao arrays JSONB (cada elemento conta)
+FACET_ARRAY_FIELDS = frozenset({"compilation_themes"})
+
+
+# ============================================================================
+# PROJECOES - subconjuntos de colunas de Video por caso de uso.
+# Evitam trazer JSONB pesados (scenes, key_moments, newsflare_metadata...)
+# quando a tela/endpoint so precisa de alguns campos. Os nomes dos campos
+# correspondem as colunas de Video.
+# ============================================================================
+
+
+@dataclass
+class VideoSummaryRow:
+    """Campos de listagem (VideoSummary da API, seletores)."""
+
+    id: int
+    filename: str
+    processing_status: Optional[str]
+    error_message: Optional[str]
+    emotional_tone: Optional[str]
+    category: Optional[str]
+    source: Optional[str]
+    created_at: Optional[datetime]
+
+
+@dataclass
+class VideoLibraryItem:
+    """Campos do card de video na biblioteca (pagina de Enriquecimento)."""
+
+    id: int
+    filename: str
+    file_path: Optional[str]
+    file_size_bytes: Optional[int]
+    duration_seconds: Optional[float]
+    processing_status: Optional[str]
+    error_message: Optional[str]
+    analysis_description: Optional[str]
+    tags: Optional[list]
+    emotional_tone: Optional[str]
+    intensity: Optional[float]
+    viral_potential: Optional[float]
+    themes: Optional[dict]
+    created_at: Optional[datetime]
+
+
+@dataclass
+class VideoFileInfo:
+    """Localizacao e dimensoes do arquivo."""
+
+    id: int
+    filename: str
+    file_path: Optional[str]
+    file_size_bytes: Optional[int]
+    duration_seconds: Optional[float]
+    mime_type: Optional[str]
+
+
+@dataclass
+class VideoRAGContext:
+    """Campos usados por ContextComposer.compose_rag_context."""
+
+    id: int
+    filename: str
+    file_path: Optional[str]
+    duration_seconds: Optional[float]
+    # Fonte
+    category: Optional[str]
+    filming_location: Optional[str]
+    source_description: Optional[str]
+    is_exclusive: Optional[bool]
+    # Visual
+    visual_description: Optional[str]
+    visual_tags: Optional[list]
+    # Narrativa
+    narrative_description: Optional[str]
+    emotional_tone: Optional[str]
+    intensity: Optional[float]
+    viral_potential: Optional[float]
+    themes: Optional[dict]
+    key_moments: Optional[list]
+    target_audience: Optional[str]
+    # Compilation
+    event_headline: Optional[str]
+    trim_in_ms: Optional[int]
+    trim_out_ms: Optional[int]
+    money_shot_ms: Optional[int]
+    camera_type: Optional[str]
+    audio_usability: Optional[str]
+    audio_usability_reason: Optional[str]
+    compilation_themes: Optional[list]
+    narration_suggestion: Optional[str]
+    location_country: Optional[str]
+    location_environment: Optional[str]
+    standalone_score: Optional[float]
+    visual_quality_score: Optional[float]
+    # Legado / audio
+    analysis_description: Optional[str]
+    tags: Optional[list]
+    audio_description: Optional[str]
+
+
+@dataclass
+class VideoClipTrim:
+    """Campos de edicao usados pelo montador de compilados."""
+
+    id: int
+    filename: str
+    file_path: Optional[str]
+    duration_seconds: Optional[float]
+    trim_in_ms: Optional[int]
+    trim_out_ms: Optional[int]
+    money_shot_ms: Optional[int]
+    event_headline: Optional[str]
+    narration_suggestion: Optional[str]
+    emotional_tone: Optional[str]
+    camera_type: Optional[str]
+    audio_usability: Optional[str]
+
+
+@dataclass
+class VideoThemeLabels:
+    """Temas do clip e sua origem (scores = classificador local, None = Gemini)."""
+
+    id: int
+    compilation_themes: Optional[list]
+    compilation_theme_scores: Optional[dict]
+
+
+@dataclass
+class VideoSourceMetadata:
+    """Metadata de fonte atual de um video (comparacao no sync em lote)."""
+
+    id: int
+    processing_status: Optional[str]
+    unified_embedding_id: Optional[str]
+    newsflare_id: Optional[str]
+    source: Optional[str]
+    source_description: Optional[str]
+    uploader: Optional[str]
+    event_date: Optional[datetime]
+    filming_location: Optional[str]
+    is_exclusive: Optional[bool]
+    category: Optional[str]
+    source_tags: Optional[list]
+    license_type: Optional[str]
+    newsflare_metadata: Optional[dict]
+
+
+@dataclass
+class VideoUnifiedPayload:
+    """Colunas do payload da collection unificada (ContextComposer.compose_unified_payload)."""
+
+    id: int
+    filename: str
+    category: Optional[str]
+    emotional_tone: Optional[str]
+    intensity: Optional[float]
+    viral_potential: Optional[float]
+    is_exclusive: Optional[bool]
+    source: Optional[str]
+    camera_type: Optional[str]
+    audio_usability: Optional[str]
+    compilation_themes: Optional[list]
+    standalone_score: Optional[float]
+    visual_quality_score: Optional[float]
+    location_country: Optional[str]
+    location_environment: Optional[str]
+    event_headline: Optional[str]
+    # Origem das chaves de agrupamento (group_key)
+    uploader: Optional[str]
+    newsflare_id: Optional[str]
+    updated_at: Optional[datetime]
+
+
+def projection_columns(projection: type) -> list:
+    """Colunas de Video correspondentes aos campos da projecao."""
+    return [getattr(Video, f.name) for f in fields(projection)]
 
 
 class DatabaseService:
     def __init__(self, db_url: str):
-        self.engine = create_engine(db_url)
+        self.engine = get_engine(db_url)
         self.SessionLocal = sessionmaker(bind=self.engine)
 
     def _session(self) -> Session:
         return self.SessionLocal()
 
+    @staticmethod
+    def _query(session: Session, projection: Optional[type]):
+        """Query de Video completo ou apenas das colunas da projecao."""
+        if projection is None:
+            return session.query(Video)
+        return session.query(*projection_columns(projection))
+
+    @staticmethod
+    def _results(rows, projection: Optional[type]) -> list[Any]:
+        if projection is None:
+            return rows
+        return [projection(**row._mapping) for row in rows]
+
     def create_video(
         self,
         filename: str,
@@ -40,6 +260,7 @@ class DatabaseService:
             session.refresh(video)
             return video
 
+    @timed("db_write_analysis")
     def update_analysis(
         self,
         video_id: int,
@@ -65,6 +286,7 @@ class DatabaseService:
             session.refresh(video)
             return video
 
+    @timed("db_write_analysis")
     def update_dual_analysis(
         self,
         video_id: int,
@@ -121,6 +343,7 @@ class DatabaseService:
             session.refresh(video)
             return video
 
+    @timed("db_write_analysis")
     def update_full_analysis(
         self,
         video_id: int,
@@ -152,20 +375,12 @@ class DatabaseService:
             video.storytelling_elements = analysis.narrative.storytelling_elements
             video.target_audience = analysis.narrative.target_audience
 
-            # Analise COMPILATION
-            video.event_headline = analysis.compilation.event_headline
-            video.trim_in_ms = analysis.compilation.trim_in_ms
-            video.trim_out_ms = analysis.compilation.trim_out_ms
-            video.money_shot_ms = analysis.compilation.money_shot_ms
-            video.camera_type = analysis.compilation.camera_type
-            video.audio_usability = analysis.compilation.audio_usability
-            video.audio_usability_reason = analysis.compilation.audio_usability_reason
-            video.compilation_themes = analysis.compilation.compilation_themes
-            video.narration_suggestion = analysis.compilation.narration_suggestion
-            video.location_country = analysis.compilation.location_country
-            video.location_environment = analysis.compilation.location_environment
-            video.standalone_score = analysis.compilation.standalone_score
-            video.visual_quality_score = analysis.compilation.visual_quality_score
+            # Analise COMPILATION (colunas com o nome dos campos). Com
+            # ThemeOnlyCompilation, os campos editoriais nao analisados ficam NULL
+            for name in CompilationAnalysis.model_fields:
+                setattr(video, name, getattr(analysis.compilation, name, None))
+            # Temas do Gemini; o processador regrava os scores se vieram do classificador
+            video.compilation_theme_scores = None
 
             # Campos combinados (legado/compatibilidade)
             video.analysis_description = (
@@ -192,28 +407,52 @@ class DatabaseService:
             session.refresh(video)
             return video
 
-    def set_error(self, video_id: int, error_message: str) -> None:
-        """Marca video como falho."""
+    # ========================================================================
+    # TRANSICOES DE STATUS (UPDATE direto, sem carregar a linha)
+    # ========================================================================
+
+    def _update_videos(self, ids: list[int], **values) -> int:
+        """UPDATE videos SET ... WHERE id IN (...). Retorna linhas afetadas."""
+        if not ids:
+            return 0
+        stmt = (
+            update(Video)
+            .where(Video.id.in_(ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
         with self._session() as session:
-            video = session.query(Video).filter(Video.id == video_id).one()
-            video.processing_status = "failed"
-            video.error_message = error_message
+            result = session.execute(stmt)
             session.commit()
+            return result.rowcount
+
+    def set_error(self, video_id: int, error_message: str) -> bool:
+        """Marca video como falho."""
+        return self.set_error_bulk([video_id], error_message) > 0
+
+    def set_error_bulk(self, video_ids: list[int], error_message: str) -> int:
+        """Marca varios videos como falhos com a mesma mensagem."""
+        return self._update_videos(
+            video_ids, processing_status="failed", error_message=error_message
+        )
 
-    def reset_to_pending(self, video_id: int) -> None:
+    def reset_to_pending(self, video_id: int) -> bool:
         """Reseta video para pending, limpando erro."""
-        with self._session() as session:
-            video = session.query(Video).filter(Video.id == video_id).one()
-            video.processing_status = "pending"
-            video.error_message = None
-            session.commit()
+        return self.reset_to_pending_bulk([video_id]) > 0
+
+    def reset_to_pending_bulk(self, video_ids: list[int]) -> int:
+        """Reseta varios videos para pending, limpando erro."""
+        return self._update_videos(
+            video_ids, processing_status="pending", error_message=None
+        )
 
-    def set_analyzing(self, video_id: int) -> None:
+    def set_analyzing(self, video_id: int) -> bool:
         """Marca video como em analise."""
-        with self._session() as session:
-            video = session.query(Video).filter(Video.id == video_id).one()
-            video.processing_status = "analyzing"
-            session.commit()
+        return self.set_analyzing_bulk([video_id]) > 0
+
+    def set_analyzing_bulk(self, video_ids: list[int]) -> int:
+        """Marca varios videos como em analise."""
+        return self._update_videos(video_ids, processing_status="analyzing")
 
     def get_video(self, video_id: int) -> Optional[Video]:
         with self._session() as session:
@@ -225,44 +464,58 @@ class DatabaseService:
                 session.query(Video).filter(Video.id.in_(ids)).all()
             )
 
-    def list_videos(self, status: Optional[str] = None) -> list[Video]:
+    def list_videos(
+        self,
+        status: Optional[str] = None,
+        projection: Optional[type] = None,
+    ) -> list[Any]:
+        """
+        Lista videos, do mais recente ao mais antigo.
+
+        Args:
+            status: Filtro opcional por status
+            projection: Dataclass de projecao (ex: VideoSummaryRow); None = Video completo
+        """
         with self._session() as session:
-            query = session.query(Video).order_by(Video.created_at.desc())
+            query = self._query(session, projection).order_by(Video.created_at.desc())
             if status:
                 query = query.filter(Video.processing_status == status)
-            return query.all()
+            return self._results(query.all(), projection)
 
     def get_stats(self) -> dict:
+        """
+        Contagens de videos por status e cobertura de metadata/unified
+        embedding, em uma unica consulta (COUNT ... FILTER).
+        """
+        status = Video.processing_status
         with self._session() as session:
-            total = session.query(Video).count()
-            analyzed = (
-                session.query(Video)
-                .filter(Video.processing_status == "analyzed")
-                .count()
-            )
-            pending = (
-                session.query(Video)
-                .filter(Video.processing_status == "pending")
-                .count()
-            )
-            failed = (
-                session.query(Video)
-                .filter(Video.processing_status == "failed")
-                .count()
-            )
-            return {
-                "total": total,
-                "analyzed": analyzed,
-                "pending": pending,
-                "failed": failed,
-            }
+            row = session.query(
+                func.count(Video.id),
+                func.count(Video.id).filter(status == "analyzed"),
+                func.count(Video.id).filter(status == "pending"),
+                func.count(Video.id).filter(status == "analyzing"),
+                func.count(Video.id).filter(status == "failed"),
+                func.count(Video.newsflare_id),
+                func.count(Video.unified_embedding_id),
+            ).one()
+        total, analyzed, pending, analyzing, failed, with_metadata, with_unified = row
+        return {
+            "total": total,
+            "analyzed": analyzed,
+            "pending": pending,
+            "analyzing": analyzing,
+            "failed": failed,
+            "with_metadata": with_metadata,
+            "with_unified_embedding": with_unified,
+        }
 
     def list_videos_paginated(
         self,
         page: int = 1,
         per_page: int = 10,
         status: Optional[str] = None,
-    ) -> tuple[list[Video], int]:
+        projection: Optional[type] = None,
+    ) -> tuple[list[Any], int]:
         """
         Lista videos com paginacao.
 
@@ -270,36 +523,239 @@ class DatabaseService:
             page: Numero da pagina (1-indexed)
             per_page: Itens por pagina
             status: Filtro opcional por status
+            projection: Dataclass de projecao (ex: VideoLibraryItem); None = Video completo
 
         Returns:
             Tupla (lista de videos, total de videos)
         """
         with self._session() as session:
-            query = session.query(Video).order_by(Video.created_at.desc())
+            query = self._query(session, projection).order_by(Video.created_at.desc())
+            count_query = session.query(Video.id)
             if status:
                 query = query.filter(Video.processing_status == status)
+                count_query = count_query.filter(Video.processing_status == status)
 
-            total = query.count()
+            total = count_query.count()
             offset = (page - 1) * per_page
-            videos = query.offset(offset).limit(per_page).all()
+            videos = self._results(query.offset(offset).limit(per_page).all(), projection)
 
             return videos, total
 
-    def get_videos_by_ids_dict(self, ids: list[int]) -> dict[int, Video]:
+    @staticmethod
+    def _apply_list_filters(
+        query,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        source: Optional[str] = None,
+        compilation_theme: Optional[str] = None,
+    ):
+        if status:
+            query = query.filter(Video.processing_status == status)
+        if category:
+            query = query.filter(Video.category == category)
+        if source:
+            query = query.filter(Video.source == source)
+        if compilation_theme:
+            # JSONB @> '["theme"]' (indice GIN idx_videos_compilation_themes)
+            query = query.filter(Video.compilation_themes.contains([compilation_theme]))
+        return query
+
+    @staticmethod
+    def _apply_search_filters(query, filters: dict):
+        """
+        Filtros de busca (SearchFilters) como predicados SQL: os mesmos do
+        payload do Qdrant e os que so existem no banco (event_date, uploader,
+        tags). Chaves desconhecidas sao ignoradas.
+        """
+        for key in SEARCH_EQUALITY_FILTERS:
+            if filters.get(key) not in (None, ""):
+                query = query.filter(getattr(Video, key) == filters[key])
+        for key in SEARCH_RANGE_FILTERS:
+            if filters.get(f"{key}_min") is not None:
+                query = query.filter(getattr(Video, key) >= filters[f"{key}_min"])
+            if filters.get(f"{key}_max") is not None:
+                query = query.filter(getattr(Video, key) <= filters[f"{key}_max"])
+        theme = filters.get("compilation_theme")
+        if theme:
+            themes = theme if isinstance(theme, list) else [theme]
+            query = query.filter(or_(*[Video.compilation_themes.contains([t]) for t in themes]))
+        if filters.get("event_date_from") is not None:
+            query = query.filter(Video.event_date >= filters["event_date_from"])
+        if filters.get("event_date_to") is not None:
+            query = query.filter(Video.event_date <= filters["event_date_to"])
+        if filters.get("uploader"):
+            query = query.filter(Video.uploader == filters["uploader"])
+        # JSONB @> '[...]': contem todas as tags (indices GIN da migration 003)
+        for key in SEARCH_TAG_FILTERS:
+            if filters.get(key):
+                query = query.filter(getattr(Video, key).contains(filters[key]))
+        return query
+
+    def filter_video_ids(
+        self,
+        filters: dict,
+        ids: Optional[list[int]] = None,
+        limit: Optional[int] = None,
+    ) -> list[int]:
+        """
+        IDs dos videos indexados (com embedding unificado) que passam nos filtros.
+
+        Args:
+            filters: Filtros de busca (ver _apply_search_filters)
+            ids: Restringe a estes IDs (pos-filtro de resultados da busca)
+            limit: Maximo de IDs (ordem de id)
+        """
+        with self._session() as session:
+            query = self._apply_search_filters(
+                session.query(Video.id).filter(Video.unified_embedding_id.isnot(None)), filters
+            )
+            if ids is not None:
+                if not ids:
+                    return []
+                query = query.filter(Video.id.in_(ids))
+            query = query.order_by(Video.id)
+            if limit is not None:
+                query = query.limit(limit)
+            return [row.id for row in query.all()]
+
+    def count_filtered_videos(self, filters: dict) -> int:
+        """Conta videos indexados que passam nos filtros de _apply_search_filters."""
+        with self._session() as session:
+            return self._apply_search_filters(
+                session.query(Video.id).filter(Video.unified_embedding_id.isnot(None)), filters
+            ).count()
+
+    def facet_counts(self, fields: list[str], filters: dict) -> tuple[int, dict[str, dict[str, int]]]:
+        """
+        Contagem dos videos indexados por valor de cada campo, com os filtros
+        de busca, numa unica consulta (UNION ALL de GROUP BY sobre uma CTE).
+        compilation_themes conta cada tema do array.
+
+        Returns:
+            (total de videos filtrados, {campo: {valor: contagem}})
+        """
+        columns = [getattr(Video, f) for f in fields]
+        filtered = self._apply_search_filters(
+            select(Video.id, *columns).where(Video.unified_embedding_id.isnot(None)), filters
+        ).cte("filtered")
+
+        parts = [
+            select(
+                literal("").label("field"),
+                cast(literal(None), String).label("value"),
+                func.count().label("n"),
+            ).select_from(filtered)
+        ]
+        for name in fields:
+            if name in FACET_ARRAY_FIELDS:
+                unnest = (
+                    func.json_each if self.engine.dialect.name == "sqlite" else func.jsonb_array_elements_text
+                )(filtered.c[name]).table_valued("value")
+                value = unnest.c.value
+                source = filtered.join(unnest, true())
+            else:
+                value = filtered.c[name]
+                source = filtered
+            parts.append(
+                select(literal(name), cast(value, String), func.count())
+                .select_from(source)
+                .where(value.isnot(None))
+                .group_by(value)
+            )
+
+        with self._session() as session:
+            rows = session.execute(union_all(*parts)).all()
+        total = 0
+        counts: dict[str, dict[str, int]] = {name: {} for name in fields}
+        for field, value, n in rows:
+            if field == "":
+                total = n
+            else:
+                counts[field][value] = n
+        return total, counts
+
+    def list_videos_keyset(
+        self,
+        limit: int = 50,
+        after: Optional[tuple[datetime, int]] = None,
+        projection: Optional[type] = VideoSummaryRow,
+        **filters,
+    ) -> tuple[list[Any], bool]:
+        """
+        Lista videos por keyset (created_at DESC, id DESC), sem OFFSET.
+
+        Args:
+            limit: Itens por pagina
+            after: (created_at, id) do ultimo item da pagina anterior
+            projection: Dataclass de projecao; None = Video completo
+            **filters: status, category, source, compilation_theme
+
+        Returns:
+            Tupla (videos da pagina, has_more)
+        """
+        with self._session() as session:
+            query = self._apply_list_filters(self._query(session, projection), **filters)
+            if after is not None:
+                query = query.filter(tuple_(Video.created_at, Video.id) < tuple_(*after))
+            rows = (
+                query.order_by(Video.created_at.desc(), Video.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+        has_more = len(rows) > limit
+        return self._results(rows[:limit], projection), has_more
+
+    def list_indexed_changed_since(
+        self,
+        since: Optional[datetime] = None,
+        after_id: Optional[int] = None,
+        limit: int = 500,
+        projection: Optional[type] = None,
+    ) -> list[Any]:
+        """
+        Videos com embedding unificado e updated_at >= since, paginados por id
+        (paginar por updated_at perderia linhas com o mesmo timestamp).
+
+        Args:
+            since: updated_at minimo (None = todos)
+            after_id: Ultimo id da pagina anterior
+            limit: Tamanho da pagina
+            projection: Dataclass de projecao (ex: VideoUnifiedPayload)
+        """
+        with self._session() as session:
+            query = self._query(session, projection).filter(Video.unified_embedding_id.isnot(None))
+            if since is not None:
+                query = query.filter(Video.updated_at >= since)
+            if after_id is not None:
+                query = query.filter(Video.id > after_id)
+            rows = query.order_by(Video.id).limit(limit).all()
+        return self._results(rows, projection)
+
+    def count_videos(self, **filters) -> int:
+        """Conta videos com os mesmos filtros de list_videos_keyset."""
+        with self._session() as session:
+            return self._apply_list_filters(session.query(Video.id), **filters).count()
+
+    def get_videos_by_ids_dict(
+        self,
+        ids: list[int],
+        projection: Optional[type] = None,
+    ) -> dict[int, Any]:
         """
         Busca multiplos videos por ID e retorna como dicionario.
 
         Args:
             ids: Lista de IDs dos videos
+            projection: Dataclass de projecao (ex: VideoRAGContext); None = Video completo
 
         Returns:
-            Dicionario {video_id: Video}
+            Dicionario {video_id: Video ou projecao}
         """
         if not ids:
             return {}
         with self._session() as session:
-            videos = session.query(Video).filter(Video.id.in_(ids)).all()
-            return {v.id: v for v in videos}
+            rows = self._query(session, projection).filter(Video.id.in_(ids)).all()
+            return {v.id: v for v in self._results(rows, projection)}
 
     def get_video_by_newsflare_id(self, newsflare_id: str) -> Optional[Video]:
         """Busca video pelo newsflare_id."""
@@ -310,6 +766,18 @@ class DatabaseService:
                 .first()
             )
 
+    def get_video_ids_by_newsflare_ids(self, newsflare_ids: list[str]) -> dict[str, int]:
+        """Mapeia newsflare_id -> video_id (IDs desconhecidos ficam de fora)."""
+        if not newsflare_ids:
+            return {}
+        with self._session() as session:
+            rows = (
+                session.query(Video.newsflare_id, Video.id)
+                .filter(Video.newsflare_id.in_(set(newsflare_ids)))
+                .all()
+            )
+            return {newsflare_id: video_id for newsflare_id, video_id in rows}
+
     def delete_video(self, video_id: int) -> bool:
         """Remove video do banco de dados. Retorna True se deletou."""
         with self._session() as session:
@@ -332,12 +800,65 @@ class DatabaseService:
             session.refresh(video)
             return video
 
-    def update_unified_embedding(self, video_id: int, embedding_id: str) -> None:
+    def update_source_metadata_bulk(self, updates: dict[int, dict]) -> int:
+        """
+        Aplica metadata de fonte de varios videos em uma unica ida ao banco
+        (UPDATE por chave primaria em executemany; cada video pode trazer
+        colunas diferentes). Valores None sao ignorados, como no update unitario.
+
+        Args:
+            updates: {video_id: {coluna: valor}}
+        """
+        rows = [
+            {"id": video_id, **{k: v for k, v in values.items() if v is not None}}
+            for video_id, values in updates.items()
+        ]
+        rows = [row for row in rows if len(row) > 1]
+        if not rows:
+            return 0
+        with self._session() as session:
+            session.execute(update(Video), rows)
+            session.commit()
+        return len(rows)
+
+    def update_theme_scores(
+        self,
+        video_id: int,
+        scores: dict[str, float],
+        themes: Optional[list[str]] = None,
+    ) -> bool:
+        """Grava os scores do classificador local de temas (e os temas, se dados)."""
+        values = {"compilation_theme_scores": scores}
+        if themes is not None:
+            values["compilation_themes"] = themes
+        return self._update_videos([video_id], **values) > 0
+
+    @timed("db_write_embedding_id")
+    def update_unified_embedding(self, video_id: int, embedding_id: str) -> bool:
         """Atualiza o unified_embedding_id de um video."""
+        return self._update_videos([video_id], unified_embedding_id=embedding_id) > 0
+
+    @timed("db_write_embedding_id")
+    def update_unified_embeddings(self, embedding_ids: dict[int, str]) -> int:
+        """
+        Atualiza unified_embedding_id de varios videos em uma unica ida ao banco
+        (UPDATE por chave primaria em executemany).
+
+        Args:
+            embedding_ids: {video_id: embedding_id}
+        """
+        if not embedding_ids:
+            return 0
         with self._session() as session:
-            video = session.query(Video).filter(Video.id == video_id).one()
-            video.unified_embedding_id = embedding_id
+            session.execute(
+                update(Video),
+                [
+                    {"id": video_id, "unified_embedding_id": emb_id}
+                    for video_id, emb_id in embedding_ids.items()
+                ],
+            )
             session.commit()
+        return len(embedding_ids)
 
     def count_with_metadata(self) -> int:
         """Conta videos que possuem metadata de fonte (newsflare_id preenchido)."""
@@ -356,3 +877,70 @@ class DatabaseService:
                 .filter(Video.unified_embedding_id.isnot(None))
                 .count()
             )
+
+    # ========================================================================
+    # CHECKPOINTS DE PROCESSAMENTO
+    # ========================================================================
+
+    @timed("db_write_checkpoint")
+    def save_checkpoint(self, video_id: int, stage: str, data: dict) -> None:
+        """Persiste (ou substitui) a saida de uma etapa do processamento."""
+        # SQLite (testes/benchmarks) tem o mesmo ON CONFLICT DO UPDATE
+        insert = sqlite_insert if self.engine.dialect.name == "sqlite" else pg_insert
+        stmt = insert(VideoCheckpoint).values(
+            video_id=video_id, stage=stage, data=data
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VideoCheckpoint.video_id, VideoCheckpoint.stage],
+            set_={"data": stmt.excluded.data, "created_at": datetime.utcnow()},
+        )
+        with self._session() as session:
+            session.execute(stmt)
+            session.commit()
+
+    def get_checkpoints(self, video_id: int) -> dict[str, dict]:
+        """Retorna {stage: data} com as etapas ja concluidas de um video."""
+        with self._session() as session:
+            rows = (
+                session.query(VideoCheckpoint.stage, VideoCheckpoint.data)
+                .filter(VideoCheckpoint.video_id == video_id)
+                .all()
+            )
+            return {stage: data for stage, data in rows}
+
+    def clear_checkpoints(self, video_id: int) -> None:
+        """Remove todos os checkpoints de um video (processamento concluido)."""
+        with self._session() as session:
+            session.query(VideoCheckpoint).filter(
+                VideoCheckpoint.video_id == video_id
+            ).delete(synchronize_session=False)
+            session.commit()
+
+    # ========================================================================
+    # WATERMARKS DE JOBS INCREMENTAIS
+    # ========================================================================
+
+    def get_watermark(self, name: str) -> Optional[datetime]:
+        """Ultimo updated_at processado pelo job (None = nunca rodou)."""
+        with self._session() as session:
+            row = session.get(SyncWatermark, name)
+            return row.watermark if row else None
+
+    def set_watermark(self, name: str, watermark: datetime) -> None:
+        insert = sqlite_insert if self.engine.dialect.name == "sqlite" else pg_insert
+        stmt = insert(SyncWatermark).values(name=name, watermark=watermark)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SyncWatermark.name],
+            set_={"watermark": stmt.excluded.watermark, "updated_at": datetime.utcnow()},
+        )
+        with self._session() as session:
+            session.execute(stmt)
+            session.commit()
+
+    def clear_watermark(self, name: str) -> None:
+        """Proxima execucao do job volta a varrer tudo."""
+        with self._session() as session:
+            session.query(SyncWatermark).filter(SyncWatermark.name == name).delete(
+                synchronize_session=False
+            )
+            session.commit()
@@ -0,0 +1,140 @@
+"""
+Engine SQLAlchemy compartilhado pelo processo.
+
+DatabaseService, QueueService e UsageService (e as paginas Streamlit) obtem o
+engine por get_engine(db_url): um unico pool por URL, com tamanho, overflow,
+pre-ping, recycle e statement_timeout configuraveis. O pool mede o tempo de
+aquisicao de conexoes para expor esperas em pool_stats().
+"""
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    """Estado e esperas do pool de conexoes de um engine."""
+
+    size: int
+    checked_out: int
+    overflow: int
+    checked_in: int
+    acquisitions: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    timeouts: int
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que contabiliza o tempo gasto para obter cada conexao."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.acquisitions = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            logger.warning(f"Pool de conexoes esgotado: {self.status()}")
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.acquisitions += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recria o pool; os contadores seguem no novo pool
+        pool = super().recreate()
+        pool.acquisitions = self.acquisitions
+        pool.wait_seconds_total = self.wait_seconds_total
+        pool.wait_seconds_max = self.wait_seconds_max
+        pool.timeouts = self.timeouts
+        return pool
+
+    def stats(self) -> PoolStats:
+        with self._stats_lock:
+            return PoolStats(
+                size=self.size(),
+                checked_out=self.checkedout(),
+                overflow=max(0, self.overflow()),
+                checked_in=self.checkedin(),
+                acquisitions=self.acquisitions,
+                wait_seconds_total=round(self.wait_seconds_total, 4),
+                wait_seconds_max=round(self.wait_seconds_max, 4),
+                timeouts=self.timeouts,
+            )
+
+
+_lock = threading.Lock()
+_engines: dict[str, Engine] = {}
+
+
+def _engine_options(db_url: str) -> dict:
+    url = make_url(db_url)
+    if url.get_backend_name() != "postgresql":
+        # SQLite (testes/scripts locais): pool padrao do dialeto
+        return {}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if settings.db_statement_timeout_ms > 0:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        }
+    return options
+
+
+def get_engine(db_url: str) -> Engine:
+    """Retorna o engine compartilhado para a URL (criado na primeira chamada)."""
+    with _lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url, **_engine_options(db_url))
+            _engines[db_url] = engine
+        return engine
+
+
+def pool_stats() -> dict[str, dict]:
+    """Estatisticas por engine, com a URL sem senha como chave."""
+    with _lock:
+        engines = dict(_engines)
+    stats = {}
+    for engine in engines.values():
+        if isinstance(engine.pool, TimedQueuePool):
+            name = engine.url.render_as_string(hide_password=True)
+            stats[name] = asdict(engine.pool.stats())
+    return stats
+
+
+def dispose_engines() -> None:
+    """Fecha todas as conexoes e descarta os engines (shutdown/testes)."""
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,184 @@
+"""
+Diversificacao de resultados sobre os vetores densos dos candidatos.
+
+A busca traz os vetores junto com os pontos (search_unified(with_vectors=True));
+a matriz de similaridade entre candidatos e um unico produto de matrizes e as
+selecoes abaixo sao gulosas e vetorizadas em NumPy (sem lacos par a par).
+
+- MMR: a cada passo escolhe o item com maior
+  lambda * relevancia - (1 - lambda) * similaridade maxima aos ja escolhidos.
+  Aceita custo por item e orcamento (ex: duracao de clips num compilado).
+- DPP: MAP guloso de um determinantal point process com kernel
+  L = diag(q) S diag(q), q = exp(alpha * relevancia), via Cholesky incremental
+  (Chen et al., 2018). Penaliza redundancia com o conjunto todo, nao so
+  com o vizinho mais parecido.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from src.metrics import stage_timer
+
+DIVERSIFY_MMR = "mmr"
+DIVERSIFY_DPP = "dpp"
+DIVERSIFY_METHODS = (DIVERSIFY_MMR, DIVERSIFY_DPP)
+
+# Ganho marginal abaixo disso = o item nao acrescenta nada ao conjunto (DPP)
+_DPP_EPSILON = 1e-10
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza as linhas (ou o vetor) para norma 1; vetores nulos ficam nulos."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def similarity_matrix(vectors: np.ndarray) -> np.ndarray:
+    """Similaridade de cosseno entre todos os pares (n x n)."""
+    unit = normalize(vectors)
+    return unit @ unit.T
+
+
+def mmr(
+    similarity: np.ndarray,
+    relevance: np.ndarray,
+    k: Optional[int] = None,
+    lambda_: float = 0.7,
+    costs: Optional[np.ndarray] = None,
+    budget: Optional[float] = None,
+    target: Optional[float] = None,
+) -> list[int]:
+    """
+    Maximal Marginal Relevance guloso (indices em ordem de selecao).
+
+    Args:
+        similarity: Similaridade entre candidatos (n x n)
+        relevance: Relevancia de cada candidato para a query (n)
+        k: Maximo de itens escolhidos (None = sem limite)
+        lambda_: 1.0 = so relevancia, 0.0 = so diversidade
+        costs: Custo de cada item (ex: duracao); requer budget
+        budget: Soma maxima dos custos escolhidos
+        target: Para assim que a soma dos custos atinge este valor
+    """
+    n = len(relevance)
+    k = n if k is None else min(k, n)
+    costs = np.zeros(n) if costs is None else np.asarray(costs, dtype=float)
+    budget = np.inf if budget is None else budget
+    target = np.inf if target is None else target
+
+    max_similarity = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    selected: list[int] = []
+    spent = 0.0
+
+    while len(selected) < k and spent < target:
+        candidates = available & (costs <= budget - spent)
+        if not candidates.any():
+            break
+        # Antes da primeira escolha nao ha redundancia a penalizar
+        scores = lambda_ * relevance - (1 - lambda_) * max_similarity
+        best = int(np.argmax(np.where(candidates, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        spent += costs[best]
+        max_similarity = (
+            similarity[best] if len(selected) == 1 else np.maximum(max_similarity, similarity[best])
+        )
+    return selected
+
+
+def dpp(
+    similarity: np.ndarray,
+    relevance: np.ndarray,
+    k: int,
+    lambda_: float = 0.7,
+) -> list[int]:
+    """
+    MAP guloso de DPP (indices em ordem de selecao).
+
+    lambda_ tem o mesmo sentido do MMR: o peso da relevancia no kernel e
+    alpha = lambda_ / (2 * (1 - lambda_)).
+    """
+    n = len(relevance)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    alpha = lambda_ / (2 * max(1 - lambda_, 1e-6))
+    # Relevancia centrada evita overflow de exp() com lambda_ perto de 1
+    quality = np.exp(alpha * (relevance - relevance.max()))
+    kernel = quality[:, None] * similarity * quality[None, :]
+
+    # Fatores de Cholesky incrementais e ganho marginal (log-det) de cada item
+    factors = np.zeros((k, n))
+    gains = np.diag(kernel).astype(float).copy()
+    selected: list[int] = []
+    best = int(np.argmax(gains))
+
+    while True:
+        selected.append(best)
+        if len(selected) == k:
+            break
+        row = len(selected) - 1
+        e = (kernel[best] - factors[:row, best] @ factors[:row]) / np.sqrt(gains[best])
+        factors[row] = e
+        gains = gains - e**2
+        gains[selected] = -np.inf
+        best = int(np.argmax(gains))
+        if gains[best] < _DPP_EPSILON:
+            break
+    return selected
+
+
+def diversify(
+    candidates: list[dict],
+    query_embedding: list[float],
+    top_k: int,
+    method: str = DIVERSIFY_MMR,
+    lambda_: float = 0.7,
+    relevance_key: Optional[str] = None,
+) -> list[dict]:
+    """
+    Escolhe top_k candidatos relevantes e pouco redundantes entre si.
+
+    Args:
+        candidates: Resultados de search_unified(with_vectors=True)
+        query_embedding: Embedding da query (relevancia por cosseno)
+        top_k: Quantidade retornada
+        method: "mmr" ou "dpp"
+        lambda_: Peso da relevancia (1 - lambda_ = diversidade)
+        relevance_key: Usa este campo do candidato (ex: "rerank_score")
+            como relevancia, normalizado no conjunto, em vez do cosseno
+
+    Returns:
+        Candidatos escolhidos em ordem de selecao, sem o campo "vector".
+        Candidatos sem vetor ficam no fim, na ordem original.
+    """
+    if method not in DIVERSIFY_METHODS:
+        raise ValueError(f"Metodo de diversificacao invalido: {method} (use mmr, dpp)")
+    with_vector = [c for c in candidates if c.get("vector") is not None]
+    without_vector = [c for c in candidates if c.get("vector") is None]
+
+    selected: list[dict] = []
+    if with_vector:
+        with stage_timer(f"diversify_{method}", candidates=len(with_vector)):
+            vectors = normalize(np.array([c["vector"] for c in with_vector]))
+            similarity = vectors @ vectors.T
+            if relevance_key:
+                relevance = np.array([c[relevance_key] for c in with_vector], dtype=float)
+                span = relevance.max() - relevance.min()
+                relevance = (relevance - relevance.min()) / span if span > 0 else np.ones_like(relevance)
+            else:
+                relevance = vectors @ normalize(query_embedding)
+            if method == DIVERSIFY_DPP:
+                order = dpp(similarity, relevance, top_k, lambda_)
+            else:
+                order = mmr(similarity, relevance, top_k, lambda_)
+        selected = [with_vector[i] for i in order]
+
+    # DPP pode parar antes de top_k quando os restantes sao redundantes
+    chosen = {id(c) for c in selected}
+    remaining = [c for c in with_vector if id(c) not in chosen] + without_vector
+    selected += remaining[: max(top_k - len(selected), 0)]
+    return [{k: v for k, v in c.items() if k != "vector"} for c in selected]
@@ -7,9 +7,16 @@ import time
 from dataclasses import dataclass
 from typing import Optional
 
-from google import genai
-
+from src.metrics import stage_timer
 from src.models import VideoAnalysis, DualVideoAnalysis, FullVideoAnalysis, VisualAnalysis, NarrativeAnalysis
+from src.services.google_client import (
+    ApiVersionSelector,
+    get_genai_client,
+    is_version_error,
+    version_selector,
+)
+from src.services.rate_limiter import ENDPOINT_EMBED, RateLimiter, get_rate_limiter
+from src.services.usage_service import UsageService
 
 logger = logging.getLogger(__name__)
 
@@ -22,45 +29,67 @@ class DualEmbeddings:
 
 
 class EmbeddingService:
-    def __init__(self, api_key: str, model: str, dimensions: int):
-        self.client_v1 = genai.Client(api_key=api_key, http_options={'api_version': 'v1'})
-        self.client_default = genai.Client(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        dimensions: int,
+        usage_service: Optional[UsageService] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        versions: Optional[ApiVersionSelector] = None,
+    ):
+        self.api_key = api_key
         self.model = model
         self.dimensions = dimensions
-
-    def _try_embed(self, client, model: str, text: str) -> list[float]:
-        result = client.models.embed_content(
-            model=model,
-            contents=text,
-            config={"output_dimensionality": self.dimensions},
-        )
+        self.usage = usage_service
+        self.limiter = rate_limiter or get_rate_limiter()
+        self.versions = versions or version_selector
+
+    def _try_embed(self, client, model: str, text: str, stage: str = "embedding") -> list[float]:
+        start = time.perf_counter()
+        with stage_timer(stage, model=model, input_chars=len(text)):
+            result = client.models.embed_content(
+                model=model,
+                contents=text,
+                config={"output_dimensionality": self.dimensions},
+            )
+        if self.usage is not None:
+            self.usage.record_embedding(
+                stage, model, text, result, (time.perf_counter() - start) * 1000
+            )
         return result.embeddings[0].values
 
-    def generate(self, text: str) -> list[float]:
-        """Gera embedding com retries em diferentes API versions."""
-        attempts = [
-            (self.client_default, self.model),
-            (self.client_v1, self.model),
-            (self.client_default, self.model),  # retry default
-            (self.client_v1, self.model),        # retry v1
-        ]
+    def generate(self, text: str, stage: str = "embedding_query") -> list[float]:
+        """
+        Gera embedding usando a API version que funcionou por ultimo para o
+        modelo; outra versao so e tentada se esta rejeitar o modelo (400/404).
+        Erros de quota (429) e 5xx sao tratados pelo rate limiter compartilhado,
+        que aguarda no bucket em vez de dormir nesta thread.
+
+        Args:
+            text: Texto a ser embedado
+            stage: Etapa registrada na contabilidade de uso
+        """
         last_error = None
-        for i, (client, model) in enumerate(attempts):
+        for version in self.versions.ordered(self.model):
+            client = get_genai_client(self.api_key, version)
             try:
-                result = self._try_embed(client, model, text)
-                if i > 0:
-                    logger.info(f"Embedding succeeded on attempt {i + 1}")
-                return result
+                result = self.limiter.call(
+                    ENDPOINT_EMBED, self.model, self._try_embed, client, self.model, text, stage
+                )
             except Exception as e:
+                if not is_version_error(e):
+                    raise
                 last_error = e
-                wait = min(2 ** i, 4)
-                logger.warning(f"Embedding attempt {i + 1} failed ({model}): {e}. Retrying in {wait}s...")
-                time.sleep(wait)
+                logger.warning(f"Embedding failed on API version {version or 'default'} ({self.model}): {e}")
+                continue
+            self.versions.record_success(self.model, version)
+            return result
         raise last_error
 
     def generate_unified(self, composed_text: str) -> list[float]:
         """Gera embedding unificado a partir de texto ja composto pelo ContextComposer."""
-        return self.generate(composed_text)
+        return self.generate(composed_text, stage="embedding_unified")
 
     def generate_for_visual(self, analysis: VisualAnalysis) -> list[float]:
         """Gera embedding para analise VISUAL."""
@@ -84,7 +113,7 @@ class EmbeddingService:
                 parts.append("Cenas: " + "; ".join(scene_descriptions))
 
         combined_text = ". ".join(parts)
-        return self.generate(combined_text)
+        return self.generate(combined_text, stage="embedding_visual")
 
     def generate_for_narrative(self, analysis: NarrativeAnalysis) -> list[float]:
         """Gera embedding para analise NARRATIVA."""
@@ -109,7 +138,7 @@ class EmbeddingService:
                 parts.append("Momentos: " + "; ".join(moments))
 
         combined_text = ". ".join(parts)
-        return self.generate(combined_text)
+        return self.generate(combined_text, stage="embedding_narrative")
 
     def generate_dual(self, analysis: DualVideoAnalysis | FullVideoAnalysis) -> DualEmbeddings:
         """Gera embeddings para ambas as analises (visual + narrativa)."""
@@ -139,4 +168,4 @@ class EmbeddingService:
                 parts.append("Momentos: " + "; ".join(moments))
 
         combined_text = ". ".join(parts)
-        return self.generate(combined_text)
+        return self.generate(combined_text, stage="embedding_legacy")
@@ -0,0 +1,142 @@
+"""
+FacetService - Contagens por valor (category, camera_type, ...) para a busca.
+
+O caminho depende da busca:
+
+- com query: conta os campos no payload dos top_k resultados da mesma busca
+  do /search (uma chamada ao Qdrant)
+- so filtros de payload: facet API do Qdrant sobre os indices keyword da
+  collection unificada (um campo por chamada, em paralelo, + count exato)
+- algum filtro que so existe no Postgres (event_date, uploader, tags): uma
+  consulta de GROUP BY sobre as colunas indexadas (DatabaseService.facet_counts)
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.metrics import stage_timer
+from src.services.database_service import DatabaseService
+from src.services.filter_planner import FilterPlanner, split_filters
+from src.services.qdrant_service import QdrantService
+
+logger = logging.getLogger(__name__)
+
+# Campos keyword com payload index na collection unificada
+FACET_FIELDS = (
+    "category",
+    "camera_type",
+    "emotional_tone",
+    "compilation_themes",
+    "audio_usability",
+    "location_environment",
+    "source",
+)
+
+BACKEND_QUERY = "query"
+BACKEND_QDRANT = "qdrant"
+BACKEND_POSTGRES = "postgres"
+
+
+@dataclass
+class FacetValue:
+    value: str
+    count: int
+
+
+@dataclass
+class FacetResult:
+    """Contagens de cada campo e de onde vieram."""
+
+    # Videos considerados (filtrados, ou resultados da query)
+    total: int
+    backend: str
+    facets: dict[str, list[FacetValue]] = field(default_factory=dict)
+
+
+def top_values(counts: dict[str, int], limit: int) -> list[FacetValue]:
+    """Valores mais frequentes primeiro (empate em ordem alfabetica)."""
+    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return [FacetValue(value=value, count=count) for value, count in ordered[:limit]]
+
+
+def count_payload_values(hits: list[dict], fields: list[str]) -> dict[str, dict[str, int]]:
+    """Conta os valores de cada campo no payload dos resultados (arrays contam cada item)."""
+    counts = {name: Counter() for name in fields}
+    for hit in hits:
+        payload = hit.get("payload") or {}
+        for name in fields:
+            value = payload.get(name)
+            values = value if isinstance(value, list) else [value]
+            counts[name].update(str(v) for v in values if v not in (None, ""))
+    return {name: dict(counter) for name, counter in counts.items()}
+
+
+class FacetService:
+    """Calcula facets para a query e os filtros atuais."""
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        qdrant_service: QdrantService,
+        filter_planner: Optional[FilterPlanner] = None,
+    ):
+        self.db = db_service
+        self.qdrant = qdrant_service
+        self.planner = filter_planner or FilterPlanner(db_service, qdrant_service)
+
+    def compute(
+        self,
+        fields: tuple[str, ...] = FACET_FIELDS,
+        filters: Optional[dict] = None,
+        query_embedding: Optional[list[float]] = None,
+        query_text: Optional[str] = None,
+        top_k: int = 200,
+        limit: int = 20,
+    ) -> FacetResult:
+        """
+        Args:
+            fields: Campos de FACET_FIELDS
+            filters: Mesmo formato do /search (payload e SQL)
+            query_embedding: Com query, conta sobre os top_k resultados
+            top_k: Resultados da busca considerados
+            limit: Valores retornados por campo
+        """
+        fields = list(fields)
+        if query_embedding is not None:
+            hits = self.planner.search_unified(
+                query_embedding=query_embedding,
+                limit=top_k,
+                filters=filters,
+                query_text=query_text,
+            )
+            total, counts, backend = len(hits), count_payload_values(hits, fields), BACKEND_QUERY
+        else:
+            payload_filters, sql_filters = split_filters(filters)
+            with stage_timer("facets", fields=len(fields)):
+                if sql_filters:
+                    total, counts = self.db.facet_counts(fields, {**payload_filters, **sql_filters})
+                    backend = BACKEND_POSTGRES
+                else:
+                    total, counts = self._qdrant_facets(fields, payload_filters or None, limit)
+                    backend = BACKEND_QDRANT
+
+        return FacetResult(
+            total=total,
+            backend=backend,
+            facets={name: top_values(counts.get(name, {}), limit) for name in fields},
+        )
+
+    def _qdrant_facets(
+        self, fields: list[str], filters: Optional[dict], limit: int
+    ) -> tuple[int, dict[str, dict[str, int]]]:
+        with ThreadPoolExecutor(max_workers=len(fields) + 1) as executor:
+            total_future = executor.submit(self.qdrant.count_unified, filters)
+            futures = {
+                name: executor.submit(self.qdrant.facet_unified, name, filters, limit)
+                for name in fields
+            }
+            counts = {name: future.result() for name, future in futures.items()}
+            return total_future.result(), counts
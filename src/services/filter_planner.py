@@ -0,0 +1,196 @@
+"""
+FilterPlanner - Filtros de busca que o payload do Qdrant nao cobre.
+
+event_date, uploader e as tags (visual_tags, objects_detected,
+narrative_tags) ficam so no Postgres, com indices btree/GIN. O planner
+resolve esses predicados no banco e escolhe como aplica-los a busca vetorial:
+
+- has_id: o conjunto de IDs e pequeno (<= filter_max_ids) e vai ao Qdrant
+  como HasIdCondition, junto com os filtros de payload
+- post_filter: predicado pouco seletivo; a busca traz candidatos extras
+  (proporcional a 1 / seletividade, ate filter_post_max_candidates) e o
+  banco confirma quais passam
+- empty: nenhum video passa, a busca nem e feita
+
+Sem filtros SQL a busca vai direto ao QdrantService.
+"""
+
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.config import settings
+from src.metrics import stage_timer
+from src.services.database_service import DatabaseService
+from src.services.qdrant_service import QdrantService
+
+logger = logging.getLogger(__name__)
+
+# Chaves de filtro resolvidas no Postgres (DatabaseService._apply_search_filters)
+SQL_FILTER_KEYS = frozenset(
+    {
+        "event_date_from",
+        "event_date_to",
+        "uploader",
+        "visual_tags",
+        "objects_detected",
+        "narrative_tags",
+    }
+)
+
+STRATEGY_PAYLOAD = "payload"
+STRATEGY_HAS_ID = "has_id"
+STRATEGY_POST_FILTER = "post_filter"
+STRATEGY_EMPTY = "empty"
+
+# Folga sobre limit / seletividade no numero de candidatos do pos-filtro
+POST_FILTER_MARGIN = 2.0
+
+
+@dataclass
+class FilterPlan:
+    """Como os filtros de uma busca serao aplicados."""
+
+    strategy: str
+    payload_filters: dict = field(default_factory=dict)
+    sql_filters: dict = field(default_factory=dict)
+    # IDs para has_id
+    ids: Optional[list[int]] = None
+    # Fracao dos videos indexados que passa nos filtros SQL (pos-filtro)
+    selectivity: Optional[float] = None
+
+
+def split_filters(filters: Optional[dict]) -> tuple[dict, dict]:
+    """Separa (filtros de payload do Qdrant, filtros SQL); valores vazios sao ignorados."""
+    payload, sql = {}, {}
+    for key, value in (filters or {}).items():
+        if value is None or value == []:
+            continue
+        (sql if key in SQL_FILTER_KEYS else payload)[key] = value
+    return payload, sql
+
+
+class FilterPlanner:
+    """Busca na collection unificada com filtros de payload e filtros SQL."""
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        qdrant_service: QdrantService,
+        max_ids: Optional[int] = None,
+        max_candidates: Optional[int] = None,
+    ):
+        self.db = db_service
+        self.qdrant = qdrant_service
+        self.max_ids = max_ids if max_ids is not None else settings.filter_max_ids
+        self.max_candidates = (
+            max_candidates if max_candidates is not None else settings.filter_post_max_candidates
+        )
+
+    def plan(self, filters: Optional[dict]) -> FilterPlan:
+        """Escolhe a estrategia (uma consulta ao banco; duas se o conjunto for grande)."""
+        payload_filters, sql_filters = split_filters(filters)
+        if not sql_filters:
+            return FilterPlan(STRATEGY_PAYLOAD, payload_filters)
+
+        with stage_timer("filter_plan"):
+            ids = self.db.filter_video_ids(sql_filters, limit=self.max_ids + 1)
+            if not ids:
+                return FilterPlan(STRATEGY_EMPTY, payload_filters, sql_filters, ids=[])
+            if len(ids) <= self.max_ids:
+                return FilterPlan(STRATEGY_HAS_ID, payload_filters, sql_filters, ids=ids)
+            matched = self.db.count_filtered_videos(sql_filters)
+            total = max(self.db.count_with_unified_embedding(), matched, 1)
+        return FilterPlan(
+            STRATEGY_POST_FILTER, payload_filters, sql_filters, selectivity=matched / total
+        )
+
+    def search_unified(
+        self,
+        query_embedding: list[float],
+        limit: int = 20,
+        filters: Optional[dict] = None,
+        query_text: Optional[str] = None,
+        with_vectors: bool = False,
+    ) -> list[dict]:
+        """Mesmo contrato de QdrantService.search_unified, aceitando filtros SQL."""
+        plan = self.plan(filters)
+        if plan.strategy == STRATEGY_EMPTY:
+            return []
+
+        search_filters = dict(plan.payload_filters)
+        fetch = limit
+        if plan.strategy == STRATEGY_HAS_ID:
+            search_filters["video_ids"] = plan.ids
+        elif plan.strategy == STRATEGY_POST_FILTER:
+            wanted = math.ceil(limit / plan.selectivity * POST_FILTER_MARGIN)
+            fetch = max(limit, min(wanted, self.max_candidates))
+
+        hits = self.qdrant.search_unified(
+            query_embedding=query_embedding,
+            limit=fetch,
+            filters=search_filters or None,
+            query_text=query_text,
+            with_vectors=with_vectors,
+        )
+        if plan.strategy != STRATEGY_POST_FILTER:
+            return hits
+
+        allowed = set(self.db.filter_video_ids(plan.sql_filters, ids=[h["id"] for h in hits]))
+        results = [h for h in hits if h["id"] in allowed][:limit]
+        if len(results) < limit and len(hits) == fetch:
+            logger.debug(
+                f"Pos-filtro: {len(results)}/{limit} resultados em {fetch} candidatos "
+                f"(seletividade {plan.selectivity:.2%})"
+            )
+        return results
+
+    def search_unified_groups(
+        self,
+        query_embedding: list[float],
+        group_by: str,
+        limit: int = 10,
+        group_size: int = 1,
+        filters: Optional[dict] = None,
+        query_text: Optional[str] = None,
+    ) -> list[dict]:
+        """Mesmo contrato de QdrantService.search_unified_groups, aceitando filtros SQL."""
+        plan = self.plan(filters)
+        if plan.strategy == STRATEGY_EMPTY:
+            return []
+
+        search_filters = dict(plan.payload_filters)
+        fetch_limit, fetch_size = limit, group_size
+        if plan.strategy == STRATEGY_HAS_ID:
+            search_filters["video_ids"] = plan.ids
+        elif plan.strategy == STRATEGY_POST_FILTER:
+            # Mais grupos e mais hits por grupo, na mesma proporcao, mantendo
+            # o total de pontos dentro de max_candidates
+            scale = min(
+                POST_FILTER_MARGIN / plan.selectivity,
+                self.max_candidates / (limit * group_size),
+            )
+            factor = math.sqrt(max(scale, 1.0))
+            fetch_limit = math.ceil(limit * factor)
+            fetch_size = math.ceil(group_size * factor)
+
+        groups = self.qdrant.search_unified_groups(
+            query_embedding=query_embedding,
+            group_by=group_by,
+            limit=fetch_limit,
+            group_size=fetch_size,
+            filters=search_filters or None,
+            query_text=query_text,
+        )
+        if plan.strategy != STRATEGY_POST_FILTER:
+            return groups
+
+        ids = [h["id"] for g in groups for h in g["hits"]]
+        allowed = set(self.db.filter_video_ids(plan.sql_filters, ids=ids))
+        results = []
+        for group in groups:
+            hits = [h for h in group["hits"] if h["id"] in allowed][:group_size]
+            if hits:
+                results.append({"key": group["key"], "hits": hits})
+        return results[:limit]
@@ -4,12 +4,28 @@ GeminiService - Analise de video e geracao de respostas RAG via Google Gemini.
 
 import json
 import time
+from typing import Optional
 
-from google import genai
 from google.genai import types
 
-from src.compilation_themes import COMPILATION_THEMES_TAXONOMY_TEXT
-from src.models import VideoAnalysis, DualVideoAnalysis, FullVideoAnalysis
+from src.compilation_themes import COMPILATION_THEMES_TAXONOMY_TEXT, VALID_THEME_CODES
+from src.metrics import stage_timer, timed
+from src.models import (
+    CompilationAnalysis,
+    DualVideoAnalysis,
+    FullVideoAnalysis,
+    NarrativeAnalysis,
+    VideoAnalysis,
+    VisualAnalysis,
+)
+from src.services.google_client import get_genai_client
+from src.services.rate_limiter import (
+    ENDPOINT_FILES,
+    ENDPOINT_GENERATE,
+    RateLimiter,
+    get_rate_limiter,
+)
+from src.services.usage_service import UsageService
 
 
 # ============================================================================
@@ -134,6 +150,93 @@ Instrucoes:
 Retorne APENAS o JSON, sem markdown, sem ```json, sem explicacao adicional."""
 
 
+# ============================================================================
+# PROMPT SINGLE-PASS (visual + narrativa + compilation numa unica chamada)
+# ============================================================================
+
+SINGLE_PASS_ANALYSIS_PROMPT = """Voce e um analista de video e editor profissional que monta compilados de clips virais estilo "Refugio Mental" no YouTube.
+Analise este video em TRES perspectivas e retorne UM UNICO JSON com as secoes "visual", "narrative" e "compilation":
+
+{{
+  "visual": {{
+    "visual_description": "Descricao detalhada dos elementos VISUAIS: objetos, pessoas, cenarios, cores, movimentos, composicao, iluminacao, transicoes visuais (3-5 frases)",
+    "visual_tags": ["tag1", "tag2", ...],
+    "objects_detected": ["objeto1", "objeto2", ...],
+    "scenes": [
+      {{"timestamp_ms": 0, "scene_description": "descricao visual da cena"}}
+    ],
+    "visual_style": "estilo visual predominante (ex: cinematografico, amador, animacao, documental, artistico)",
+    "color_palette": ["cor1", "cor2", ...],
+    "movement_intensity": 7.5,
+    "duration_estimate": 15.0
+  }},
+  "narrative": {{
+    "narrative_description": "Descricao da NARRATIVA e MENSAGEM do video: o que esta acontecendo, qual a historia sendo contada, qual o contexto (3-5 frases)",
+    "narrative_tags": ["tag1", "tag2", ...],
+    "emotional_tone": "tom emocional predominante (ex: comico, epico, wholesome, tenso, absurdo, emocionante, calmo, inspirador, melancolico, energetico)",
+    "themes": {{"tema1": 8.0, "tema2": 6.5}},
+    "storytelling_elements": {{
+      "has_narrative_arc": true,
+      "has_conflict": false,
+      "has_resolution": true,
+      "pacing": "rapido"
+    }},
+    "target_audience": "descricao do publico-alvo provavel",
+    "viral_potential": 8.0,
+    "intensity": 7.5,
+    "key_moments": [
+      {{"timestamp_ms": 0, "event": "descricao do momento narrativo"}}
+    ]
+  }},
+  "compilation": {{
+    "event_headline": "Frase curta e impactante descrevendo o evento (ex: 'Urso invade loja e assusta clientes')",
+    "trim_in_ms": 0,
+    "trim_out_ms": 15000,
+    "money_shot_ms": 8000,
+    "camera_type": "cellphone",
+    "audio_usability": "usable",
+    "audio_usability_reason": "Audio ambiente claro sem musica de fundo",
+    "compilation_themes": ["animais_em_cidades"],
+    "narration_suggestion": "Frase em portugues estilo Refugio Mental para o narrador ler sobre este clip",
+    "location_country": "Brasil",
+    "location_environment": "urban",
+    "standalone_score": 8.0,
+    "visual_quality_score": 7.5
+  }}
+}}
+
+Instrucoes - secao "visual" (O QUE VOCE VE, sem interpretar significados):
+- visual_tags: 15-20 tags de elementos VISUAIS (objetos, acoes, cenarios, cores)
+- objects_detected: Liste todos os objetos e elementos visiveis
+- scenes: Descreva visualmente cada cena/corte do video com timestamps
+- color_palette: Cores predominantes no video
+- movement_intensity: de 0 (estatico) a 10 (muito movimento)
+
+Instrucoes - secao "narrative" (SIGNIFICADO e CONTEXTO):
+- narrative_tags: 15-20 tags de conceitos, emocoes, temas, mensagens
+- themes: scores de 0 a 10 para temas como: humor, drama, romance, acao, suspense, educacao, etc
+- intensity: de 0 (calmo) a 10 (intenso)
+- viral_potential: de 0 (sem potencial) a 10 (altamente viral)
+
+Instrucoes - secao "compilation" (como usar este clip num compilado):
+- event_headline: Manchete curta e impactante (max 80 chars), em portugues
+- trim_in_ms / trim_out_ms: Em milissegundos, onde comeca e termina a acao util (corte gordo)
+- money_shot_ms: Momento de maximo impacto visual (o frame que viraria thumbnail)
+- camera_type: Uma de: cctv, dashcam, cellphone, drone, bodycam, gopro, professional, other
+- audio_usability: Uma de: usable (audio bom), replace (precisa trocar), silent (sem audio), mixed (partes boas e ruins)
+- compilation_themes: Lista de 1-3 codigos da taxonomia abaixo (SOMENTE codigos validos)
+- narration_suggestion: Frase em portugues para narrador (estilo documentario sensacionalista)
+- location_country: Pais ou regiao se identificavel, senao "desconhecido"
+- location_environment: Um de: urban, rural, highway, forest, ocean, indoor, suburban, mountain, desert, river, farm, stadium, other
+- standalone_score: 0-10, o clip funciona sozinho como "momento #N" num compilado?
+- visual_quality_score: 0-10, considerando resolucao, estabilidade, iluminacao
+
+Taxonomia de temas disponiveis (escolha 1-3 que melhor se encaixam):
+{taxonomy}
+
+Retorne APENAS o JSON, sem markdown, sem ```json, sem explicacao adicional."""
+
+
 RAG_PROMPT_TEMPLATE = """Voce e um curador de videos inteligente. O usuario fez a seguinte busca:
 
 "{query}"
@@ -165,13 +268,54 @@ Assista cada video com atencao e responda:
 Seja detalhado mas objetivo. Responda em portugues."""
 
 
+# Modos de analise FULL
+ANALYSIS_MODE_MULTI = "multi"    # 3 chamadas (visual, narrativa, compilation)
+ANALYSIS_MODE_SINGLE = "single"  # 1 chamada com as 3 secoes
+ANALYSIS_MODES = (ANALYSIS_MODE_MULTI, ANALYSIS_MODE_SINGLE)
+
+
 class GeminiService:
-    def __init__(self, api_key: str, model: str):
-        self.client = genai.Client(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        analysis_mode: str = ANALYSIS_MODE_MULTI,
+        usage_service: Optional[UsageService] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        if analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(
+                f"analysis_mode invalido: {analysis_mode} (use {', '.join(ANALYSIS_MODES)})"
+            )
+        self.client = get_genai_client(api_key)
         self.model = model
+        self.analysis_mode = analysis_mode
+        self.usage = usage_service
+        self.limiter = rate_limiter or get_rate_limiter()
         # Modelo rapido para RAG com video (evita timeout)
         self.fast_model = "gemini-2.0-flash"
 
+    def _generate(self, stage: str, model: str, contents, config=None):
+        """
+        generate_content via rate limiter (com retry em 429/5xx) e registro
+        de tokens/custo por etapa (stage).
+        """
+        start = time.perf_counter()
+        with stage_timer(f"gemini_{stage}", model=model):
+            response = self.limiter.call(
+                ENDPOINT_GENERATE,
+                model,
+                self.client.models.generate_content,
+                model=model,
+                contents=contents,
+                config=config,
+            )
+        if self.usage is not None:
+            self.usage.record_response(
+                "gemini", stage, model, response, (time.perf_counter() - start) * 1000
+            )
+        return response
+
     def _parse_json_response(self, text: str) -> dict:
         """Parse JSON da resposta do Gemini, removendo markdown se necessario."""
         text = text.strip()
@@ -182,9 +326,12 @@ class GeminiService:
             text = text.strip()
         return json.loads(text)
 
+    @timed("gemini_upload")
     def _upload_and_wait(self, video_path: str, timeout: int = 300) -> object:
         """Upload video para File API e aguarda processamento."""
-        video_file = self.client.files.upload(file=video_path)
+        video_file = self.limiter.call(
+            ENDPOINT_FILES, "files", self.client.files.upload, file=video_path
+        )
 
         start_time = time.time()
         while video_file.state == "PROCESSING":
@@ -198,123 +345,179 @@ class GeminiService:
 
         return video_file
 
+    def upload_video(self, video_path: str) -> object:
+        """Upload video para File API; retorna o handle (name, uri, mime_type)."""
+        return self._upload_and_wait(video_path)
+
+    def get_active_file(self, name: str) -> Optional[object]:
+        """
+        Recupera um arquivo ja enviado a File API.
+        Retorna None se o arquivo expirou, foi removido ou nao esta ACTIVE.
+        """
+        try:
+            video_file = self.client.files.get(name=name)
+        except Exception:
+            return None
+        if video_file.state != "ACTIVE":
+            return None
+        return video_file
+
+    def delete_file(self, name: str) -> None:
+        """Remove arquivo da File API (ignora erros)."""
+        try:
+            self.client.files.delete(name=name)
+        except Exception:
+            pass
+
+    def _video_part(self, video_file) -> types.Part:
+        return types.Part.from_uri(
+            file_uri=video_file.uri,
+            mime_type=video_file.mime_type,
+        )
+
+    def analyze_visual(self, video_file) -> VisualAnalysis:
+        """Analise VISUAL (frame a frame) de um video ja enviado."""
+        response = self._generate(
+            "visual",
+            model=self.model,
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[
+                        self._video_part(video_file),
+                        types.Part.from_text(text=VISUAL_ANALYSIS_PROMPT),
+                    ],
+                )
+            ],
+        )
+        return VisualAnalysis(**self._parse_json_response(response.text))
+
+    def analyze_narrative(self, video_file) -> NarrativeAnalysis:
+        """Analise NARRATIVA (contexto e significado) de um video ja enviado."""
+        response = self._generate(
+            "narrative",
+            model=self.model,
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[
+                        self._video_part(video_file),
+                        types.Part.from_text(text=NARRATIVE_ANALYSIS_PROMPT),
+                    ],
+                )
+            ],
+        )
+        return NarrativeAnalysis(**self._parse_json_response(response.text))
+
+    def analyze_compilation(
+        self,
+        video_file,
+        visual: VisualAnalysis,
+        narrative: NarrativeAnalysis,
+    ) -> CompilationAnalysis:
+        """Analise COMPILATION (uso editorial) usando o resumo das analises anteriores."""
+        compilation_prompt = COMPILATION_ANALYSIS_PROMPT.format(
+            visual_summary=visual.visual_description[:500],
+            narrative_summary=narrative.narrative_description[:500],
+            taxonomy=COMPILATION_THEMES_TAXONOMY_TEXT,
+        )
+        response = self._generate(
+            "compilation",
+            model=self.model,
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[
+                        self._video_part(video_file),
+                        types.Part.from_text(text=compilation_prompt),
+                    ],
+                )
+            ],
+        )
+        compilation_data = self._parse_json_response(response.text)
+        # Validate theme codes
+        compilation_data["compilation_themes"] = [
+            t for t in compilation_data.get("compilation_themes", [])
+            if t in VALID_THEME_CODES
+        ]
+        return CompilationAnalysis(**compilation_data)
+
+    def analyze_single_pass(self, video_file) -> FullVideoAnalysis:
+        """
+        Analise FULL numa unica chamada: visual, narrativa e compilation
+        retornadas como secoes de um mesmo JSON. O video e codificado uma vez so.
+        """
+        prompt = SINGLE_PASS_ANALYSIS_PROMPT.format(taxonomy=COMPILATION_THEMES_TAXONOMY_TEXT)
+        response = self._generate(
+            "single_pass",
+            model=self.model,
+            contents=[
+                types.Content(
+                    role="user",
+                    parts=[self._video_part(video_file), types.Part.from_text(text=prompt)],
+                )
+            ],
+            config=types.GenerateContentConfig(response_mime_type="application/json"),
+        )
+        data = self._parse_json_response(response.text)
+
+        compilation_data = data.get("compilation", {})
+        compilation_data["compilation_themes"] = [
+            t for t in compilation_data.get("compilation_themes", [])
+            if t in VALID_THEME_CODES
+        ]
+        return FullVideoAnalysis(
+            visual=VisualAnalysis(**data.get("visual", {})),
+            narrative=NarrativeAnalysis(**data.get("narrative", {})),
+            compilation=CompilationAnalysis(**compilation_data),
+        )
+
     def analyze_video_dual(self, video_path: str) -> DualVideoAnalysis:
         """
         Upload video para Gemini e executa DUAS analises (visual + narrativa).
         Usa um unico upload para ambas as analises (eficiente).
         """
-        from src.models import VisualAnalysis, NarrativeAnalysis, DualVideoAnalysis
-
         # 1. Upload via File API (uma unica vez)
         video_file = self._upload_and_wait(video_path)
 
         try:
-            video_part = types.Part.from_uri(
-                file_uri=video_file.uri,
-                mime_type=video_file.mime_type,
-            )
-
-            # 2. Analise VISUAL (frame a frame)
-            visual_response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[video_part, types.Part.from_text(text=VISUAL_ANALYSIS_PROMPT)],
-                    )
-                ],
-            )
-            visual_data = self._parse_json_response(visual_response.text)
-            visual_analysis = VisualAnalysis(**visual_data)
-
-            # 3. Analise NARRATIVA (contexto e significado)
-            narrative_response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[video_part, types.Part.from_text(text=NARRATIVE_ANALYSIS_PROMPT)],
-                    )
-                ],
-            )
-            narrative_data = self._parse_json_response(narrative_response.text)
-            narrative_analysis = NarrativeAnalysis(**narrative_data)
-
+            # 2. Analise VISUAL + NARRATIVA
+            visual_analysis = self.analyze_visual(video_file)
+            narrative_analysis = self.analyze_narrative(video_file)
             return DualVideoAnalysis(visual=visual_analysis, narrative=narrative_analysis)
 
         finally:
-            # 4. Cleanup - deletar arquivo da API
-            try:
-                self.client.files.delete(name=video_file.name)
-            except Exception:
-                pass
+            # 3. Cleanup - deletar arquivo da API
+            self.delete_file(video_file.name)
 
-    def analyze_video_full(self, video_path: str) -> FullVideoAnalysis:
+    def analyze_video_full(
+        self, video_path: str, mode: Optional[str] = None
+    ) -> FullVideoAnalysis:
         """
         Upload video para Gemini e executa TRES analises (visual + narrativa + compilation).
         Usa um unico upload para todas as analises (eficiente).
+
+        Args:
+            video_path: Caminho do video
+            mode: "multi" (3 chamadas) ou "single" (1 chamada); default = self.analysis_mode
         """
-        from src.models import VisualAnalysis, NarrativeAnalysis, CompilationAnalysis
+        mode = mode or self.analysis_mode
 
         # 1. Upload via File API (uma unica vez)
         video_file = self._upload_and_wait(video_path)
 
         try:
-            video_part = types.Part.from_uri(
-                file_uri=video_file.uri,
-                mime_type=video_file.mime_type,
-            )
+            if mode == ANALYSIS_MODE_SINGLE:
+                return self.analyze_single_pass(video_file)
 
-            # 2. Analise VISUAL (frame a frame)
-            visual_response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[video_part, types.Part.from_text(text=VISUAL_ANALYSIS_PROMPT)],
-                    )
-                ],
-            )
-            visual_data = self._parse_json_response(visual_response.text)
-            visual_analysis = VisualAnalysis(**visual_data)
+            # 2. Analise VISUAL + NARRATIVA
+            visual_analysis = self.analyze_visual(video_file)
+            narrative_analysis = self.analyze_narrative(video_file)
 
-            # 3. Analise NARRATIVA (contexto e significado)
-            narrative_response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[video_part, types.Part.from_text(text=NARRATIVE_ANALYSIS_PROMPT)],
-                    )
-                ],
-            )
-            narrative_data = self._parse_json_response(narrative_response.text)
-            narrative_analysis = NarrativeAnalysis(**narrative_data)
-
-            # 4. Analise COMPILATION (uso editorial)
-            compilation_prompt = COMPILATION_ANALYSIS_PROMPT.format(
-                visual_summary=visual_analysis.visual_description[:500],
-                narrative_summary=narrative_analysis.narrative_description[:500],
-                taxonomy=COMPILATION_THEMES_TAXONOMY_TEXT,
+            # 3. Analise COMPILATION (uso editorial)
+            compilation_analysis = self.analyze_compilation(
+                video_file, visual_analysis, narrative_analysis
             )
-            compilation_response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[video_part, types.Part.from_text(text=compilation_prompt)],
-                    )
-                ],
-            )
-            compilation_data = self._parse_json_response(compilation_response.text)
-            # Validate theme codes
-            from src.compilation_themes import VALID_THEME_CODES
-
-            compilation_data["compilation_themes"] = [
-                t for t in compilation_data.get("compilation_themes", [])
-                if t in VALID_THEME_CODES
-            ]
-            compilation_analysis = CompilationAnalysis(**compilation_data)
 
             return FullVideoAnalysis(
                 visual=visual_analysis,
@@ -323,11 +526,8 @@ class GeminiService:
             )
 
         finally:
-            # 5. Cleanup - deletar arquivo da API
-            try:
-                self.client.files.delete(name=video_file.name)
-            except Exception:
-                pass
+            # 4. Cleanup - deletar arquivo da API
+            self.delete_file(video_file.name)
 
     def analyze_video(self, video_path: str) -> VideoAnalysis:
         """
@@ -379,7 +579,8 @@ class GeminiService:
             query=query, clips_context=context_text
         )
 
-        response = self.client.models.generate_content(
+        response = self._generate(
+            "rag",
             model=self.model,
             contents=prompt,
         )
@@ -417,7 +618,9 @@ class GeminiService:
             # 1. Upload de todos os videos com timeout
             for path in paths_to_process:
                 try:
-                    video_file = self.client.files.upload(file=path)
+                    video_file = self.limiter.call(
+                        ENDPOINT_FILES, "files", self.client.files.upload, file=path
+                    )
 
                     # Aguardar processamento com timeout
                     start_time = time.time()
@@ -464,7 +667,8 @@ class GeminiService:
             parts.append(types.Part.from_text(text=prompt))
 
             # 3. Gerar resposta (usa modelo rapido para evitar timeout)
-            response = self.client.models.generate_content(
+            response = self._generate(
+                "rag_video",
                 model=self.fast_model,
                 contents=[
                     types.Content(role="user", parts=parts)
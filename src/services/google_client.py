@@ -0,0 +1,124 @@
+"""
+Registro de clientes Google GenAI compartilhados pelo processo.
+
+- Um genai.Client por (api_key, api_version), reutilizado por GeminiService,
+  EmbeddingService e paginas Streamlit (sem handshakes TLS repetidos).
+- Todos os clientes usam o mesmo httpx.Client, com pool de conexoes e keep-alive.
+- ApiVersionSelector lembra qual API version funcionou por ultimo para cada
+  modelo, evitando tentativas falhas em toda chamada.
+"""
+
+import logging
+import threading
+from typing import Optional
+
+import httpx
+from google import genai
+from google.genai import types
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# None = versao padrao do SDK (v1beta)
+API_VERSION_DEFAULT: Optional[str] = None
+API_VERSION_V1 = "v1"
+
+# Codigos que indicam modelo/recurso indisponivel na API version (vale tentar outra)
+VERSION_ERROR_CODES = {400, 404}
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_clients: dict[tuple[str, Optional[str]], genai.Client] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.google_http_max_connections,
+        max_keepalive_connections=settings.google_http_max_keepalive,
+        keepalive_expiry=settings.google_http_keepalive_expiry,
+    )
+
+
+def _get_http_client() -> httpx.Client:
+    """httpx.Client unico do processo (chamar com _lock adquirido)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.Client(
+            limits=_limits(),
+            # Sem limite de leitura: uploads e analises de video podem demorar
+            timeout=httpx.Timeout(None, connect=10.0),
+        )
+    return _http_client
+
+
+def _http_options(api_version: Optional[str]) -> types.HttpOptions:
+    options = {}
+    if api_version:
+        options["api_version"] = api_version
+    if "httpx_client" in types.HttpOptions.model_fields:
+        options["httpx_client"] = _get_http_client()
+    else:
+        # SDKs antigos: cada cliente mantem o proprio pool, ainda com keep-alive
+        options["client_args"] = {"limits": _limits()}
+    return types.HttpOptions(**options)
+
+
+def get_genai_client(api_key: str, api_version: Optional[str] = API_VERSION_DEFAULT) -> genai.Client:
+    """
+    Retorna o genai.Client compartilhado para (api_key, api_version).
+
+    Args:
+        api_key: Chave da Google API
+        api_version: "v1" ou None para a versao padrao do SDK
+    """
+    key = (api_key, api_version)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = genai.Client(api_key=api_key, http_options=_http_options(api_version))
+            _clients[key] = client
+        return client
+
+
+def close_clients() -> None:
+    """Fecha o pool HTTP compartilhado e descarta os clientes (shutdown/testes)."""
+    global _http_client
+    with _lock:
+        _clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def is_version_error(exc: Exception) -> bool:
+    """Erro indica que o modelo nao esta disponivel nesta API version."""
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code in VERSION_ERROR_CODES
+
+
+class ApiVersionSelector:
+    """Lembra, por modelo, a ultima API version que respondeu com sucesso."""
+
+    def __init__(self, versions: tuple[Optional[str], ...] = (API_VERSION_DEFAULT, API_VERSION_V1)):
+        self.versions = versions
+        self._preferred: dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def ordered(self, model: str) -> list[Optional[str]]:
+        """Versoes a tentar, comecando pela ultima que funcionou."""
+        with self._lock:
+            preferred = self._preferred.get(model, self.versions[0])
+        return [preferred] + [v for v in self.versions if v != preferred]
+
+    def record_success(self, model: str, version: Optional[str]) -> None:
+        with self._lock:
+            previous = self._preferred.get(model, self.versions[0])
+            self._preferred[model] = version
+        if previous != version:
+            logger.info(f"{model}: usando API version {version or 'padrao'}")
+
+
+# Compartilhado pelo processo: a versao que funciona depende do modelo, nao da instancia
+version_selector = ApiVersionSelector()
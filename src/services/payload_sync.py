@@ -0,0 +1,126 @@
+"""
+PayloadSync - Reconcilia o payload da collection unificada com o Postgres.
+
+O payload (campos de filtro e de resultado) e gravado junto com o vetor no
+processamento e ajustado pelas rotas de metadata; qualquer outra escrita no
+banco (scripts, correcoes manuais, SQL direto) deixa o Qdrant defasado. Este
+job le os videos indexados alterados desde o ultimo watermark (updated_at),
+compara com o payload atual em lote (retrieve) e envia so os campos que
+divergem via batch_update_points. Nenhum embedding e gerado: pontos que
+faltam no Qdrant sao apenas contados (precisam de re-embedding).
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.metrics import stage_timer
+from src.services.context_composer import UNIFIED_PAYLOAD_KEYS, ContextComposer
+from src.services.database_service import DatabaseService, VideoUnifiedPayload
+from src.services.qdrant_service import QdrantService
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "qdrant_unified_payload"
+
+# Videos lidos do banco (e do Qdrant) por lote
+SYNC_BATCH_SIZE = 500
+
+# Cada execucao reve este intervalo antes do watermark: NOW() no Postgres e o
+# inicio da transacao, entao um commit demorado pode gravar updated_at
+# anterior ao watermark ja salvo. Rever linhas inalteradas nao gera escrita.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+@dataclass
+class PayloadSyncResult:
+    """Resumo de uma execucao do sync."""
+
+    scanned: int = 0
+    # Pontos com algum campo divergente
+    changed: int = 0
+    updated: int = 0
+    # Videos com unified_embedding_id mas sem ponto no Qdrant
+    missing_ids: list[int] = field(default_factory=list)
+    watermark: Optional[datetime] = None
+    elapsed_ms: float = 0.0
+
+
+def payload_diff(expected: dict, current: dict) -> dict:
+    """Campos de expected cujo valor difere do payload atual."""
+    return {key: value for key, value in expected.items() if current.get(key) != value}
+
+
+class PayloadSync:
+    """Sync incremental Postgres -> payload da collection unificada."""
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        qdrant_service: QdrantService,
+        composer: Optional[ContextComposer] = None,
+    ):
+        self.db = db_service
+        self.qdrant = qdrant_service
+        self.composer = composer or ContextComposer()
+
+    def run(self, full: bool = False, batch_size: int = SYNC_BATCH_SIZE) -> PayloadSyncResult:
+        """
+        Executa uma passada.
+
+        Args:
+            full: Ignora o watermark e compara todos os videos indexados
+            batch_size: Videos por lote
+
+        O watermark so avanca se todos os lotes foram gravados no Qdrant;
+        caso contrario a proxima execucao repete o intervalo.
+        """
+        start = time.perf_counter()
+        result = PayloadSyncResult()
+        since = None if full else self.db.get_watermark(WATERMARK_NAME)
+        if since is not None:
+            since -= WATERMARK_OVERLAP
+
+        after_id = None
+        latest = None
+        complete = True
+        while True:
+            rows = self.db.list_indexed_changed_since(
+                since=since, after_id=after_id, limit=batch_size, projection=VideoUnifiedPayload
+            )
+            if not rows:
+                break
+            with stage_timer("payload_sync", videos=len(rows)):
+                current = self.qdrant.get_unified_payloads(
+                    [row.id for row in rows], list(UNIFIED_PAYLOAD_KEYS)
+                )
+                patches = {}
+                for row in rows:
+                    if row.updated_at and (latest is None or row.updated_at > latest):
+                        latest = row.updated_at
+                    if row.id not in current:
+                        result.missing_ids.append(row.id)
+                        continue
+                    diff = payload_diff(self.composer.compose_unified_payload(row), current[row.id])
+                    if diff:
+                        patches[row.id] = diff
+                updated = self.qdrant.update_unified_payloads(patches) if patches else 0
+            complete = complete and updated == len(patches)
+            result.scanned += len(rows)
+            result.changed += len(patches)
+            result.updated += updated
+            after_id = rows[-1].id
+            if len(rows) < batch_size:
+                break
+
+        if latest is not None and complete:
+            self.db.set_watermark(WATERMARK_NAME, latest)
+            result.watermark = latest
+        result.elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(
+            f"Payload sync: {result.scanned} videos, {result.changed} divergentes, "
+            f"{result.updated} atualizados, {len(result.missing_ids)} sem ponto ({result.elapsed_ms}ms)"
+        )
+        return result
@@ -1,8 +1,11 @@
 """
 QdrantService - Indexacao e busca vetorial no Qdrant.
-Suporta busca dual (visual + narrativa) com named vectors.
+Suporta busca dual (visual + narrativa) com named vectors e busca hibrida
+(BM25 esparso + denso, fundidos por RRF) na collection unificada.
 """
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Optional
 
@@ -11,20 +14,70 @@ from qdrant_client.models import (
     Distance,
     FieldCondition,
     Filter,
+    Fusion,
+    FusionQuery,
+    HasIdCondition,
     MatchAny,
     MatchValue,
+    Modifier,
     NamedVector,
     PayloadSchemaType,
     PointStruct,
+    Prefetch,
     Range,
+    SetPayload,
+    SetPayloadOperation,
+    SparseVectorParams,
     VectorParams,
 )
 
+from src.config import settings
+from src.metrics import timed
+from src.services import sparse_encoder
+
+logger = logging.getLogger(__name__)
+
 
 # Nome da collection com vetores duplos
 DUAL_COLLECTION_SUFFIX = "_dual"
 UNIFIED_COLLECTION_SUFFIX = "_unified"
 
+# Vetor esparso BM25 da collection unificada (o denso e o vetor sem nome)
+SPARSE_VECTOR_NAME = "text"
+DENSE_VECTOR_NAME = ""
+
+# Operacoes set_payload por chamada em update_unified_payloads
+PAYLOAD_BATCH_SIZE = 500
+
+# Payload indices da collection unificada (filtros, facets e group_by)
+UNIFIED_PAYLOAD_INDEXES = [
+    ("category", PayloadSchemaType.KEYWORD),
+    ("is_exclusive", PayloadSchemaType.BOOL),
+    ("emotional_tone", PayloadSchemaType.KEYWORD),
+    ("intensity", PayloadSchemaType.FLOAT),
+    ("viral_potential", PayloadSchemaType.FLOAT),
+    ("source", PayloadSchemaType.KEYWORD),
+    # Compilation fields
+    ("camera_type", PayloadSchemaType.KEYWORD),
+    ("audio_usability", PayloadSchemaType.KEYWORD),
+    ("standalone_score", PayloadSchemaType.FLOAT),
+    ("visual_quality_score", PayloadSchemaType.FLOAT),
+    ("location_environment", PayloadSchemaType.KEYWORD),
+    ("location_country", PayloadSchemaType.KEYWORD),
+    ("compilation_themes", PayloadSchemaType.KEYWORD),
+    # Agrupamento (ContextComposer.group_key)
+    ("group_uploader", PayloadSchemaType.KEYWORD),
+    ("group_newsflare_event", PayloadSchemaType.KEYWORD),
+    ("group_event", PayloadSchemaType.KEYWORD),
+]
+
+
+def dense_vector(vector):
+    """Vetor denso de um ponto (em collections hibridas o vetor vem como dict)."""
+    if isinstance(vector, dict):
+        return vector.get(DENSE_VECTOR_NAME)
+    return vector
+
 
 @dataclass
 class DualSearchResult:
@@ -36,6 +89,18 @@ class DualSearchResult:
     payload: dict
 
 
+def _hit(point, with_vectors: bool) -> dict:
+    """Ponto retornado pelo Qdrant no formato de resultado de search_unified."""
+    result = {
+        "id": point.id,
+        "score": point.score,
+        "payload": point.payload,
+    }
+    if with_vectors:
+        result["vector"] = dense_vector(point.vector)
+    return result
+
+
 class QdrantService:
     def __init__(
         self,
@@ -43,8 +108,10 @@ class QdrantService:
         port: int,
         collection: str,
         vector_size: int,
+        client: Optional[QdrantClient] = None,
     ):
-        self.client = QdrantClient(host=host, port=port)
+        # client: instancia pronta (ex: QdrantClient(":memory:") em benchmarks)
+        self.client = client or QdrantClient(host=host, port=port)
         self.collection = collection
         self.dual_collection = collection + DUAL_COLLECTION_SUFFIX
         self.unified_collection = collection + UNIFIED_COLLECTION_SUFFIX
@@ -52,6 +119,7 @@ class QdrantService:
         self._ensure_collection(vector_size)
         self._ensure_dual_collection(vector_size)
         self._ensure_unified_collection(vector_size)
+        self.hybrid_enabled = settings.hybrid_search_enabled and self.has_sparse_vector()
 
     def _ensure_collection(self, vector_size: int) -> None:
         """Cria collection legada se nao existir."""
@@ -81,98 +149,203 @@ class QdrantService:
             )
 
     def _ensure_unified_collection(self, vector_size: int) -> None:
-        """Cria collection unificada com payload indices para filtros."""
+        """Cria collection unificada se nao existir."""
         collections = [
             c.name for c in self.client.get_collections().collections
         ]
         if self.unified_collection not in collections:
-            self.client.create_collection(
-                collection_name=self.unified_collection,
-                vectors_config=VectorParams(
-                    size=vector_size, distance=Distance.COSINE
-                ),
-            )
-            # Criar payload indices para filtros
-            for field, schema in [
-                ("category", PayloadSchemaType.KEYWORD),
-                ("is_exclusive", PayloadSchemaType.BOOL),
-                ("emotional_tone", PayloadSchemaType.KEYWORD),
-                ("intensity", PayloadSchemaType.FLOAT),
-                ("viral_potential", PayloadSchemaType.FLOAT),
-                ("source", PayloadSchemaType.KEYWORD),
-                # Compilation fields
-                ("camera_type", PayloadSchemaType.KEYWORD),
-                ("audio_usability", PayloadSchemaType.KEYWORD),
-                ("standalone_score", PayloadSchemaType.FLOAT),
-                ("visual_quality_score", PayloadSchemaType.FLOAT),
-                ("location_environment", PayloadSchemaType.KEYWORD),
-                ("location_country", PayloadSchemaType.KEYWORD),
-                ("compilation_themes", PayloadSchemaType.KEYWORD),
-            ]:
-                try:
-                    self.client.create_payload_index(
-                        collection_name=self.unified_collection,
-                        field_name=field,
-                        field_schema=schema,
-                    )
-                except Exception:
-                    pass
+            self.create_unified_collection(self.unified_collection, vector_size)
+        else:
+            self._ensure_payload_indexes(self.unified_collection)
+
+    def create_unified_collection(self, name: str, vector_size: int) -> None:
+        """Cria uma collection no formato unificado (denso + BM25) com payload indices."""
+        self.client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(
+                size=vector_size, distance=Distance.COSINE
+            ),
+            # IDF calculado pelo Qdrant sobre os pesos BM25 de cada ponto
+            sparse_vectors_config={
+                SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+            },
+        )
+        self._ensure_payload_indexes(name)
 
+    def _ensure_payload_indexes(self, name: str) -> None:
+        """Cria os UNIFIED_PAYLOAD_INDEXES que faltam (collections antigas ganham os novos)."""
+        try:
+            existing = self.client.get_collection(name).payload_schema or {}
+        except Exception:
+            existing = {}
+        for field, schema in UNIFIED_PAYLOAD_INDEXES:
+            if field in existing:
+                continue
+            try:
+                self.client.create_payload_index(
+                    collection_name=name,
+                    field_name=field,
+                    field_schema=schema,
+                )
+            except Exception:
+                pass
+
+    def has_sparse_vector(self) -> bool:
+        """
+        Collections criadas antes da busca hibrida nao tem o vetor esparso
+        (recrie com scripts/enable_hybrid_search.py); nelas a busca e so densa.
+        """
+        try:
+            params = self.client.get_collection(self.unified_collection).config.params
+        except Exception:
+            return False
+        if SPARSE_VECTOR_NAME in (params.sparse_vectors or {}):
+            return True
+        logger.warning(
+            f"Collection {self.unified_collection} sem vetor esparso '{SPARSE_VECTOR_NAME}': "
+            "busca hibrida desativada (rode scripts/enable_hybrid_search.py)"
+        )
+        return False
+
+    def unified_vectors(self, embedding: list[float], lexical_text: Optional[str] = None):
+        """Vetor(es) de um ponto da collection unificada (denso + BM25 se hibrida)."""
+        if not self.hybrid_enabled or not lexical_text:
+            return embedding
+        return {
+            DENSE_VECTOR_NAME: embedding,
+            SPARSE_VECTOR_NAME: sparse_encoder.encode_document(lexical_text),
+        }
+
+    @timed("qdrant_upsert")
     def index_unified(
         self,
         video_id: int,
         embedding: list[float],
         payload: dict,
+        lexical_text: Optional[str] = None,
     ) -> str:
-        """Indexa embedding unificado com metadata rica. Retorna point ID."""
+        """
+        Indexa embedding unificado com metadata rica. Retorna point ID.
+
+        Args:
+            lexical_text: Texto indexado no vetor esparso BM25
+                (ContextComposer.compose_lexical_text)
+        """
         point_id = video_id
         self.client.upsert(
             collection_name=self.unified_collection,
             points=[
                 PointStruct(
                     id=point_id,
-                    vector=embedding,
+                    vector=self.unified_vectors(embedding, lexical_text),
                     payload=payload,
                 )
             ],
         )
         return str(point_id)
 
+    @timed("qdrant_search")
     def search_unified(
         self,
         query_embedding: list[float],
         limit: int = 20,
         filters: Optional[dict] = None,
+        query_text: Optional[str] = None,
+        with_vectors: bool = False,
     ) -> list[dict]:
         """
         Busca vetorial na collection unificada com filtros opcionais.
 
+        Com query_text e collection hibrida, os ramos denso e BM25 sao
+        buscados e fundidos por RRF numa unica chamada (prefetch + fusion);
+        o score passa a ser o do RRF, nao a similaridade cosseno.
+
         Args:
             query_embedding: Embedding da query
             limit: Numero maximo de resultados
             filters: Dict com filtros (category, is_exclusive, intensity_min, etc.)
+            query_text: Texto da query para o ramo lexical (BM25)
+            with_vectors: Inclui o vetor denso de cada resultado ("vector")
 
         Returns:
             Lista de resultados com id, score e payload
         """
-        query_filter = self._build_filter(filters) if filters else None
-
         results = self.client.query_points(
             collection_name=self.unified_collection,
-            query=query_embedding,
-            query_filter=query_filter,
             limit=limit,
             with_payload=True,
+            with_vectors=with_vectors,
+            **self._unified_query(query_embedding, filters, query_text, limit),
+        )
+        return [_hit(point, with_vectors) for point in results.points]
+
+    @timed("qdrant_search_groups")
+    def search_unified_groups(
+        self,
+        query_embedding: list[float],
+        group_by: str,
+        limit: int = 10,
+        group_size: int = 1,
+        filters: Optional[dict] = None,
+        query_text: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Busca agrupada por um campo keyword do payload (group query do Qdrant):
+        os limit melhores grupos, cada um com ate group_size hits, numa unica
+        chamada. Mesma query (densa ou hibrida) e filtros de search_unified.
+
+        Args:
+            group_by: Campo do payload (ContextComposer.GROUP_BY_FIELDS)
+            limit: Numero maximo de grupos
+            group_size: Hits por grupo
+
+        Returns:
+            Lista de grupos {"key", "hits"} em ordem do melhor hit;
+            hits no formato de search_unified
+        """
+        results = self.client.query_points_groups(
+            collection_name=self.unified_collection,
+            group_by=group_by,
+            limit=limit,
+            group_size=group_size,
+            with_payload=True,
+            **self._unified_query(query_embedding, filters, query_text, limit * group_size),
         )
         return [
-            {
-                "id": hit.id,
-                "score": hit.score,
-                "payload": hit.payload,
-            }
-            for hit in results.points
+            {"key": str(group.id), "hits": [_hit(point, False) for point in group.hits]}
+            for group in results.groups
         ]
 
+    def _unified_query(
+        self,
+        query_embedding: list[float],
+        filters: Optional[dict],
+        query_text: Optional[str],
+        limit: int,
+    ) -> dict:
+        """
+        Argumentos de query_points(_groups): com query_text e collection
+        hibrida, prefetch denso + BM25 fundidos por RRF; senao so o denso.
+        """
+        query_filter = self._build_filter(filters) if filters else None
+        sparse_query = sparse_encoder.encode_query(query_text) if query_text else None
+
+        if self.hybrid_enabled and sparse_query and not sparse_encoder.is_empty(sparse_query):
+            prefetch_limit = max(limit, settings.hybrid_prefetch_limit)
+            return {
+                "prefetch": [
+                    Prefetch(query=query_embedding, filter=query_filter, limit=prefetch_limit),
+                    Prefetch(
+                        query=sparse_query,
+                        using=SPARSE_VECTOR_NAME,
+                        filter=query_filter,
+                        limit=prefetch_limit,
+                    ),
+                ],
+                "query": FusionQuery(fusion=Fusion.RRF),
+            }
+        return {"query": query_embedding, "query_filter": query_filter}
+
     def _build_filter(self, filters: dict) -> Optional[Filter]:
         """Converte dict de filtros em Qdrant Filter."""
         conditions = []
@@ -267,11 +440,90 @@ class QdrantService:
                 FieldCondition(key="visual_quality_score", range=Range(**vq_range))
             )
 
+        # Conjunto de IDs resolvido no Postgres (FilterPlanner)
+        if filters.get("video_ids") is not None:
+            conditions.append(HasIdCondition(has_id=filters["video_ids"]))
+
         if not conditions:
             return None
 
         return Filter(must=conditions)
 
+    def facet_unified(
+        self, field: str, filters: Optional[dict] = None, limit: int = 20
+    ) -> dict[str, int]:
+        """Contagem de pontos por valor de um campo keyword indexado (facet API)."""
+        result = self.client.facet(
+            collection_name=self.unified_collection,
+            key=field,
+            facet_filter=self._build_filter(filters) if filters else None,
+            limit=limit,
+            exact=True,
+        )
+        return {str(hit.value): hit.count for hit in result.hits}
+
+    def count_unified(self, filters: Optional[dict] = None) -> int:
+        """Pontos da collection unificada que passam nos filtros."""
+        return self.client.count(
+            collection_name=self.unified_collection,
+            count_filter=self._build_filter(filters) if filters else None,
+            exact=True,
+        ).count
+
+    def update_unified_payload(self, video_id: int, payload: dict) -> None:
+        """Atualiza so os campos dados do payload (sem reenviar o vetor)."""
+        self.client.set_payload(
+            collection_name=self.unified_collection,
+            payload=payload,
+            points=[video_id],
+        )
+
+    def update_unified_payloads(self, payloads: dict[int, dict]) -> int:
+        """
+        set_payload de varios pontos (cada um com seus campos) em lotes de
+        batch_update_points. Um lote que falha (ex: ponto inexistente) e
+        registrado e nao interrompe os demais.
+
+        Returns:
+            Pontos atualizados
+        """
+        items = list(payloads.items())
+        updated = 0
+        for start in range(0, len(items), PAYLOAD_BATCH_SIZE):
+            batch = items[start : start + PAYLOAD_BATCH_SIZE]
+            try:
+                self.client.batch_update_points(
+                    collection_name=self.unified_collection,
+                    update_operations=[
+                        SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[video_id]))
+                        for video_id, payload in batch
+                    ],
+                )
+                updated += len(batch)
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar payload de {len(batch)} pontos: {e}")
+        return updated
+
+    def get_unified_payloads(self, video_ids: list[int], fields: list[str]) -> dict[int, dict]:
+        """Campos do payload de varios pontos em uma chamada (pontos ausentes ficam de fora)."""
+        if not video_ids:
+            return {}
+        points = self.client.retrieve(
+            collection_name=self.unified_collection,
+            ids=video_ids,
+            with_payload=fields,
+        )
+        return {int(p.id): p.payload or {} for p in points}
+
+    def get_unified_vector(self, video_id: int) -> Optional[list[float]]:
+        """Vetor denso do video na collection unificada (None se nao indexado)."""
+        points = self.client.retrieve(
+            collection_name=self.unified_collection,
+            ids=[video_id],
+            with_vectors=True,
+        )
+        return dense_vector(points[0].vector) if points else None
+
     def find_similar(self, video_id: int, limit: int = 10) -> list[dict]:
         """
         Busca videos similares a um dado video usando seu embedding unificado.
@@ -284,15 +536,10 @@ class QdrantService:
             Lista de resultados similares (excluindo o proprio video)
         """
         try:
-            points = self.client.retrieve(
-                collection_name=self.unified_collection,
-                ids=[video_id],
-                with_vectors=True,
-            )
-            if not points:
+            vector = self.get_unified_vector(video_id)
+            if vector is None:
                 return []
 
-            vector = points[0].vector
             results = self.client.query_points(
                 collection_name=self.unified_collection,
                 query=vector,
@@ -311,20 +558,23 @@ class QdrantService:
         except Exception:
             return []
 
+    def _collection_stats(self, name: str) -> dict:
+        try:
+            info = self.client.get_collection(name)
+            return {
+                "points_count": info.points_count or 0,
+                "vectors_count": getattr(info, 'vectors_count', None) or getattr(info, 'indexed_vectors_count', 0) or 0,
+            }
+        except Exception:
+            return {"points_count": 0, "vectors_count": 0}
+
     def get_collection_stats(self) -> dict:
-        """Retorna estatisticas de todas as collections."""
-        stats = {}
-        for name in [self.collection, self.dual_collection, self.unified_collection]:
-            try:
-                info = self.client.get_collection(name)
-                stats[name] = {
-                    "points_count": info.points_count or 0,
-                    "vectors_count": getattr(info, 'vectors_count', None) or getattr(info, 'indexed_vectors_count', 0) or 0,
-                }
-            except Exception:
-                stats[name] = {"points_count": 0, "vectors_count": 0}
-        return stats
+        """Retorna estatisticas de todas as collections (consultadas em paralelo)."""
+        names = [self.collection, self.dual_collection, self.unified_collection]
+        with ThreadPoolExecutor(max_workers=len(names)) as executor:
+            return dict(zip(names, executor.map(self._collection_stats, names)))
 
+    @timed("qdrant_upsert")
     def index_dual(
         self,
         video_id: int,
@@ -354,6 +604,7 @@ class QdrantService:
         )
         return (f"{point_id}_visual", f"{point_id}_narrative")
 
+    @timed("qdrant_search")
     def search_dual(
         self,
         query_embedding: list[float],
@@ -427,6 +678,7 @@ class QdrantService:
         results.sort(key=lambda x: x.combined_score, reverse=True)
         return results[:limit]
 
+    @timed("qdrant_upsert")
     def index(
         self,
         video_id: int,
@@ -447,6 +699,7 @@ class QdrantService:
         )
         return str(point_id)
 
+    @timed("qdrant_search")
     def search(
         self,
         query_embedding: list[float],
@@ -2,19 +2,31 @@
 QueueService - Fila de processamento de videos com worker em background.
 """
 
+import json
 import logging
 import threading
 import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Callable, Optional
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from src.metrics import QUEUE_CLAIM_SECONDS, QUEUE_TASKS, worker_busy
+from src.services.db_engine import get_engine
+from src.tracing import inject_context, span
+
 logger = logging.getLogger(__name__)
 
+# Jobs de re-embedding (metadata alterada) ficam atras de videos novos
+PRIORITY_REEMBED = -10
+# Opcao do item: so regenerar o embedding unificado (sem analise Gemini)
+OPTION_REEMBED = "reembed"
+# Marcado quando um re-embedding e pedido com o item em processamento
+OPTION_REQUEUE = "requeue"
+
 
 @dataclass
 class QueueTask:
@@ -28,6 +40,10 @@ class QueueTask:
     max_attempts: int
     error_message: Optional[str]
     created_at: datetime
+    # Contexto W3C do request que enfileirou (ver src/tracing.py)
+    trace_context: Optional[str] = None
+    # Opcoes do ingest (ex: {"auto_themes": True})
+    options: dict = field(default_factory=dict)
 
 
 @dataclass
@@ -41,6 +57,13 @@ class QueueStats:
     total: int
 
 
+def _options(value) -> dict:
+    """Coluna options (JSONB vem como dict; outros drivers podem devolver texto)."""
+    if not value:
+        return {}
+    return json.loads(value) if isinstance(value, str) else dict(value)
+
+
 class QueueService:
     """
     Servico de fila de processamento com suporte a worker em background.
@@ -50,7 +73,7 @@ class QueueService:
     """
 
     def __init__(self, db_url: str, worker_id: Optional[str] = None):
-        self.engine = create_engine(db_url)
+        self.engine = get_engine(db_url)
         self.SessionLocal = sessionmaker(bind=self.engine)
         self.worker_id = worker_id or f"worker-{uuid.uuid4().hex[:8]}"
         self._worker_thread: Optional[threading.Thread] = None
@@ -77,17 +100,35 @@ class QueueService:
                     created_at TIMESTAMP DEFAULT NOW(),
                     updated_at TIMESTAMP DEFAULT NOW(),
                     completed_at TIMESTAMP,
+                    trace_context TEXT,
+                    options JSONB DEFAULT '{}',
                     UNIQUE(video_id)
                 )
             """
                 )
             )
+            # Tabelas criadas antes das migrations 009 e 010
+            conn.execute(
+                text(
+                    "ALTER TABLE processing_queue ADD COLUMN IF NOT EXISTS trace_context TEXT"
+                )
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE processing_queue ADD COLUMN IF NOT EXISTS options JSONB DEFAULT '{}'"
+                )
+            )
             conn.commit()
 
-    def enqueue(self, video_id: int, priority: int = 0) -> Optional[int]:
+    def enqueue(
+        self, video_id: int, priority: int = 0, options: Optional[dict] = None
+    ) -> Optional[int]:
         """
         Adiciona video a fila de processamento.
 
+        Args:
+            options: Opcoes repassadas ao processador (QueueTask.options)
+
         Returns:
             ID do item na fila ou None se ja existir
         """
@@ -95,18 +136,94 @@ class QueueService:
             result = conn.execute(
                 text(
                     """
-                INSERT INTO processing_queue (video_id, priority, status)
-                VALUES (:video_id, :priority, 'pending')
+                INSERT INTO processing_queue (video_id, priority, status, trace_context, options)
+                VALUES (:video_id, :priority, 'pending', :trace_context, CAST(:options AS JSONB))
                 ON CONFLICT (video_id) DO NOTHING
                 RETURNING id
             """
                 ),
-                {"video_id": video_id, "priority": priority},
+                {
+                    "video_id": video_id,
+                    "priority": priority,
+                    "trace_context": inject_context(),
+                    "options": json.dumps(options or {}),
+                },
             )
             conn.commit()
             row = result.fetchone()
             return row[0] if row else None
 
+    def enqueue_reembed(self, video_id: int) -> bool:
+        """
+        Agenda a regeneracao do embedding unificado, coalescida por video
+        (a fila tem um item por video e o job le o banco ao executar):
+
+        - item pendente: nada a fazer, ele ja vera a metadata nova
+        - em processamento: marca requeue; complete() volta o item para a fila
+        - concluido/falho ou inexistente: item pendente de re-embedding
+
+        Returns:
+            True se um job novo foi agendado, False se coalescido com um existente
+        """
+        return self.enqueue_reembed_bulk([video_id]) > 0
+
+    def enqueue_reembed_bulk(self, video_ids: list[int]) -> int:
+        """
+        enqueue_reembed para varios videos em uma transacao (dois comandos
+        set-based, sem ida ao banco por video).
+
+        Returns:
+            Quantidade de jobs novos (os demais foram coalescidos)
+        """
+        video_ids = sorted(set(video_ids))
+        if not video_ids:
+            return 0
+        options = json.dumps({OPTION_REEMBED: True})
+        with self.engine.begin() as conn:
+            running = conn.execute(
+                text(
+                    f"""
+                UPDATE processing_queue
+                SET options = COALESCE(options, '{{}}'::jsonb) || '{{"{OPTION_REQUEUE}": true}}'::jsonb
+                WHERE video_id = ANY(CAST(:video_ids AS INTEGER[])) AND status = 'processing'
+                RETURNING video_id
+            """
+                ),
+                {"video_ids": video_ids},
+            ).fetchall()
+            running_ids = {row[0] for row in running}
+            remaining = [v for v in video_ids if v not in running_ids]
+            if not remaining:
+                return 0
+            result = conn.execute(
+                text(
+                    """
+                INSERT INTO processing_queue (video_id, priority, status, trace_context, options)
+                SELECT video_id, :priority, 'pending', :trace_context, CAST(:options AS JSONB)
+                FROM unnest(CAST(:video_ids AS INTEGER[])) AS item(video_id)
+                ON CONFLICT (video_id) DO UPDATE
+                SET status = 'pending',
+                    priority = EXCLUDED.priority,
+                    attempts = 0,
+                    error_message = NULL,
+                    completed_at = NULL,
+                    trace_context = EXCLUDED.trace_context,
+                    options = EXCLUDED.options,
+                    updated_at = NOW()
+                WHERE processing_queue.status IN ('completed', 'failed')
+                RETURNING id
+            """
+                ),
+                {
+                    "video_ids": remaining,
+                    "priority": PRIORITY_REEMBED,
+                    "trace_context": inject_context(),
+                    "options": options,
+                },
+            )
+            return len(result.fetchall())
+
+    @QUEUE_CLAIM_SECONDS.time()
     def claim_next(self, lock_timeout_minutes: int = 10) -> Optional[QueueTask]:
         """
         Pega o proximo item pendente da fila de forma thread-safe.
@@ -117,81 +234,100 @@ class QueueService:
         Returns:
             QueueTask ou None se fila estiver vazia
         """
-        lock_timeout = datetime.utcnow() - timedelta(minutes=lock_timeout_minutes)
+        with span("queue.claim", **{"queue.worker_id": self.worker_id}) as current:
+            lock_timeout = datetime.utcnow() - timedelta(minutes=lock_timeout_minutes)
 
-        with self.engine.connect() as conn:
-            # Usar transacao explicita
-            trans = conn.begin()
-            try:
-                # Buscar proximo item: pendente OU locked expirado
-                result = conn.execute(
-                    text(
-                        """
-                    SELECT id, video_id, status, priority, attempts, max_attempts,
-                           error_message, created_at
-                    FROM processing_queue
-                    WHERE (status = 'pending' AND attempts < max_attempts)
-                       OR (status = 'processing' AND locked_at < :lock_timeout)
-                    ORDER BY priority DESC, created_at ASC
-                    LIMIT 1
-                    FOR UPDATE SKIP LOCKED
-                """
-                    ),
-                    {"lock_timeout": lock_timeout},
-                )
-                row = result.fetchone()
-
-                if not row:
+            with self.engine.connect() as conn:
+                # Usar transacao explicita
+                trans = conn.begin()
+                try:
+                    # Buscar proximo item: pendente OU locked expirado
+                    result = conn.execute(
+                        text(
+                            """
+                        SELECT id, video_id, status, priority, attempts, max_attempts,
+                               error_message, created_at, trace_context, options
+                        FROM processing_queue
+                        WHERE (status = 'pending' AND attempts < max_attempts)
+                           OR (status = 'processing' AND locked_at < :lock_timeout)
+                        ORDER BY priority DESC, created_at ASC
+                        LIMIT 1
+                        FOR UPDATE SKIP LOCKED
+                    """
+                        ),
+                        {"lock_timeout": lock_timeout},
+                    )
+                    row = result.fetchone()
+
+                    if not row:
+                        trans.commit()
+                        return None
+
+                    # Marcar como processing e atualizar lock
+                    conn.execute(
+                        text(
+                            """
+                        UPDATE processing_queue
+                        SET status = 'processing',
+                            locked_at = NOW(),
+                            locked_by = :worker_id,
+                            attempts = attempts + 1
+                        WHERE id = :id
+                    """
+                        ),
+                        {"id": row[0], "worker_id": self.worker_id},
+                    )
                     trans.commit()
-                    return None
 
-                # Marcar como processing e atualizar lock
-                conn.execute(
-                    text(
-                        """
-                    UPDATE processing_queue
-                    SET status = 'processing',
-                        locked_at = NOW(),
-                        locked_by = :worker_id,
-                        attempts = attempts + 1
-                    WHERE id = :id
-                """
-                    ),
-                    {"id": row[0], "worker_id": self.worker_id},
-                )
-                trans.commit()
-
-                return QueueTask(
-                    id=row[0],
-                    video_id=row[1],
-                    status="processing",
-                    priority=row[3],
-                    attempts=row[4] + 1,  # Ja incrementamos
-                    max_attempts=row[5],
-                    error_message=row[6],
-                    created_at=row[7],
-                )
-
-            except Exception:
-                trans.rollback()
-                raise
+                    task = QueueTask(
+                        id=row[0],
+                        video_id=row[1],
+                        status="processing",
+                        priority=row[3],
+                        attempts=row[4] + 1,  # Ja incrementamos
+                        max_attempts=row[5],
+                        error_message=row[6],
+                        created_at=row[7],
+                        trace_context=row[8],
+                        options=_options(row[9]),
+                    )
+                    current.set_attribute("video.id", task.video_id)
+                    current.set_attribute("queue.attempt", task.attempts)
+                    return task
+
+                except Exception:
+                    trans.rollback()
+                    raise
 
     def complete(self, queue_id: int) -> None:
-        """Marca item como concluido com sucesso."""
+        """
+        Marca item como concluido com sucesso. Se um re-embedding foi pedido
+        durante o processamento (requeue), o item volta pendente como re-embedding.
+        """
         with self.engine.connect() as conn:
             conn.execute(
                 text(
-                    """
+                    f"""
                 UPDATE processing_queue
-                SET status = 'completed',
-                    completed_at = NOW(),
+                SET status = CASE WHEN requeue THEN 'pending' ELSE 'completed' END,
+                    completed_at = CASE WHEN requeue THEN NULL ELSE NOW() END,
+                    attempts = CASE WHEN requeue THEN 0 ELSE attempts END,
+                    priority = CASE WHEN requeue THEN :reembed_priority ELSE priority END,
+                    options = CASE
+                        WHEN requeue THEN '{{"{OPTION_REEMBED}": true}}'::jsonb
+                        ELSE options
+                    END,
                     locked_at = NULL,
                     locked_by = NULL,
                     error_message = NULL
+                FROM (
+                    SELECT COALESCE((options->>'{OPTION_REQUEUE}')::boolean, false) AS requeue
+                    FROM processing_queue WHERE id = :id
+                ) AS item
                 WHERE id = :id
             """
                 ),
-                {"id": queue_id},
+                {"id": queue_id, "reembed_priority": PRIORITY_REEMBED},
             )
             conn.commit()
 
@@ -253,12 +389,13 @@ class QueueService:
                     attempts = 0,
                     error_message = NULL,
                     locked_at = NULL,
-                    locked_by = NULL
+                    locked_by = NULL,
+                    trace_context = :trace_context
                 WHERE video_id = :video_id AND status IN ('failed', 'completed')
                 RETURNING id
             """
                 ),
-                {"video_id": video_id},
+                {"video_id": video_id, "trace_context": inject_context()},
             )
             conn.commit()
             return result.fetchone() is not None
@@ -364,16 +501,19 @@ class QueueService:
                             f"Processando video_id={task.video_id} "
                             f"(tentativa {task.attempts}/{task.max_attempts})"
                         )
-                        try:
-                            self._processor(task)
-                            self.complete(task.id)
-                            logger.info(f"Video {task.video_id} processado com sucesso")
-                        except Exception as e:
-                            error_msg = str(e)[:500]
-                            logger.error(
-                                f"Erro processando video {task.video_id}: {error_msg}"
-                            )
-                            self.fail(task.id, error_msg)
+                        with worker_busy():
+                            try:
+                                self._processor(task)
+                                self.complete(task.id)
+                                QUEUE_TASKS.labels(result="completed").inc()
+                                logger.info(f"Video {task.video_id} processado com sucesso")
+                            except Exception as e:
+                                error_msg = str(e)[:500]
+                                logger.error(
+                                    f"Erro processando video {task.video_id}: {error_msg}"
+                                )
+                                self.fail(task.id, error_msg)
+                                QUEUE_TASKS.labels(result="failed").inc()
                     else:
                         # Fila vazia - aguardar
                         self._stop_event.wait(poll_interval)
@@ -0,0 +1,266 @@
+"""
+RateLimiter - Token bucket compartilhado para todas as chamadas a API Google.
+
+- Um bucket por (endpoint, modelo), com limite de requisicoes/minuto e de
+  chamadas simultaneas (governador de concorrencia).
+- Backoff adaptativo: um 429/5xx reduz a taxa pela metade e bloqueia o bucket
+  pelo retryDelay informado pela API; cada sucesso recupera a taxa aos poucos
+  (AIMD). As esperas acontecem no bucket, compartilhadas por todas as threads.
+- Faixa de prioridade: chamadas interativas (/search, /rag) passam na frente
+  de chamadas em background (worker da fila, backfills) que estejam aguardando.
+
+Os limites valem por processo: com N processos, configure ~quota/N.
+"""
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+ENDPOINT_GENERATE = "generate"
+ENDPOINT_EMBED = "embed"
+ENDPOINT_FILES = "files"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimitTimeout(RuntimeError):
+    """Tempo maximo de espera por uma vaga no bucket excedido."""
+
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Define a prioridade das chamadas Google feitas dentro do bloco."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    if isinstance(code, int):
+        return code
+    if "RESOURCE_EXHAUSTED" in str(exc):
+        return 429
+    return None
+
+
+def _retry_delay(exc: Exception) -> Optional[float]:
+    """Extrai o retryDelay (ex: '23s') dos detalhes do erro da API, se houver."""
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(exc))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Token bucket com concorrencia maxima, prioridade e taxa adaptativa."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        max_concurrency: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_rate = requests_per_minute / 60.0  # tokens por segundo
+        self.min_rate = self.max_rate * 0.1
+        self.rate = self.max_rate
+        self.max_concurrency = max(1, max_concurrency)
+        self.capacity = float(self.max_concurrency)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._blocked_until = 0.0
+        self._consecutive_errors = 0
+        self._inflight = 0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self._cond = threading.Condition()
+        # Contadores para observabilidade
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def _wait_time(self, now: float, priority: int) -> float:
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self._inflight >= self.max_concurrency:
+            return 1.0  # acordado por release()
+        if priority > PRIORITY_INTERACTIVE and self._waiting[PRIORITY_INTERACTIVE] > 0:
+            return 0.05  # cede a vez para chamadas interativas
+        if self._tokens >= 1.0:
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """Aguarda um token e uma vaga de concorrencia."""
+        start = self._clock()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    wait = self._wait_time(now, priority)
+                    if wait <= 0:
+                        self._tokens -= 1.0
+                        self._inflight += 1
+                        waited = now - start
+                        if waited > 0.001:
+                            self.wait_seconds += waited
+                        return
+                    if deadline is not None and now + wait > deadline:
+                        raise RateLimitTimeout(f"Timeout aguardando bucket {self.name}")
+                    self._cond.wait(min(wait, 1.0))
+            finally:
+                self._waiting[priority] -= 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._inflight = max(0, self._inflight - 1)
+            self._cond.notify_all()
+
+    def penalize(self, retry_after: Optional[float] = None) -> float:
+        """Reduz a taxa pela metade e bloqueia o bucket. Retorna o bloqueio aplicado."""
+        with self._cond:
+            self._consecutive_errors += 1
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate * 0.5)
+            delay = retry_after if retry_after is not None else min(
+                60.0, 2.0 ** self._consecutive_errors
+            )
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._tokens = 0.0
+            self._cond.notify_all()
+            return delay
+
+    def reward(self) -> None:
+        """Sucesso: recupera a taxa gradualmente (aumento aditivo)."""
+        with self._cond:
+            self._consecutive_errors = 0
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "rate_per_minute": round(self.rate * 60, 1),
+                "max_rate_per_minute": round(self.max_rate * 60, 1),
+                "inflight": self._inflight,
+                "waiting_interactive": self._waiting[PRIORITY_INTERACTIVE],
+                "waiting_background": self._waiting[PRIORITY_BACKGROUND],
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """Registro de buckets por (endpoint, modelo) com retry adaptativo."""
+
+    def __init__(self, limits: dict[str, tuple[float, int]], max_retries: int = 5):
+        """
+        Args:
+            limits: {endpoint: (requisicoes_por_minuto, concorrencia_maxima)}
+            max_retries: Tentativas extras em erros 429/5xx
+        """
+        self.limits = limits
+        self.max_retries = max_retries
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: str, model: str) -> TokenBucket:
+        key = (endpoint, model)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rpm, concurrency = self.limits[endpoint]
+                bucket = TokenBucket(f"{endpoint}:{model}", rpm, concurrency)
+                self._buckets[key] = bucket
+            return bucket
+
+    @contextmanager
+    def slot(self, endpoint: str, model: str, priority: Optional[int] = None):
+        """Reserva uma vaga no bucket durante o bloco."""
+        bucket = self.bucket(endpoint, model)
+        bucket.acquire(current_priority() if priority is None else priority)
+        try:
+            yield bucket
+        finally:
+            bucket.release()
+
+    def call(self, endpoint: str, model: str, fn: Callable, /, *args, **kwargs):
+        """
+        Executa fn respeitando o bucket. Erros 429/5xx penalizam o bucket e a
+        chamada e refeita apos o bloqueio; demais erros sao propagados.
+        """
+        attempt = 0
+        while True:
+            with self.slot(endpoint, model) as bucket:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    status = _status_code(e)
+                    if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                        raise
+                    delay = bucket.penalize(_retry_delay(e))
+                    attempt += 1
+                    logger.warning(
+                        f"{bucket.name}: erro {status}, bucket bloqueado por {delay:.1f}s "
+                        f"(tentativa {attempt}/{self.max_retries})"
+                    )
+                    continue
+            bucket.reward()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {bucket.name: bucket.stats() for bucket in buckets.values()}
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """RateLimiter unico do processo, configurado a partir de settings."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter(
+                {
+                    ENDPOINT_GENERATE: (settings.gemini_rpm, settings.gemini_max_concurrency),
+                    ENDPOINT_EMBED: (settings.embedding_rpm, settings.embedding_max_concurrency),
+                    ENDPOINT_FILES: (settings.files_rpm, settings.files_max_concurrency),
+                },
+                max_retries=settings.google_max_retries,
+            )
+        return _default_limiter
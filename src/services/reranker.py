@@ -0,0 +1,192 @@
+"""
+Reranking local (CPU) entre a busca vetorial e a geracao RAG.
+
+A busca traz um conjunto amplo de candidatos (RERANK_CANDIDATES); o reranker
+reordena e so os top_k melhores vao para o prompt do Gemini, reduzindo
+tamanho do prompt, latencia e custo.
+
+- FeatureReranker: combina o score da busca (normalizado no conjunto) com
+  standalone_score, visual_quality_score e viral_potential. Sem dependencias.
+- CrossEncoderReranker: cross-encoder ONNX pequeno (ex: ms-marco-MiniLM-L-6-v2
+  exportado) sobre (query, texto do clip). Requer onnxruntime e tokenizers;
+  sem eles, get_reranker() cai para o FeatureReranker.
+"""
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+from src.config import settings
+from src.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+RERANK_NONE = "none"
+RERANK_FEATURES = "features"
+RERANK_CROSS_ENCODER = "cross_encoder"
+
+# Pesos do FeatureReranker: relevancia da busca domina, qualidade editorial desempata
+FEATURE_WEIGHTS = {
+    "retrieval": 0.6,
+    "standalone_score": 0.15,
+    "visual_quality_score": 0.15,
+    "viral_potential": 0.1,
+}
+
+# Peso do cross-encoder quando combinado com as features editoriais
+CROSS_ENCODER_WEIGHT = 0.7
+
+
+def _feature(candidate: dict, video, name: str) -> float:
+    """Campo 0-10 do payload (ou do video) normalizado para 0-1; ausente = neutro."""
+    value = candidate.get("payload", {}).get(name)
+    if value is None and video is not None:
+        value = getattr(video, name, None)
+    return 0.5 if value is None else float(value) / 10.0
+
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    span = values.max() - values.min()
+    if span <= 0:
+        return np.ones_like(values)
+    return (values - values.min()) / span
+
+
+def document_text(candidate: dict, video=None) -> str:
+    """Texto do clip avaliado pelo cross-encoder."""
+    payload = candidate.get("payload", {})
+    parts = [payload.get("event_headline")]
+    if video is not None:
+        parts += [
+            video.visual_description,
+            video.narrative_description,
+            video.filming_location,
+            ", ".join(video.visual_tags or []),
+        ]
+    return ". ".join(p for p in parts if p)
+
+
+class FeatureReranker:
+    """Reranking por combinacao linear de relevancia e qualidade editorial."""
+
+    name = RERANK_FEATURES
+
+    def __init__(self, weights: Optional[dict[str, float]] = None):
+        self.weights = weights or FEATURE_WEIGHTS
+
+    def feature_scores(self, candidates: list[dict], videos: Optional[dict] = None) -> np.ndarray:
+        """Parte editorial do score (sem a relevancia da busca)."""
+        videos = videos or {}
+        scores = np.zeros(len(candidates))
+        for name, weight in self.weights.items():
+            if name == "retrieval":
+                continue
+            scores += weight * np.array(
+                [_feature(c, videos.get(c["id"]), name) for c in candidates]
+            )
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        candidates: list[dict],
+        top_k: int,
+        videos: Optional[dict] = None,
+    ) -> list[dict]:
+        """
+        Reordena os candidatos e retorna os top_k, cada um com "rerank_score".
+
+        Args:
+            query: Texto da query
+            candidates: Resultados da busca ({id, score, payload})
+            top_k: Quantidade retornada
+            videos: {id: video} ja carregados do banco (opcional)
+        """
+        if not candidates:
+            return []
+        retrieval = _min_max(np.array([c["score"] for c in candidates], dtype=float))
+        scores = self.weights["retrieval"] * retrieval + self.feature_scores(candidates, videos)
+        return _top_k(candidates, scores, top_k)
+
+
+class CrossEncoderReranker:
+    """Cross-encoder ONNX (query, documento) combinado com as features editoriais."""
+
+    name = RERANK_CROSS_ENCODER
+
+    def __init__(self, model_path: str, tokenizer_path: str, max_length: int = 256):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.session = onnxruntime.InferenceSession(
+            model_path, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.features = FeatureReranker()
+
+    def score_pairs(self, query: str, texts: list[str]) -> np.ndarray:
+        """Relevancia 0-1 de cada texto para a query (um unico batch)."""
+        encodings = self.tokenizer.encode_batch([(query, text) for text in texts])
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(
+            None, {k: v for k, v in inputs.items() if k in self.input_names}
+        )[0]
+        return 1.0 / (1.0 + np.exp(-logits.reshape(len(texts), -1)[:, 0]))
+
+    def rerank(
+        self,
+        query: str,
+        candidates: list[dict],
+        top_k: int,
+        videos: Optional[dict] = None,
+    ) -> list[dict]:
+        if not candidates:
+            return []
+        videos = videos or {}
+        texts = [document_text(c, videos.get(c["id"])) for c in candidates]
+        relevance = self.score_pairs(query, texts)
+        editorial = self.features.feature_scores(candidates, videos)
+        scores = CROSS_ENCODER_WEIGHT * relevance + (1 - CROSS_ENCODER_WEIGHT) * editorial
+        return _top_k(candidates, scores, top_k)
+
+
+def _top_k(candidates: list[dict], scores: np.ndarray, top_k: int) -> list[dict]:
+    # Ordenacao estavel: empates mantem a ordem da busca
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [{**candidates[i], "rerank_score": round(float(scores[i]), 4)} for i in order]
+
+
+def rerank(reranker, query: str, candidates: list[dict], top_k: int, videos=None) -> list[dict]:
+    """Aplica o reranker (None = corta no top_k da busca) medindo a etapa."""
+    if reranker is None:
+        return candidates[:top_k]
+    with stage_timer(f"rerank_{reranker.name}", candidates=len(candidates)):
+        return reranker.rerank(query, candidates, top_k, videos)
+
+
+def get_reranker(mode: Optional[str] = None):
+    """Reranker configurado em RERANK_MODE (none, features, cross_encoder)."""
+    mode = (mode or settings.rerank_mode).lower()
+    if mode == RERANK_NONE:
+        return None
+    if mode == RERANK_CROSS_ENCODER:
+        try:
+            return CrossEncoderReranker(
+                settings.rerank_model_path,
+                settings.rerank_tokenizer_path,
+            )
+        except Exception as e:
+            # Dependencias ou arquivos do modelo ausentes
+            logger.warning(f"Cross-encoder indisponivel ({e}); usando reranking por features")
+            return FeatureReranker()
+    if mode == RERANK_FEATURES:
+        return FeatureReranker()
+    raise ValueError(f"RERANK_MODE invalido: {mode} (use none, features, cross_encoder)")
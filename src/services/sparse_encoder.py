@@ -0,0 +1,83 @@
+"""
+Vetores esparsos BM25 para a busca hibrida (lexical + densa) no Qdrant.
+
+- Documento: peso BM25 de cada termo (frequencia saturada por k1 e
+  normalizada pelo tamanho do texto); o IDF e aplicado pelo Qdrant
+  (collection com Modifier.IDF), entao o corpus nao precisa ser conhecido aqui.
+- Query: peso 1 por termo distinto.
+- Termos sao minusculos, sem acento; indices sao o hash estavel do termo,
+  o que permite casar IDs literais (newsflare_id) e nomes de lugares.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+
+from qdrant_client.models import SparseVector
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[_-][a-z0-9]+)*")
+
+# Palavras sem valor lexical (pt/en) que aparecem em quase todo texto composto
+STOPWORDS = frozenset(
+    """
+    a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela
+    para com sem sob sobre entre e ou que se ao aos mas como mais muito ja
+    the an and or of in on at to for with by from is are was be this that it
+    """.split()
+)
+
+# Parametros BM25 (valores usuais)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Tamanho medio esperado (em termos) de compose_embedding_text
+BM25_AVG_DOC_LEN = 120.0
+
+
+def _strip_accents(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    """Termos normalizados do texto (minusculos, sem acento, sem stopwords)."""
+    terms = []
+    for token in _TOKEN_RE.findall(_strip_accents(text.lower())):
+        terms.append(token)
+        # IDs compostos (ex: nf-12345) tambem casam pelas partes
+        if "-" in token or "_" in token:
+            terms.extend(re.split(r"[_-]", token))
+    return [t for t in terms if t not in STOPWORDS and len(t) > 1]
+
+
+def term_index(term: str) -> int:
+    """Indice estavel (entre processos) do termo no vetor esparso."""
+    digest = hashlib.blake2b(term.encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "little") & 0x7FFFFFFF
+
+
+def _to_sparse(weights: dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+def encode_document(text: str) -> SparseVector:
+    """Vetor esparso BM25 (sem IDF) de um texto indexado."""
+    counts = Counter(tokenize(text))
+    doc_len = sum(counts.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / BM25_AVG_DOC_LEN)
+    weights: dict[int, float] = {}
+    for term, tf in counts.items():
+        index = term_index(term)
+        # Colisoes de hash somam os pesos
+        weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + norm)
+    return _to_sparse(weights)
+
+
+def encode_query(text: str) -> SparseVector:
+    """Vetor esparso da query: cada termo distinto com peso 1."""
+    return _to_sparse({term_index(term): 1.0 for term in set(tokenize(text))})
+
+
+def is_empty(vector: SparseVector) -> bool:
+    return not vector.indices
@@ -0,0 +1,143 @@
+"""
+ThemeClassifier - Atribuicao local (sem LLM) de compilation_themes.
+
+Regressao logistica one-vs-rest (multi-rotulo) em NumPy sobre os embeddings
+visual + narrativo de cada clip (collection dual). Esses vetores existem para
+clips antigos analisados so no modo dual e, no ingest, ja estao prontos antes
+do prompt de compilation; o embedding unificado nao serve de entrada porque o
+texto composto inclui os proprios temas (vazaria o rotulo no treino).
+
+Treinado com os clips ja rotulados pelo Gemini; o modelo (pesos + temas) e um
+.npz pequeno carregado pelo worker e por scripts/auto_theme.py.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.compilation_themes import COMPILATION_THEMES
+from src.services.diversity import normalize
+
+logger = logging.getLogger(__name__)
+
+# Probabilidade minima para atribuir um tema
+DEFAULT_THRESHOLD = 0.5
+# Temas por clip (o prompt de compilation atribui poucos)
+MAX_THEMES = 3
+
+
+@dataclass
+class ThemePrediction:
+    """Temas previstos para um clip e a confianca da decisao."""
+
+    themes: list[str]
+    scores: dict[str, float] = field(default_factory=dict)
+    # Menor max(p, 1 - p) entre todos os temas: 1.0 = todos claramente dentro ou fora
+    confidence: float = 0.0
+
+
+def theme_features(visual: list[float], narrative: list[float]) -> np.ndarray:
+    """Vetor de entrada do classificador: visual e narrativo normalizados, concatenados."""
+    return np.concatenate([normalize(visual), normalize(narrative)])
+
+
+class ThemeClassifier:
+    """Regressao logistica one-vs-rest treinada por gradiente (full batch)."""
+
+    def __init__(self, themes: list[str], weights: np.ndarray, bias: np.ndarray):
+        self.themes = themes
+        self.weights = weights
+        self.bias = bias
+
+    @classmethod
+    def fit(
+        cls,
+        features: np.ndarray,
+        labels: list[list[str]],
+        epochs: int = 300,
+        learning_rate: float = 1.0,
+        l2: float = 1e-4,
+    ) -> "ThemeClassifier":
+        """
+        Treina com os clips rotulados.
+
+        Args:
+            features: Matriz n x d (theme_features de cada clip)
+            labels: Temas de cada clip (codigos fora da taxonomia sao ignorados)
+            epochs: Passos de gradiente sobre o conjunto inteiro
+            learning_rate: Passo do gradiente
+            l2: Regularizacao dos pesos
+        """
+        themes = [t for t in COMPILATION_THEMES if any(t in row for row in labels)]
+        if not themes:
+            raise ValueError("Nenhum clip rotulado com temas da taxonomia")
+        x = np.asarray(features, dtype=np.float32)
+        y = np.array([[t in row for t in themes] for row in labels], dtype=np.float32)
+        n, d = x.shape
+
+        # Temas raros pesam mais nos positivos (evita prever "nenhum" sempre)
+        positives = y.sum(axis=0)
+        pos_weight = np.clip((n - positives) / np.maximum(positives, 1), 1.0, 20.0)
+        sample_weight = np.where(y > 0, pos_weight, 1.0)
+
+        weights = np.zeros((d, len(themes)), dtype=np.float32)
+        bias = np.zeros(len(themes), dtype=np.float32)
+        for _ in range(epochs):
+            probs = _sigmoid(x @ weights + bias)
+            error = (probs - y) * sample_weight / n
+            weights -= learning_rate * (x.T @ error + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+        return cls(themes, weights, bias)
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Probabilidade de cada tema (n x temas)."""
+        x = np.atleast_2d(np.asarray(features, dtype=np.float32))
+        return _sigmoid(x @ self.weights + self.bias)
+
+    def predict(
+        self,
+        features: np.ndarray,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_themes: int = MAX_THEMES,
+    ) -> list[ThemePrediction]:
+        """Temas acima do threshold (no maximo max_themes) de cada clip."""
+        predictions = []
+        for probs in self.predict_proba(features):
+            order = np.argsort(-probs)[:max_themes]
+            themes = [self.themes[i] for i in order if probs[i] >= threshold]
+            predictions.append(
+                ThemePrediction(
+                    themes=themes,
+                    scores={self.themes[i]: round(float(probs[i]), 4) for i in order},
+                    confidence=round(float(np.maximum(probs, 1 - probs).min()), 4),
+                )
+            )
+        return predictions
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, themes=np.array(self.themes), weights=self.weights, bias=self.bias)
+
+    @classmethod
+    def load(cls, path: str) -> "ThemeClassifier":
+        data = np.load(path)
+        return cls([str(t) for t in data["themes"]], data["weights"], data["bias"])
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+def load_theme_classifier(path: str) -> Optional[ThemeClassifier]:
+    """Classificador salvo em path (None se ainda nao treinado)."""
+    if not Path(path).exists():
+        return None
+    try:
+        return ThemeClassifier.load(path)
+    except Exception as e:
+        logger.warning(f"Classificador de temas invalido em {path}: {e}")
+        return None
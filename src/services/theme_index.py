@@ -0,0 +1,251 @@
+"""
+ThemeIndex - Centroides dos temas de compilado (COMPILATION_THEMES) no Qdrant.
+
+Cada tema e um ponto na collection "{collection}_themes" cujo vetor e
+normalize(THEME_DESCRIPTION_WEIGHT * embedding(descricao) + soma dos
+embeddings unificados dos clips marcados com o tema). A soma fica no payload
+(vector_sum), entao clips novos, reanalisados ou removidos so somam/subtraem
+o proprio vetor: nenhuma chamada de embedding fora do rebuild().
+
+Com o indice pronto, "navegar por tema" e sugerir temas para clips antigos
+sao buscas vetoriais puras, sem chamada ao Gemini.
+
+Atualizacoes sao serializadas por processo; com varios workers em processos
+distintos, rode scripts/build_theme_index.py periodicamente para corrigir
+eventual deriva das somas.
+"""
+
+import logging
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from src.compilation_themes import COMPILATION_THEMES
+from src.metrics import stage_timer
+from src.services.diversity import normalize
+from src.services.embedding_service import EmbeddingService
+from src.services.qdrant_service import QdrantService, dense_vector
+
+logger = logging.getLogger(__name__)
+
+THEMES_COLLECTION_SUFFIX = "_themes"
+
+# A descricao do tema pesa como este numero de clips no centroide
+THEME_DESCRIPTION_WEIGHT = 5.0
+
+# Pontos lidos por chamada no rebuild
+SCROLL_BATCH_SIZE = 512
+
+
+@dataclass
+class ThemeMatch:
+    """Tema proximo de um vetor (ou listado com sua contagem de clips)."""
+
+    theme: str
+    description: str
+    clip_count: int
+    score: Optional[float] = None
+
+
+def theme_point_id(theme: str) -> str:
+    """ID estavel do ponto do tema (UUID derivado do codigo)."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"compilation-theme:{theme}"))
+
+
+class ThemeIndex:
+    """Centroides de tema com atualizacao incremental."""
+
+    def __init__(
+        self,
+        qdrant_service: QdrantService,
+        embedding_service: Optional[EmbeddingService] = None,
+    ):
+        self.qdrant = qdrant_service
+        self.client = qdrant_service.client
+        self.embedding = embedding_service
+        self.collection = qdrant_service.collection + THEMES_COLLECTION_SUFFIX
+        self._lock = threading.Lock()
+        self._ensure_collection()
+
+    def _ensure_collection(self) -> None:
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                collection_name=self.collection,
+                vectors_config=VectorParams(
+                    size=self.qdrant.vector_size, distance=Distance.COSINE
+                ),
+            )
+
+    def is_built(self) -> bool:
+        return self.client.count(self.collection).count >= len(COMPILATION_THEMES)
+
+    def rebuild(self) -> dict[str, int]:
+        """
+        Recalcula todos os centroides: embedding das descricoes (uma chamada
+        por tema) + varredura da collection unificada. Retorna clips por tema.
+        """
+        if self.embedding is None:
+            raise ValueError("rebuild() requer EmbeddingService")
+        sums = {
+            theme: THEME_DESCRIPTION_WEIGHT
+            * normalize(self.embedding.generate(description, stage="embedding_theme"))
+            for theme, description in COMPILATION_THEMES.items()
+        }
+        counts = dict.fromkeys(COMPILATION_THEMES, 0)
+
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.qdrant.unified_collection,
+                limit=SCROLL_BATCH_SIZE,
+                offset=offset,
+                with_payload=["compilation_themes"],
+                with_vectors=True,
+            )
+            for point in points:
+                vector = dense_vector(point.vector)
+                themes = [t for t in (point.payload or {}).get("compilation_themes") or [] if t in sums]
+                if vector is None or not themes:
+                    continue
+                unit = normalize(vector)
+                for theme in themes:
+                    sums[theme] += unit
+                    counts[theme] += 1
+            if offset is None:
+                break
+
+        with self._lock:
+            self.client.upsert(
+                collection_name=self.collection,
+                points=[self._point(theme, sums[theme], counts[theme]) for theme in COMPILATION_THEMES],
+            )
+        logger.info(f"Indice de temas reconstruido: {sum(counts.values())} atribuicoes de clips")
+        return counts
+
+    def update_clip(self, video_id: int, vector: list[float], themes: list[str]) -> None:
+        """
+        Ajusta os centroides para o novo vetor/temas do clip. Deve ser chamado
+        antes de sobrescrever o ponto na collection unificada: o vetor e os
+        temas anteriores sao lidos de la e descontados.
+        """
+        old_vector, old_themes = self._current_clip(video_id)
+        new_themes = {t for t in themes or [] if t in COMPILATION_THEMES}
+        new_unit = normalize(vector)
+        if old_vector is not None and old_themes == new_themes and np.allclose(old_vector, new_unit):
+            return
+
+        deltas: dict[str, tuple[np.ndarray, int]] = {}
+        if old_vector is not None:
+            for theme in old_themes:
+                deltas[theme] = (-old_vector, -1)
+        for theme in new_themes:
+            delta, count = deltas.get(theme, (np.zeros_like(new_unit), 0))
+            deltas[theme] = (delta + new_unit, count + 1)
+        self._apply(deltas)
+
+    def remove_clip(self, video_id: int) -> None:
+        """Desconta o clip dos centroides (antes de remove-lo do Qdrant)."""
+        old_vector, old_themes = self._current_clip(video_id)
+        if old_vector is not None:
+            self._apply({theme: (-old_vector, -1) for theme in old_themes})
+
+    def centroid(self, theme: str) -> Optional[list[float]]:
+        """Vetor do tema (None se o indice ainda nao foi construido)."""
+        points = self.client.retrieve(
+            self.collection, ids=[theme_point_id(theme)], with_vectors=True
+        )
+        return list(points[0].vector) if points else None
+
+    def nearest_themes(
+        self,
+        vector: list[float],
+        limit: int = 3,
+        min_score: Optional[float] = None,
+    ) -> list[ThemeMatch]:
+        """Temas cujo centroide e mais proximo do vetor (auto-tagging)."""
+        with stage_timer("theme_lookup"):
+            results = self.client.query_points(
+                collection_name=self.collection,
+                query=vector,
+                limit=limit,
+                score_threshold=min_score,
+                with_payload=["theme", "description", "clip_count"],
+            )
+        return [
+            ThemeMatch(
+                theme=hit.payload["theme"],
+                description=hit.payload["description"],
+                clip_count=hit.payload["clip_count"],
+                score=round(hit.score, 4),
+            )
+            for hit in results.points
+        ]
+
+    def list_themes(self) -> list[ThemeMatch]:
+        """Todos os temas indexados com a contagem de clips."""
+        points, _ = self.client.scroll(
+            collection_name=self.collection,
+            limit=len(COMPILATION_THEMES) * 2,
+            with_payload=["theme", "description", "clip_count"],
+        )
+        themes = [
+            ThemeMatch(
+                theme=p.payload["theme"],
+                description=p.payload["description"],
+                clip_count=p.payload["clip_count"],
+            )
+            for p in points
+        ]
+        return sorted(themes, key=lambda t: t.theme)
+
+    def _current_clip(self, video_id: int) -> tuple[Optional[np.ndarray], set[str]]:
+        points = self.client.retrieve(
+            self.qdrant.unified_collection,
+            ids=[video_id],
+            with_payload=["compilation_themes"],
+            with_vectors=True,
+        )
+        if not points or dense_vector(points[0].vector) is None:
+            return None, set()
+        themes = {
+            t for t in (points[0].payload or {}).get("compilation_themes") or [] if t in COMPILATION_THEMES
+        }
+        return normalize(dense_vector(points[0].vector)), themes
+
+    def _apply(self, deltas: dict[str, tuple[np.ndarray, int]]) -> None:
+        if not deltas:
+            return
+        with self._lock:
+            points = self.client.retrieve(
+                self.collection,
+                ids=[theme_point_id(theme) for theme in deltas],
+                with_payload=True,
+            )
+            current = {p.payload["theme"]: p.payload for p in points}
+            updated = []
+            for theme, (delta, count) in deltas.items():
+                payload = current.get(theme)
+                if payload is None:
+                    # Indice ainda nao construido para o tema; o rebuild cobre
+                    logger.debug(f"Tema {theme} fora do indice; rode build_theme_index")
+                    continue
+                vector_sum = np.asarray(payload["vector_sum"]) + delta
+                updated.append(self._point(theme, vector_sum, max(payload["clip_count"] + count, 0)))
+            if updated:
+                self.client.upsert(collection_name=self.collection, points=updated)
+
+    def _point(self, theme: str, vector_sum: np.ndarray, clip_count: int) -> PointStruct:
+        return PointStruct(
+            id=theme_point_id(theme),
+            vector=normalize(vector_sum).tolist(),
+            payload={
+                "theme": theme,
+                "description": COMPILATION_THEMES[theme],
+                "clip_count": clip_count,
+                "vector_sum": [float(x) for x in vector_sum],
+            },
+        )
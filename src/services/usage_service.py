@@ -0,0 +1,365 @@
+"""
+UsageService - Contabilidade de tokens e custo das chamadas Google (Gemini + embeddings).
+
+Cada chamada registra um UsageRecord com etapa (stage), modelo, tokens e custo.
+O video_id e a rota da API sao obtidos do escopo corrente (usage_scope),
+definido pelo VideoProcessor e pela API, sem precisar atravessar assinaturas.
+Os registros sao gravados em lote por uma thread de fundo (tabela api_usage).
+"""
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from src.models import ApiUsage
+from src.services.db_engine import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+# Preco em USD por 1M tokens: (entrada, saida).
+# Valores de referencia da tabela publica do Gemini API - ajuste conforme contrato.
+MODEL_PRICING: dict[str, tuple[float, float]] = {
+    "gemini-3-pro-preview": (2.00, 12.00),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-embedding-001": (0.15, 0.0),
+    "text-embedding-004": (0.0, 0.0),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Custo estimado em USD; modelos sem preco cadastrado custam 0."""
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+# ============================================================================
+# ESCOPO (video_id / rota) PROPAGADO VIA CONTEXTVARS
+# ============================================================================
+
+_usage_scope: contextvars.ContextVar[dict] = contextvars.ContextVar(
+    "usage_scope", default={}
+)
+
+
+@contextmanager
+def usage_scope(video_id: Optional[int] = None, route: Optional[str] = None):
+    """
+    Define video_id e/ou rota para as chamadas feitas dentro do bloco.
+    Escopos aninhados herdam os campos nao informados do escopo externo.
+    """
+    scope = dict(_usage_scope.get())
+    if video_id is not None:
+        scope["video_id"] = video_id
+    if route is not None:
+        scope["route"] = route
+    token = _usage_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _usage_scope.reset(token)
+
+
+def set_usage_route(route: str) -> contextvars.Token:
+    """Define a rota no escopo corrente (uso em dependencias FastAPI)."""
+    scope = dict(_usage_scope.get())
+    scope["route"] = route
+    return _usage_scope.set(scope)
+
+
+def reset_usage_scope(token: contextvars.Token) -> None:
+    _usage_scope.reset(token)
+
+
+def current_usage_scope() -> dict:
+    return _usage_scope.get()
+
+
+@dataclass
+class UsageRecord:
+    """Consumo de uma chamada a API Google."""
+
+    service: str  # gemini | embedding
+    stage: str
+    model: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    total_tokens: int = 0
+    cached_tokens: int = 0
+    input_chars: int = 0
+    estimated: bool = False
+    latency_ms: float = 0.0
+    video_id: Optional[int] = None
+    route: Optional[str] = None
+    cost_usd: float = 0.0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+
+class UsageService:
+    """
+    Registra consumo por chamada e agrega por video, etapa, modelo e rota.
+
+    record() nao bloqueia a chamada de API: os registros vao para um buffer
+    gravado em lote a cada flush_interval segundos (ou ao atingir batch_size).
+    """
+
+    def __init__(
+        self,
+        db_url: str,
+        flush_interval: float = 2.0,
+        batch_size: int = 200,
+    ):
+        self.engine = get_engine(db_url)
+        self.SessionLocal = sessionmaker(bind=self.engine)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: list[UsageRecord] = []
+        self._lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Captura
+    # ------------------------------------------------------------------
+
+    def record_response(
+        self,
+        service: str,
+        stage: str,
+        model: str,
+        response,
+        latency_ms: float,
+    ) -> UsageRecord:
+        """Registra uma resposta generate_content a partir de usage_metadata."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt = (getattr(usage, "prompt_token_count", None) or 0) if usage else 0
+        output = (getattr(usage, "candidates_token_count", None) or 0) if usage else 0
+        thoughts = (getattr(usage, "thoughts_token_count", None) or 0) if usage else 0
+        cached = (getattr(usage, "cached_content_token_count", None) or 0) if usage else 0
+        total = (getattr(usage, "total_token_count", None) or 0) if usage else 0
+        # Tokens de raciocinio sao cobrados como saida
+        return self.record(
+            UsageRecord(
+                service=service,
+                stage=stage,
+                model=model,
+                prompt_tokens=prompt,
+                output_tokens=output + thoughts,
+                total_tokens=total or prompt + output + thoughts,
+                cached_tokens=cached,
+                latency_ms=latency_ms,
+            )
+        )
+
+    def record_embedding(
+        self,
+        stage: str,
+        model: str,
+        text: str,
+        response,
+        latency_ms: float,
+    ) -> UsageRecord:
+        """
+        Registra uma chamada embed_content. O Gemini API nao retorna contagem de
+        tokens para embeddings; nesse caso estima ~4 caracteres por token.
+        """
+        tokens = 0
+        for emb in getattr(response, "embeddings", None) or []:
+            statistics = getattr(emb, "statistics", None)
+            tokens += int(getattr(statistics, "token_count", None) or 0)
+        estimated = tokens == 0
+        if estimated:
+            tokens = max(1, len(text) // 4)
+        return self.record(
+            UsageRecord(
+                service="embedding",
+                stage=stage,
+                model=model,
+                prompt_tokens=tokens,
+                total_tokens=tokens,
+                input_chars=len(text),
+                estimated=estimated,
+                latency_ms=latency_ms,
+            )
+        )
+
+    def record(self, record: UsageRecord) -> UsageRecord:
+        """Completa o registro com escopo e custo e enfileira para gravacao."""
+        scope = _usage_scope.get()
+        if record.video_id is None:
+            record.video_id = scope.get("video_id")
+        if record.route is None:
+            record.route = scope.get("route")
+        record.cost_usd = estimate_cost(record.model, record.prompt_tokens, record.output_tokens)
+
+        with self._lock:
+            self._buffer.append(record)
+            should_flush = len(self._buffer) >= self.batch_size
+        self._ensure_thread()
+        if should_flush:
+            self._flush_event.set()
+        return record
+
+    # ------------------------------------------------------------------
+    # Gravacao em lote
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Grava o buffer no banco. Retorna quantos registros foram gravados."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            with self.SessionLocal() as session:
+                session.bulk_insert_mappings(
+                    ApiUsage,
+                    [
+                        {
+                            "service": r.service,
+                            "stage": r.stage,
+                            "model": r.model,
+                            "video_id": r.video_id,
+                            "route": r.route,
+                            "prompt_tokens": r.prompt_tokens,
+                            "output_tokens": r.output_tokens,
+                            "total_tokens": r.total_tokens,
+                            "cached_tokens": r.cached_tokens,
+                            "input_chars": r.input_chars,
+                            "estimated": r.estimated,
+                            "cost_usd": r.cost_usd,
+                            "latency_ms": r.latency_ms,
+                            "created_at": r.created_at,
+                        }
+                        for r in batch
+                    ],
+                )
+                session.commit()
+            return len(batch)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar {len(batch)} registros de uso: {e}")
+            return 0
+
+    def close(self) -> None:
+        """Para a thread de gravacao e grava o que restou no buffer."""
+        self._stop_event.set()
+        self._flush_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # Agregacoes
+    # ------------------------------------------------------------------
+
+    def get_summary(self, days: Optional[int] = None, top_videos: int = 10) -> dict:
+        """
+        Agrega consumo por etapa, modelo e rota, mais os videos mais caros.
+
+        Args:
+            days: Janela em dias (None = todo o historico)
+            top_videos: Quantos videos retornar no ranking de custo
+        """
+        since = datetime.utcnow() - timedelta(days=days) if days else None
+
+        def _filtered(query):
+            return query.filter(ApiUsage.created_at >= since) if since else query
+
+        metrics = (
+            func.count(ApiUsage.id),
+            func.coalesce(func.sum(ApiUsage.prompt_tokens), 0),
+            func.coalesce(func.sum(ApiUsage.output_tokens), 0),
+            func.coalesce(func.sum(ApiUsage.total_tokens), 0),
+            func.coalesce(func.sum(ApiUsage.cost_usd), 0.0),
+            func.coalesce(func.avg(ApiUsage.latency_ms), 0.0),
+        )
+
+        def _row_to_dict(row) -> dict:
+            calls, prompt, output, total, cost, latency = row
+            return {
+                "calls": int(calls),
+                "prompt_tokens": int(prompt),
+                "output_tokens": int(output),
+                "total_tokens": int(total),
+                "cost_usd": round(float(cost), 6),
+                "avg_latency_ms": round(float(latency), 1),
+            }
+
+        with self.SessionLocal() as session:
+            totals = _filtered(session.query(*metrics)).one()
+
+            grouped = {}
+            for name, column in [
+                ("by_stage", ApiUsage.stage),
+                ("by_model", ApiUsage.model),
+                ("by_route", ApiUsage.route),
+            ]:
+                query = _filtered(session.query(column, *metrics))
+                if name == "by_route":
+                    query = query.filter(ApiUsage.route.isnot(None))
+                rows = query.group_by(column).all()
+                grouped[name] = {row[0]: _row_to_dict(row[1:]) for row in rows}
+
+            video_rows = (
+                _filtered(session.query(ApiUsage.video_id, *metrics))
+                .filter(ApiUsage.video_id.isnot(None))
+                .group_by(ApiUsage.video_id)
+                .order_by(func.sum(ApiUsage.cost_usd).desc())
+                .limit(top_videos)
+                .all()
+            )
+
+        return {
+            "window_days": days,
+            "totals": _row_to_dict(totals),
+            **grouped,
+            "top_videos": [
+                {"video_id": row[0], **_row_to_dict(row[1:])} for row in video_rows
+            ],
+        }
+
+    def get_video_usage(self, video_id: int) -> dict:
+        """Consumo de um video agregado por etapa."""
+        with self.SessionLocal() as session:
+            rows = (
+                session.query(
+                    ApiUsage.stage,
+                    func.count(ApiUsage.id),
+                    func.coalesce(func.sum(ApiUsage.total_tokens), 0),
+                    func.coalesce(func.sum(ApiUsage.cost_usd), 0.0),
+                )
+                .filter(ApiUsage.video_id == video_id)
+                .group_by(ApiUsage.stage)
+                .all()
+            )
+        return {
+            stage: {
+                "calls": int(calls),
+                "total_tokens": int(tokens),
+                "cost_usd": round(float(cost), 6),
+            }
+            for stage, calls, tokens, cost in rows
+        }
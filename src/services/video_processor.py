@@ -7,16 +7,42 @@ import logging
 from dataclasses import dataclass
 from typing import Optional
 
-from src.models import VideoAnalysis, DualVideoAnalysis, FullVideoAnalysis
+from src.config import settings
+from src.models import (
+    CompilationAnalysis,
+    DualVideoAnalysis,
+    FullVideoAnalysis,
+    NarrativeAnalysis,
+    ThemeOnlyCompilation,
+    VisualAnalysis,
+)
 from src.services.context_composer import ContextComposer
 from src.services.database_service import DatabaseService
-from src.services.embedding_service import EmbeddingService
-from src.services.gemini_service import GeminiService
+from src.services.embedding_service import DualEmbeddings, EmbeddingService
+from src.services.gemini_service import ANALYSIS_MODE_SINGLE, GeminiService
 from src.services.qdrant_service import QdrantService
-from src.services.queue_service import QueueTask
+from src.services.queue_service import OPTION_REEMBED, QueueTask
+from src.services.rate_limiter import PRIORITY_BACKGROUND, request_priority
+from src.services.theme_classifier import ThemeClassifier, theme_features
+from src.services.theme_index import ThemeIndex
+from src.services.usage_service import usage_scope
+from src.tracing import extract_context, mark_error, span
 
 logger = logging.getLogger(__name__)
 
+# Etapas do processamento com saida persistida em video_checkpoints
+STAGE_UPLOAD = "upload"
+STAGE_VISUAL = "visual"
+STAGE_NARRATIVE = "narrative"
+STAGE_COMPILATION = "compilation"
+STAGE_DUAL_EMBEDDINGS = "dual_embeddings"
+STAGE_UNIFIED_EMBEDDING = "unified_embedding"
+# Temas atribuidos pelo classificador local no lugar do prompt de compilation
+STAGE_AUTO_THEMES = "auto_themes"
+
+# Tamanho maximo do event_headline derivado da narrativa (sem prompt de compilation)
+AUTO_HEADLINE_MAX_CHARS = 120
+
 
 @dataclass
 class ProcessingResult:
@@ -38,6 +64,9 @@ class VideoProcessor:
     2. Geracao de embeddings duplos
     3. Indexacao no Qdrant (collection dual)
     4. Atualizacao no PostgreSQL
+    5. Unified embedding (collection unificada)
+
+    As etapas 1, 2 e 5 sao checkpointed: retries retomam da etapa que falhou.
     """
 
     def __init__(
@@ -46,23 +75,48 @@ class VideoProcessor:
         gemini_service: GeminiService,
         embedding_service: EmbeddingService,
         qdrant_service: QdrantService,
+        theme_index: Optional[ThemeIndex] = None,
+        theme_classifier: Optional[ThemeClassifier] = None,
     ):
         self.db = db_service
         self.gemini = gemini_service
         self.embedding = embedding_service
         self.qdrant = qdrant_service
+        self.theme_index = theme_index
+        self.theme_classifier = theme_classifier
         self.composer = ContextComposer()
 
     def process(self, task: QueueTask) -> ProcessingResult:
         """
         Processa um video da fila com analise FULL (visual + narrativa + compilation).
 
+        Cada etapa persiste sua saida em video_checkpoints assim que conclui;
+        numa nova tentativa as etapas ja concluidas sao puladas.
+        Todas as chamadas Google feitas aqui sao contabilizadas para o video_id
+        e usam a faixa de prioridade background do rate limiter.
+
         Args:
             task: Item da fila com video_id
 
         Returns:
             ProcessingResult com status do processamento
         """
+        with usage_scope(video_id=task.video_id), request_priority(PRIORITY_BACKGROUND):
+            # Continua o trace do request que enfileirou o video (se houver)
+            with span(
+                "video.process",
+                parent=extract_context(task.trace_context),
+                **{"video.id": task.video_id, "queue.attempt": task.attempts},
+            ) as current:
+                if (task.options or {}).get(OPTION_REEMBED):
+                    result = self._reembed(task)
+                else:
+                    result = self._process(task)
+                if not result.success:
+                    mark_error(current, result.error or "")
+                return result
+
+    def _process(self, task: QueueTask) -> ProcessingResult:
         video_id = task.video_id
 
         try:
@@ -77,16 +131,22 @@ class VideoProcessor:
 
             # 2. Marcar como analyzing
             self.db.set_analyzing(video_id)
-            logger.info(f"Iniciando analise FULL do video {video_id}: {video.filename}")
+            checkpoints = self.db.get_checkpoints(video_id)
+            if checkpoints:
+                logger.info(
+                    f"Retomando video {video_id} a partir dos checkpoints: "
+                    f"{', '.join(sorted(checkpoints))}"
+                )
+            else:
+                logger.info(f"Iniciando analise FULL do video {video_id}: {video.filename}")
 
             # 3. Analise Gemini FULL (visual + narrativa + compilation)
-            logger.info(f"Enviando video {video_id} para Gemini (analise full)...")
-            full_analysis = self.gemini.analyze_video_full(video.file_path)
+            auto_themes = bool((task.options or {}).get("auto_themes"))
+            full_analysis = self._run_analysis(video, checkpoints, auto_themes=auto_themes)
             logger.info(f"Analise full concluida para video {video_id}")
 
             # 4. Gerar embeddings duplos
-            logger.info(f"Gerando embeddings duplos para video {video_id}...")
-            dual_embeddings = self.embedding.generate_dual(full_analysis)
+            dual_embeddings = self._run_dual_embeddings(video_id, full_analysis, checkpoints)
             logger.info(f"Embeddings duplos gerados para video {video_id}")
 
             # 5. Indexar no Qdrant (collection dual)
@@ -119,43 +179,15 @@ class VideoProcessor:
 
             # 6. Atualizar PostgreSQL
             self.db.update_full_analysis(video_id, full_analysis, visual_id, narrative_id)
+            if STAGE_AUTO_THEMES in checkpoints:
+                self.db.update_theme_scores(video_id, checkpoints[STAGE_AUTO_THEMES]["scores"])
             logger.info(f"Video {video_id} processado com sucesso (full)")
 
-            # 7-11. Unified embedding
-            unified_embedding_id = None
-            try:
-                updated_video = self.db.get_video(video_id)
-                if updated_video:
-                    composed_text = self.composer.compose_embedding_text(updated_video)
-                    if composed_text:
-                        logger.info(f"Gerando unified embedding para video {video_id}...")
-                        unified_emb = self.embedding.generate_unified(composed_text)
-                        unified_payload = {
-                            "video_id": video_id,
-                            "filename": updated_video.filename,
-                            "category": updated_video.category,
-                            "emotional_tone": updated_video.emotional_tone,
-                            "intensity": updated_video.intensity,
-                            "viral_potential": updated_video.viral_potential,
-                            "is_exclusive": updated_video.is_exclusive or False,
-                            "source": updated_video.source or "local",
-                            # Compilation fields
-                            "camera_type": updated_video.camera_type,
-                            "audio_usability": updated_video.audio_usability,
-                            "compilation_themes": updated_video.compilation_themes or [],
-                            "standalone_score": updated_video.standalone_score,
-                            "visual_quality_score": updated_video.visual_quality_score,
-                            "location_country": updated_video.location_country,
-                            "location_environment": updated_video.location_environment,
-                            "event_headline": updated_video.event_headline,
-                        }
-                        unified_embedding_id = self.qdrant.index_unified(
-                            video_id, unified_emb, unified_payload
-                        )
-                        self.db.update_unified_embedding(video_id, unified_embedding_id)
-                        logger.info(f"Unified embedding indexado para video {video_id}")
-            except Exception as e:
-                logger.warning(f"Falha ao gerar unified embedding para video {video_id}: {e}")
+            # 7. Unified embedding
+            unified_embedding_id = self._run_unified(video_id, checkpoints)
+
+            # 8. Processamento concluido - checkpoints nao sao mais necessarios
+            self.db.clear_checkpoints(video_id)
 
             return ProcessingResult(
                 success=True,
@@ -182,6 +214,232 @@ class VideoProcessor:
                 error=error_msg,
             )
 
+    def _reembed(self, task: QueueTask) -> ProcessingResult:
+        """
+        Job de re-embedding (metadata de fonte alterada): regenera so o
+        embedding unificado a partir do banco, sem analise Gemini e sem mexer
+        no processing_status. Videos ainda nao analisados sao ignorados: o
+        processamento completo ja usara a metadata nova.
+        """
+        video_id = task.video_id
+        try:
+            video = self.db.get_video(video_id)
+            if not video or video.processing_status != "analyzed":
+                return ProcessingResult(success=True, video_id=video_id)
+
+            logger.info(f"Re-embedding do video {video_id} (metadata alterada)")
+            unified_embedding_id = self._run_unified(video_id, {})
+            self.db.clear_checkpoints(video_id)
+            return ProcessingResult(
+                success=True,
+                video_id=video_id,
+                unified_embedding_id=unified_embedding_id,
+            )
+        except Exception as e:
+            # O video continua analisado e buscavel com o vetor anterior
+            logger.error(f"Erro no re-embedding do video {video_id}: {e}")
+            return ProcessingResult(success=False, video_id=video_id, error=str(e))
+
+    def _checkpoint(self, video_id: int, checkpoints: dict, stage: str, data: dict) -> None:
+        """Persiste a saida de uma etapa e atualiza o cache local de checkpoints."""
+        self.db.save_checkpoint(video_id, stage, data)
+        checkpoints[stage] = data
+
+    def _get_uploaded_file(self, video, checkpoints: dict):
+        """
+        Reutiliza o upload de uma tentativa anterior se ainda estiver ACTIVE
+        na File API; caso contrario, faz novo upload e registra o handle.
+        """
+        handle = checkpoints.get(STAGE_UPLOAD)
+        if handle:
+            video_file = self.gemini.get_active_file(handle["name"])
+            if video_file is not None:
+                logger.info(f"Reutilizando upload {handle['name']} do video {video.id}")
+                return video_file
+
+        logger.info(f"Enviando video {video.id} para Gemini...")
+        video_file = self.gemini.upload_video(video.file_path)
+        self._checkpoint(
+            video.id,
+            checkpoints,
+            STAGE_UPLOAD,
+            {
+                "name": video_file.name,
+                "uri": video_file.uri,
+                "mime_type": video_file.mime_type,
+            },
+        )
+        return video_file
+
+    def _run_analysis(
+        self, video, checkpoints: dict, auto_themes: bool = False
+    ) -> FullVideoAnalysis:
+        """
+        Executa (ou recupera dos checkpoints) as tres analises Gemini.
+        Com auto_themes, o classificador local substitui o prompt de compilation
+        quando esta confiante (ver _classify_themes).
+        """
+        video_id = video.id
+        analysis_stages = (STAGE_VISUAL, STAGE_NARRATIVE, STAGE_COMPILATION)
+
+        video_file = None
+        if not all(stage in checkpoints for stage in analysis_stages):
+            video_file = self._get_uploaded_file(video, checkpoints)
+
+            if self.gemini.analysis_mode == ANALYSIS_MODE_SINGLE:
+                # Uma unica chamada produz as tres secoes; checkpoint de todas
+                logger.info(f"Analise single-pass do video {video_id}...")
+                full = self.gemini.analyze_single_pass(video_file)
+                self._checkpoint(video_id, checkpoints, STAGE_VISUAL, full.visual.model_dump())
+                self._checkpoint(
+                    video_id, checkpoints, STAGE_NARRATIVE, full.narrative.model_dump()
+                )
+                self._checkpoint(
+                    video_id, checkpoints, STAGE_COMPILATION, full.compilation.model_dump()
+                )
+
+        if STAGE_VISUAL in checkpoints:
+            visual = VisualAnalysis(**checkpoints[STAGE_VISUAL])
+        else:
+            logger.info(f"Analise visual do video {video_id}...")
+            visual = self.gemini.analyze_visual(video_file)
+            self._checkpoint(video_id, checkpoints, STAGE_VISUAL, visual.model_dump())
+
+        if STAGE_NARRATIVE in checkpoints:
+            narrative = NarrativeAnalysis(**checkpoints[STAGE_NARRATIVE])
+        else:
+            logger.info(f"Analise narrativa do video {video_id}...")
+            narrative = self.gemini.analyze_narrative(video_file)
+            self._checkpoint(video_id, checkpoints, STAGE_NARRATIVE, narrative.model_dump())
+
+        if STAGE_COMPILATION in checkpoints:
+            # Temas do classificador: so headline e temas foram checkpointados
+            model = ThemeOnlyCompilation if STAGE_AUTO_THEMES in checkpoints else CompilationAnalysis
+            compilation = model(**checkpoints[STAGE_COMPILATION])
+        else:
+            compilation = None
+            if auto_themes:
+                compilation = self._classify_themes(video_id, visual, narrative, checkpoints)
+            if compilation is None:
+                logger.info(f"Analise compilation do video {video_id}...")
+                compilation = self.gemini.analyze_compilation(video_file, visual, narrative)
+            self._checkpoint(
+                video_id, checkpoints, STAGE_COMPILATION, compilation.model_dump()
+            )
+
+        # Todas as analises persistidas - o arquivo remoto nao e mais necessario.
+        # Em caso de falha acima ele e mantido para a proxima tentativa
+        # (a File API expira arquivos automaticamente em 48h).
+        handle = checkpoints.get(STAGE_UPLOAD)
+        if handle:
+            self.gemini.delete_file(handle["name"])
+
+        return FullVideoAnalysis(visual=visual, narrative=narrative, compilation=compilation)
+
+    def _classify_themes(
+        self,
+        video_id: int,
+        visual: VisualAnalysis,
+        narrative: NarrativeAnalysis,
+        checkpoints: dict,
+    ) -> Optional[ThemeOnlyCompilation]:
+        """
+        Temas pelo classificador local sobre os embeddings visual + narrativo
+        (gerados aqui e reaproveitados pela etapa de embeddings). Retorna None
+        se nao houver classificador ou a confianca for baixa: o prompt roda.
+
+        Sem o prompt, os campos editoriais (trim, camera, scores...) ficam NULL
+        e o headline vem da primeira frase da narrativa.
+        """
+        if self.theme_classifier is None:
+            return None
+        dual = self._run_dual_embeddings(
+            video_id, DualVideoAnalysis(visual=visual, narrative=narrative), checkpoints
+        )
+        prediction = self.theme_classifier.predict(
+            theme_features(dual.visual, dual.narrative),
+            threshold=settings.theme_classifier_threshold,
+        )[0]
+        if not prediction.themes or prediction.confidence < settings.theme_classifier_min_confidence:
+            logger.info(
+                f"Classificador de temas inseguro para video {video_id} "
+                f"(confianca {prediction.confidence}); usando prompt de compilation"
+            )
+            return None
+
+        logger.info(f"Temas do video {video_id} pelo classificador local: {prediction.themes}")
+        self._checkpoint(
+            video_id,
+            checkpoints,
+            STAGE_AUTO_THEMES,
+            {"scores": prediction.scores, "confidence": prediction.confidence},
+        )
+        headline = narrative.narrative_description.split(".")[0].strip()
+        return ThemeOnlyCompilation(
+            event_headline=headline[:AUTO_HEADLINE_MAX_CHARS],
+            compilation_themes=prediction.themes,
+        )
+
+    def _run_dual_embeddings(
+        self, video_id: int, analysis: DualVideoAnalysis | FullVideoAnalysis, checkpoints: dict
+    ) -> DualEmbeddings:
+        """Gera (ou recupera dos checkpoints) os embeddings visual e narrativo."""
+        cached = checkpoints.get(STAGE_DUAL_EMBEDDINGS)
+        if cached:
+            return DualEmbeddings(visual=cached["visual"], narrative=cached["narrative"])
+
+        logger.info(f"Gerando embeddings duplos para video {video_id}...")
+        dual_embeddings = self.embedding.generate_dual(analysis)
+        self._checkpoint(
+            video_id,
+            checkpoints,
+            STAGE_DUAL_EMBEDDINGS,
+            {"visual": dual_embeddings.visual, "narrative": dual_embeddings.narrative},
+        )
+        return dual_embeddings
+
+    def _run_unified(self, video_id: int, checkpoints: dict) -> Optional[str]:
+        """
+        Gera e indexa o unified embedding.
+        O vetor so e reaproveitado se o texto composto nao mudou desde o checkpoint.
+        """
+        updated_video = self.db.get_video(video_id)
+        if not updated_video:
+            return None
+        composed_text = self.composer.compose_embedding_text(updated_video)
+        if not composed_text:
+            return None
+
+        cached = checkpoints.get(STAGE_UNIFIED_EMBEDDING)
+        if cached and cached.get("text") == composed_text:
+            unified_emb = cached["vector"]
+        else:
+            logger.info(f"Gerando unified embedding para video {video_id}...")
+            unified_emb = self.embedding.generate_unified(composed_text)
+            self._checkpoint(
+                video_id,
+                checkpoints,
+                STAGE_UNIFIED_EMBEDDING,
+                {"text": composed_text, "vector": unified_emb},
+            )
+
+        unified_payload = self.composer.compose_unified_payload(updated_video)
+        if self.theme_index is not None:
+            # Antes do upsert: le o vetor/temas anteriores do clip para descontar
+            try:
+                self.theme_index.update_clip(video_id, unified_emb, unified_payload["compilation_themes"])
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar centroides de tema (video {video_id}): {e}")
+        unified_embedding_id = self.qdrant.index_unified(
+            video_id,
+            unified_emb,
+            unified_payload,
+            lexical_text=self.composer.compose_lexical_text(updated_video),
+        )
+        self.db.update_unified_embedding(video_id, unified_embedding_id)
+        logger.info(f"Unified embedding indexado para video {video_id}")
+        return unified_embedding_id
+
     def process_video_id(self, video_id: int) -> ProcessingResult:
         """
         Processa um video pelo ID (sem QueueTask).
@@ -205,6 +463,8 @@ def create_processor_callback(
     gemini_service: GeminiService,
     embedding_service: EmbeddingService,
     qdrant_service: QdrantService,
+    theme_index: Optional[ThemeIndex] = None,
+    theme_classifier: Optional[ThemeClassifier] = None,
 ):
     """
     Cria callback de processamento para uso com QueueService.start_worker().
@@ -217,6 +477,8 @@ def create_processor_callback(
         gemini_service=gemini_service,
         embedding_service=embedding_service,
         qdrant_service=qdrant_service,
+        theme_index=theme_index,
+        theme_classifier=theme_classifier,
     )
 
     def process_callback(task: QueueTask) -> None:
@@ -0,0 +1,159 @@
+"""
+Tracing OpenTelemetry: ingest -> fila -> processor -> Gemini/embedding/Qdrant -> RAG.
+
+- configure_tracing() instala o TracerProvider conforme TRACING_EXPORTER:
+  "none" (padrao), "console", "file" (JSON por linha em TRACING_FILE_PATH)
+  ou "otlp" (coletor em OTLP_ENDPOINT, requer opentelemetry-exporter-otlp).
+- O contexto W3C (traceparent) do request que enfileirou o video e gravado
+  em processing_queue.trace_context e restaurado pelo worker, ligando o
+  processamento em background ao trace do ingest.
+- Sem opentelemetry-sdk instalado, os spans viram no-op (API apenas).
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import Status, StatusCode
+
+from src.config import settings
+
+if TYPE_CHECKING:
+    from opentelemetry.sdk.trace.export import SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = "video_rag"
+
+tracer = trace.get_tracer(TRACER_NAME)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def _build_exporter(kind: str):
+    if kind == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return JsonLinesSpanExporter(settings.tracing_file_path)
+    if kind == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter(endpoint=settings.otlp_endpoint)
+    raise ValueError(f"TRACING_EXPORTER invalido: {kind} (use none, console, file, otlp)")
+
+
+def configure_tracing(service_name: str) -> bool:
+    """
+    Configura o TracerProvider global (uma vez por processo).
+
+    Returns:
+        True se um exporter foi instalado
+    """
+    global _configured
+    kind = settings.tracing_exporter.lower()
+    if kind == "none":
+        return False
+    with _configure_lock:
+        if _configured:
+            return True
+        try:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+            exporter = _build_exporter(kind)
+        except ImportError as e:
+            logger.warning(f"Tracing desativado, dependencia ausente: {e}")
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+        logger.info(f"Tracing ativo ({kind}) para {service_name}")
+        return True
+
+
+def shutdown_tracing() -> None:
+    """Envia os spans pendentes (shutdown da API/worker)."""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+class JsonLinesSpanExporter:
+    """Exporter que grava um span JSON por linha (inspecao local / tail-latency)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence) -> "SpanExportResult":
+        from opentelemetry.sdk.trace.export import SpanExportResult
+
+        lines = [json.dumps(json.loads(span.to_json()), ensure_ascii=False) for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+# ============================================================================
+# PROPAGACAO VIA FILA
+# ============================================================================
+
+
+def inject_context() -> Optional[str]:
+    """Serializa o contexto do span corrente (traceparent) para gravar na fila."""
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier)
+    return json.dumps(carrier) if carrier else None
+
+
+def extract_context(trace_context: Optional[str]):
+    """Restaura o contexto gravado por inject_context (None = novo trace)."""
+    if not trace_context:
+        return None
+    try:
+        return propagate.extract(json.loads(trace_context))
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_request_context(headers):
+    """Contexto enviado pelo cliente HTTP (traceparent), se houver."""
+    if "traceparent" not in headers:
+        return None
+    return propagate.extract(headers)
+
+
+@contextmanager
+def span(name: str, parent=None, **attributes):
+    """
+    Abre um span filho do corrente (ou de parent, um contexto extraido).
+    Excecoes marcam o span com status de erro e sao repropagadas.
+    """
+    with tracer.start_as_current_span(
+        name,
+        context=parent,
+        attributes={k: v for k, v in attributes.items() if v is not None},
+        record_exception=True,
+        set_status_on_exception=True,
+    ) as current:
+        yield current
+
+
+def mark_error(current, message: str) -> None:
+    """Marca o span como erro sem excecao (ex: ProcessingResult com falha)."""
+    current.set_status(Status(StatusCode.ERROR, message))
@@ -16,6 +16,18 @@ os.environ.setdefault("QDRANT_HOST", "localhost")
 os.environ.setdefault("QDRANT_PORT", "6333")
 
 
+def _client(router, overrides: dict):
+    """TestClient de um app so com o router, com as dependencias substituidas."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.include_router(router)
+    for dependency, value in overrides.items():
+        app.dependency_overrides[dependency] = (lambda v: lambda: v)(value)
+    return TestClient(app)
+
+
 class TestConfig:
     """Testes de configuracao."""
 
@@ -119,6 +131,50 @@ class TestDatabaseService:
         except Exception as e:
             pytest.skip(f"Banco de dados nao acessivel: {e}")
 
+    def test_services_share_engine(self, db_url):
+        from src.services.database_service import DatabaseService
+        from src.services.db_engine import TimedQueuePool
+        from src.services.queue_service import QueueService
+        try:
+            db = DatabaseService(db_url)
+            queue = QueueService(db_url)
+        except Exception as e:
+            pytest.skip(f"Driver PostgreSQL indisponivel: {e}")
+        assert db.engine is queue.engine
+        assert isinstance(db.engine.pool, TimedQueuePool)
+
+    def test_pool_stats_count_acquisitions(self):
+        import sqlite3
+        from src.services.db_engine import TimedQueuePool
+        pool = TimedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0)
+        conn = pool.connect()
+        assert pool.stats().checked_out == 1
+        conn.close()
+        pool.connect().close()
+        stats = pool.stats()
+        assert stats.acquisitions == 2
+        assert stats.checked_out == 0
+        assert stats.timeouts == 0
+
+    def test_status_transitions_are_single_update(self):
+        """Transicoes de status nao carregam a linha: um UPDATE por chamada."""
+        from unittest.mock import MagicMock
+        from src.services.database_service import DatabaseService
+        session = MagicMock()
+        session.__enter__.return_value = session
+        session.execute.return_value.rowcount = 3
+        db = DatabaseService.__new__(DatabaseService)
+        db.SessionLocal = MagicMock(return_value=session)
+
+        assert db.set_error_bulk([1, 2, 3], "boom") == 3
+        assert db.set_analyzing(1) is True
+        assert db.reset_to_pending_bulk([]) == 0
+        assert session.execute.call_count == 2
+        session.query.assert_not_called()
+        sql = str(session.execute.call_args_list[0].args[0])
+        assert sql.startswith("UPDATE videos SET")
+        assert "WHERE videos.id IN" in sql
+
 
 class TestEmbeddingService:
     """Testes do servico de embeddings."""
@@ -133,6 +189,44 @@ class TestEmbeddingService:
         assert svc.model == "text-embedding-004"
         assert svc.dimensions == 768
 
+    def test_clients_are_shared_per_key_and_version(self):
+        from src.services.google_client import get_genai_client
+        assert get_genai_client("test-key") is get_genai_client("test-key")
+        assert get_genai_client("test-key", "v1") is not get_genai_client("test-key")
+
+    def test_generate_remembers_working_api_version(self):
+        """Apos 404 na versao padrao, as chamadas seguintes vao direto para v1."""
+        from unittest.mock import patch
+        from src.services.embedding_service import EmbeddingService
+        from src.services.google_client import ApiVersionSelector
+        from src.services.rate_limiter import RateLimiter
+
+        class NotFound(Exception):
+            code = 404
+
+        versions_called = []
+
+        def fake_embed(client, model, text, stage):
+            versions_called.append(client)
+            if client == "default":
+                raise NotFound("model not found for API version v1beta")
+            return [0.1, 0.2]
+
+        svc = EmbeddingService(
+            api_key="test-key",
+            model="text-embedding-004",
+            dimensions=2,
+            rate_limiter=RateLimiter({"embed": (6000, 2)}),
+            versions=ApiVersionSelector(),
+        )
+        with patch(
+            "src.services.embedding_service.get_genai_client",
+            side_effect=lambda key, version: version or "default",
+        ), patch.object(svc, "_try_embed", side_effect=fake_embed):
+            assert svc.generate("a") == [0.1, 0.2]
+            assert svc.generate("b") == [0.1, 0.2]
+        assert versions_called == ["default", "v1", "v1"]
+
     def test_generate_for_video_text(self):
         """Testa montagem do texto para embedding."""
         from src.models import VideoAnalysis
@@ -166,6 +260,54 @@ class TestQdrantService:
         except Exception as e:
             pytest.skip(f"Qdrant nao acessivel: {e}")
 
+    def _local_service(self, vector_size: int = 4):
+        from qdrant_client import QdrantClient
+        from src.services.qdrant_service import QdrantService
+        return QdrantService("", 0, "t", vector_size, client=QdrantClient(":memory:"))
+
+    def test_sparse_encoder_matches_literal_ids(self):
+        from src.services import sparse_encoder
+
+        doc = sparse_encoder.encode_document("Urso em Sao Jose dos Campos. NF-88123. urso.mp4")
+        assert sparse_encoder.term_index("sao") in doc.indices
+        assert sparse_encoder.term_index("88123") in doc.indices
+        assert sparse_encoder.term_index("dos") not in doc.indices
+        query = sparse_encoder.encode_query("São José")
+        assert set(query.indices) <= set(doc.indices)
+        assert sparse_encoder.is_empty(sparse_encoder.encode_query("de a o"))
+
+    def test_hybrid_search_ranks_exact_keyword_match(self):
+        """O ramo BM25 traz o clip com o ID literal mesmo com vetor denso distante."""
+        svc = self._local_service()
+        assert svc.hybrid_enabled
+        svc.index_unified(1, [1.0, 0.0, 0.0, 0.0], {"category": "a"}, lexical_text="carro na ponte")
+        svc.index_unified(2, [0.0, 1.0, 0.0, 0.0], {"category": "a"}, lexical_text="NF-4411 cachorro")
+        svc.index_unified(3, [0.9, 0.1, 0.0, 0.0], {"category": "b"}, lexical_text="moto")
+
+        dense_only = svc.search_unified([1.0, 0.0, 0.0, 0.0], limit=1)
+        hybrid = svc.search_unified([1.0, 0.0, 0.0, 0.0], limit=2, query_text="NF-4411")
+        filtered = svc.search_unified(
+            [1.0, 0.0, 0.0, 0.0], limit=3, filters={"category": "b"}, query_text="NF-4411"
+        )
+
+        assert dense_only[0]["id"] == 1
+        assert 2 in [r["id"] for r in hybrid]
+        assert [r["id"] for r in filtered] == [3]
+        # Similaridade continua usando o vetor denso
+        assert svc.find_similar(1, limit=1)[0]["id"] == 3
+
+    def test_collection_without_sparse_vector_falls_back_to_dense(self):
+        from qdrant_client import QdrantClient
+        from qdrant_client.models import Distance, VectorParams
+        from src.services.qdrant_service import QdrantService
+
+        client = QdrantClient(":memory:")
+        client.create_collection("t_unified", VectorParams(size=4, distance=Distance.COSINE))
+        svc = QdrantService("", 0, "t", 4, client=client)
+        assert not svc.hybrid_enabled
+        svc.index_unified(1, [1.0, 0.0, 0.0, 0.0], {}, lexical_text="carro")
+        assert svc.search_unified([1.0, 0.0, 0.0, 0.0], query_text="carro")[0]["id"] == 1
+
 
 class TestGeminiService:
     """Testes do servico Gemini."""
@@ -213,6 +355,33 @@ class TestGeminiService:
         assert "{num_videos}" in RAG_VIDEO_PROMPT_TEMPLATE
 
 
+    def test_gemini_invalid_analysis_mode(self):
+        from src.services.gemini_service import GeminiService
+        with pytest.raises(ValueError):
+            GeminiService(api_key="test-key", model="m", analysis_mode="triple")
+
+    def test_gemini_single_pass_parses_sections(self):
+        """Single-pass: uma chamada, tres secoes, temas invalidos descartados."""
+        import json
+        from unittest.mock import MagicMock
+        from src.services.gemini_service import GeminiService
+        svc = GeminiService(api_key="test-key", model="m", analysis_mode="single")
+        svc.client = MagicMock()
+        svc.client.models.generate_content.return_value = MagicMock(text=json.dumps({
+            "visual": {"visual_description": "carro na chuva"},
+            "narrative": {
+                "narrative_description": "fuga", "emotional_tone": "tenso",
+                "viral_potential": 7, "intensity": 8,
+            },
+            "compilation": {
+                "event_headline": "Carro foge", "compilation_themes": ["perseguicoes", "xx"],
+            },
+        }))
+        analysis = svc.analyze_single_pass(MagicMock(uri="u", mime_type="video/mp4"))
+        assert svc.client.models.generate_content.call_count == 1
+        assert analysis.visual.visual_description == "carro na chuva"
+        assert analysis.compilation.compilation_themes == ["perseguicoes"]
+
 class TestQueueService:
     """Testes do servico de fila."""
 
@@ -272,6 +441,108 @@ class TestQueueService:
         except Exception as e:
             pytest.skip(f"Banco de dados nao acessivel: {e}")
 
+    @pytest.fixture
+    def pg_queue(self):
+        """QueueService no Postgres de settings e tres videos descartaveis."""
+        import uuid
+        from sqlalchemy import text
+        from src.config import settings
+        from src.services.database_service import DatabaseService
+        from src.services.queue_service import QueueService
+
+        try:
+            queue = QueueService(settings.postgres_url)
+            with queue.engine.connect() as conn:
+                conn.execute(text("SELECT 1 FROM processing_queue LIMIT 1"))
+            db = DatabaseService(settings.postgres_url)
+        except Exception as e:
+            pytest.skip(f"Banco de dados nao acessivel: {e}")
+        tag = uuid.uuid4().hex[:8]
+        ids = [db.create_video(f"queue-{tag}-{i}.mp4", f"/tmp/queue-{tag}-{i}.mp4").id for i in range(3)]
+        yield queue, ids
+        for video_id in ids:
+            db.delete_video(video_id)
+
+    def _row(self, queue, video_id):
+        from sqlalchemy import text
+
+        with queue.engine.connect() as conn:
+            return conn.execute(
+                text(
+                    "SELECT id, status, priority, attempts, options "
+                    "FROM processing_queue WHERE video_id = :video_id"
+                ),
+                {"video_id": video_id},
+            ).mappings().fetchone()
+
+    def _set_processing(self, queue, queue_id):
+        from sqlalchemy import text
+
+        with queue.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "UPDATE processing_queue SET status = 'processing', attempts = 1, "
+                    "locked_at = NOW(), locked_by = 'test' WHERE id = :id"
+                ),
+                {"id": queue_id},
+            )
+
+    def test_reembed_coalesces_with_pending_item(self, pg_queue):
+        queue, (video_id, _, _) = pg_queue
+        queue.enqueue(video_id)
+
+        assert queue.enqueue_reembed(video_id) is False
+        row = self._row(queue, video_id)
+        assert row["status"] == "pending"
+        assert "requeue" not in row["options"]
+
+    def test_reembed_during_processing_requeues_on_complete(self, pg_queue):
+        from src.services.queue_service import PRIORITY_REEMBED
+
+        queue, (video_id, _, _) = pg_queue
+        queue_id = queue.enqueue(video_id, options={"auto_themes": True})
+        self._set_processing(queue, queue_id)
+
+        assert queue.enqueue_reembed(video_id) is False
+        assert self._row(queue, video_id)["options"] == {"auto_themes": True, "requeue": True}
+
+        queue.complete(queue_id)
+        row = self._row(queue, video_id)
+        assert (row["status"], row["priority"], row["attempts"]) == ("pending", PRIORITY_REEMBED, 0)
+        assert row["options"] == {"reembed": True}
+
+        # Sem requeue, complete() conclui normalmente
+        self._set_processing(queue, queue_id)
+        queue.complete(queue_id)
+        assert self._row(queue, video_id)["status"] == "completed"
+
+    def test_reembed_requeues_completed_item(self, pg_queue):
+        from src.services.queue_service import PRIORITY_REEMBED
+
+        queue, (video_id, _, _) = pg_queue
+        queue_id = queue.enqueue(video_id)
+        self._set_processing(queue, queue_id)
+        queue.complete(queue_id)
+
+        assert queue.enqueue_reembed(video_id) is True
+        row = self._row(queue, video_id)
+        assert (row["id"], row["status"], row["priority"]) == (queue_id, "pending", PRIORITY_REEMBED)
+        assert row["options"] == {"reembed": True}
+
+    def test_reembed_bulk_mixed_states(self, pg_queue):
+        queue, (pending_id, processing_id, new_id) = pg_queue
+        queue.enqueue(pending_id)
+        self._set_processing(queue, queue.enqueue(processing_id))
+
+        # So o video sem item gera job novo; os outros dois sao coalescidos
+        assert queue.enqueue_reembed_bulk([pending_id, processing_id, new_id, new_id]) == 1
+        assert self._row(queue, pending_id)["status"] == "pending"
+        assert self._row(queue, processing_id)["options"] == {"requeue": True}
+        assert (self._row(queue, new_id)["status"], self._row(queue, new_id)["options"]) == (
+            "pending",
+            {"reembed": True},
+        )
+
 
 class TestVideoProcessor:
     """Testes do processador de video."""
@@ -303,6 +574,460 @@ class TestVideoProcessor:
         assert "Erro" in result.error
 
 
+    def _make_processor(self, checkpoints):
+        """Cria VideoProcessor com servicos mockados e checkpoints pre-existentes."""
+        from unittest.mock import MagicMock
+        from src.services.video_processor import VideoProcessor
+
+        video = MagicMock(id=1, filename="v.mp4", file_path="/tmp/v.mp4")
+        db = MagicMock()
+        db.get_video.return_value = video
+        db.get_checkpoints.return_value = dict(checkpoints)
+        gemini = MagicMock()
+        embedding = MagicMock()
+        qdrant = MagicMock()
+        qdrant.index_dual.return_value = ("1_visual", "1_narrative")
+        qdrant.index_unified.return_value = "1"
+        processor = VideoProcessor(db, gemini, embedding, qdrant)
+        processor.composer = MagicMock()
+        processor.composer.compose_embedding_text.return_value = "texto"
+        return processor, db, gemini, embedding
+
+    def _analysis_checkpoints(self):
+        from src.models import CompilationAnalysis, NarrativeAnalysis, VisualAnalysis
+        return {
+            "visual": VisualAnalysis(visual_description="v").model_dump(),
+            "narrative": NarrativeAnalysis(
+                narrative_description="n", emotional_tone="calmo",
+                viral_potential=1.0, intensity=1.0,
+            ).model_dump(),
+            "compilation": CompilationAnalysis(event_headline="h").model_dump(),
+        }
+
+    def test_process_resumes_from_checkpoints(self):
+        """Etapas com checkpoint nao sao reexecutadas numa nova tentativa."""
+        from src.services.queue_service import QueueTask
+        checkpoints = self._analysis_checkpoints()
+        checkpoints["dual_embeddings"] = {"visual": [0.1], "narrative": [0.2]}
+        processor, db, gemini, embedding = self._make_processor(checkpoints)
+        embedding.generate_unified.return_value = [0.3]
+
+        task = QueueTask(1, 1, "processing", 0, 2, 3, None, None)
+        result = processor.process(task)
+
+        assert result.success is True
+        gemini.upload_video.assert_not_called()
+        gemini.analyze_visual.assert_not_called()
+        embedding.generate_dual.assert_not_called()
+        embedding.generate_unified.assert_called_once_with("texto")
+        db.clear_checkpoints.assert_called_once_with(1)
+
+    def test_process_reuses_active_upload(self):
+        """Upload ainda ACTIVE na File API e reaproveitado."""
+        from src.services.queue_service import QueueTask
+        checkpoints = self._analysis_checkpoints()
+        del checkpoints["compilation"]
+        checkpoints["upload"] = {"name": "files/abc", "uri": "u", "mime_type": "video/mp4"}
+        processor, db, gemini, embedding = self._make_processor(checkpoints)
+        gemini.analyze_compilation.side_effect = RuntimeError("quota")
+
+        task = QueueTask(1, 1, "processing", 0, 2, 3, None, None)
+        result = processor.process(task)
+
+        assert result.success is False
+        gemini.get_active_file.assert_called_once_with("files/abc")
+        gemini.upload_video.assert_not_called()
+        gemini.analyze_visual.assert_not_called()
+        gemini.delete_file.assert_not_called()
+        db.clear_checkpoints.assert_not_called()
+
+
+    def test_process_single_pass_checkpoints_all_sections(self):
+        """Modo single: uma chamada Gemini gera checkpoint das tres secoes."""
+        from src.models import FullVideoAnalysis, CompilationAnalysis, NarrativeAnalysis, VisualAnalysis
+        from src.services.embedding_service import DualEmbeddings
+        from src.services.queue_service import QueueTask
+        processor, db, gemini, embedding = self._make_processor({})
+        gemini.analysis_mode = "single"
+        cp = self._analysis_checkpoints()
+        gemini.analyze_single_pass.return_value = FullVideoAnalysis(
+            visual=VisualAnalysis(**cp["visual"]),
+            narrative=NarrativeAnalysis(**cp["narrative"]),
+            compilation=CompilationAnalysis(**cp["compilation"]),
+        )
+        embedding.generate_dual.return_value = DualEmbeddings(visual=[0.1], narrative=[0.2])
+        embedding.generate_unified.return_value = [0.3]
+
+        result = processor.process(QueueTask(1, 1, "processing", 0, 1, 3, None, None))
+
+        assert result.success is True
+        gemini.analyze_single_pass.assert_called_once()
+        gemini.analyze_visual.assert_not_called()
+        saved = {c.args[1] for c in db.save_checkpoint.call_args_list}
+        assert {"upload", "visual", "narrative", "compilation"} <= saved
+
+    def test_auto_themes_skips_compilation_prompt_when_confident(self):
+        """Ingest com auto_themes: classificador confiante substitui o prompt de compilation."""
+        from unittest.mock import MagicMock
+        from src.services.queue_service import QueueTask
+
+        checkpoints = self._analysis_checkpoints()
+        del checkpoints["compilation"]
+        checkpoints["dual_embeddings"] = {"visual": [0.1], "narrative": [0.2]}
+        processor, db, gemini, embedding = self._make_processor(checkpoints)
+        embedding.generate_unified.return_value = [0.3]
+        processor.theme_classifier = MagicMock()
+        processor.theme_classifier.predict.return_value = [
+            MagicMock(themes=["animais_estrada"], scores={"animais_estrada": 0.97}, confidence=0.95)
+        ]
+
+        task = QueueTask(1, 1, "processing", 0, 1, 3, None, None, options={"auto_themes": True})
+        result = processor.process(task)
+
+        assert result.success is True
+        gemini.analyze_compilation.assert_not_called()
+        assert result.analysis.compilation.compilation_themes == ["animais_estrada"]
+        assert "camera_type" not in result.analysis.compilation.model_dump()
+        db.update_theme_scores.assert_called_once_with(1, {"animais_estrada": 0.97})
+
+        # Confianca baixa: o prompt roda normalmente
+        processor, db, gemini, embedding = self._make_processor(checkpoints)
+        embedding.generate_unified.return_value = [0.3]
+        processor.theme_classifier = MagicMock()
+        processor.theme_classifier.predict.return_value = [
+            MagicMock(themes=["animais_estrada"], scores={}, confidence=0.6)
+        ]
+        from src.models import CompilationAnalysis
+        gemini.analyze_compilation.return_value = CompilationAnalysis(event_headline="h")
+        assert processor.process(task).success is True
+        gemini.analyze_compilation.assert_called_once()
+
+    def test_theme_only_compilation_leaves_editorial_fields_null(self, tmp_path):
+        """Temas do classificador nao gravam os defaults do CompilationAnalysis."""
+        from src.models import Base, FullVideoAnalysis, ThemeOnlyCompilation
+        from src.services.database_service import DatabaseService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'auto.db'}")
+        Base.metadata.create_all(db.engine)
+        video = db.create_video("a.mp4", "a.mp4")
+        checkpoints = self._analysis_checkpoints()
+        analysis = FullVideoAnalysis(
+            visual=checkpoints["visual"],
+            narrative=checkpoints["narrative"],
+            compilation=ThemeOnlyCompilation(event_headline="h", compilation_themes=["animais_estrada"]),
+        )
+
+        saved = db.update_full_analysis(video.id, analysis, "v", "n")
+
+        assert (saved.event_headline, saved.compilation_themes) == ("h", ["animais_estrada"])
+        assert saved.camera_type is None and saved.trim_in_ms is None and saved.standalone_score is None
+
+
+class TestUsageService:
+    """Testes da contabilidade de tokens e custo."""
+
+    @pytest.fixture
+    def usage(self, tmp_path):
+        from src.models import ApiUsage
+        from src.services.usage_service import UsageService
+        svc = UsageService(f"sqlite:///{tmp_path / 'usage.db'}", flush_interval=60)
+        ApiUsage.__table__.create(svc.engine)
+        yield svc
+        svc.close()
+
+    def test_estimate_cost(self):
+        from src.services.usage_service import estimate_cost
+        assert estimate_cost("gemini-2.0-flash", 1_000_000, 1_000_000) == pytest.approx(0.5)
+        assert estimate_cost("modelo-desconhecido", 1000, 1000) == 0.0
+
+    def test_usage_scope_nesting(self):
+        from src.services.usage_service import current_usage_scope, usage_scope
+        with usage_scope(route="/api/v1/rag/query"):
+            with usage_scope(video_id=7):
+                assert current_usage_scope() == {"route": "/api/v1/rag/query", "video_id": 7}
+            assert current_usage_scope() == {"route": "/api/v1/rag/query"}
+        assert current_usage_scope() == {}
+
+    def test_record_and_summarize(self, usage):
+        from types import SimpleNamespace
+        from src.services.usage_service import usage_scope
+        response = SimpleNamespace(usage_metadata=SimpleNamespace(
+            prompt_token_count=1000, candidates_token_count=200,
+            thoughts_token_count=50, cached_content_token_count=0, total_token_count=1250,
+        ))
+        with usage_scope(video_id=3):
+            record = usage.record_response("gemini", "visual", "gemini-2.0-flash", response, 12.0)
+        usage.record_embedding("embedding_query", "gemini-embedding-001", "x" * 400,
+                               SimpleNamespace(embeddings=[]), 3.0)
+
+        assert record.video_id == 3
+        assert record.output_tokens == 250
+        assert usage.flush() == 2
+
+        summary = usage.get_summary()
+        assert summary["totals"]["calls"] == 2
+        assert summary["by_stage"]["visual"]["total_tokens"] == 1250
+        assert summary["by_stage"]["embedding_query"]["prompt_tokens"] == 100
+        assert summary["top_videos"][0]["video_id"] == 3
+        assert usage.get_video_usage(3)["visual"]["calls"] == 1
+
+    def test_route_scope_reaches_sync_endpoint(self):
+        """Dependencia async propaga a rota para endpoints sync (threadpool)."""
+        from fastapi import Depends, FastAPI
+        from fastapi.testclient import TestClient
+        from api.dependencies import track_usage_route
+        from src.services.usage_service import current_usage_scope
+
+        app = FastAPI(dependencies=[Depends(track_usage_route)])
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int):
+            return current_usage_scope()
+
+        assert TestClient(app).get("/items/5").json() == {"route": "/items/{item_id}"}
+
+
+class TestStatsCache:
+    """Testes do cache de /stats."""
+
+    def test_ttl_cache_expires_and_counts_hits(self):
+        from src.services.cache import TTLCache, cache_stats
+        now = [0.0]
+        cache = TTLCache("test-ttl", ttl=2.0, clock=lambda: now[0])
+        calls = []
+        factory = lambda: calls.append(1) or len(calls)
+
+        assert cache.get_or_set("k", factory) == 1
+        assert cache.get_or_set("k", factory) == 1
+        now[0] = 2.5
+        assert cache.get_or_set("k", factory) == 2
+        assert cache_stats()["test-ttl"] == {"size": 1, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+    def test_get_or_set_computes_once_for_concurrent_callers(self):
+        import threading
+        import time
+        from src.services.cache import TTLCache
+        cache = TTLCache("test-concurrent", ttl=60)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def factory():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return len(calls)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", factory)))]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=lambda: results.append(cache.get_or_set("k", factory))) for _ in range(3)]
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == [1, 1, 1, 1]
+        assert len(calls) == 1
+
+    def test_get_or_set_releases_key_lock_when_factory_raises(self):
+        from src.services.cache import TTLCache
+        cache = TTLCache("test-raising", ttl=60)
+
+        def factory():
+            raise RuntimeError("backend fora")
+
+        for key in range(50):
+            with pytest.raises(RuntimeError):
+                cache.get_or_set(key, factory)
+
+        assert cache._key_locks == {}
+        assert cache.get_or_set(0, lambda: "ok") == "ok"
+
+    def test_stats_endpoint_served_from_cache(self):
+        from unittest.mock import MagicMock
+        from api.dependencies import (
+            get_db, get_qdrant, get_queue, get_stats_cache, get_usage, verify_api_key,
+        )
+        from api.routers import stats
+        from src.services.cache import TTLCache
+        from src.services.queue_service import QueueStats
+
+        db = MagicMock()
+        db.get_stats.return_value = {
+            "total": 3, "analyzed": 1, "pending": 1, "analyzing": 0, "failed": 1,
+            "with_metadata": 0, "with_unified_embedding": 1,
+        }
+        queue = MagicMock()
+        queue.get_stats.return_value = QueueStats(1, 0, 1, 1, 3)
+        qdrant = MagicMock()
+        qdrant.get_collection_stats.return_value = {}
+        usage = MagicMock()
+        usage.get_summary.return_value = {}
+        cache = TTLCache("test-stats", ttl=60)
+
+        overrides = {
+            get_db: db, get_queue: queue, get_qdrant: qdrant,
+            get_usage: usage, get_stats_cache: cache, verify_api_key: None,
+        }
+        client = _client(stats.router, overrides)
+
+        first = client.get("/stats").json()
+        second = client.get("/stats").json()
+        assert first == second
+        assert first["videos_total"] == 3
+        assert first["videos_with_unified_embedding"] == 1
+        assert db.get_stats.call_count == 1
+        usage.get_summary.assert_called_once_with(days=stats.STATS_USAGE_DAYS, top_videos=5)
+
+
+class TestMetrics:
+    """Testes das metricas Prometheus."""
+
+    def test_stage_timer_observes_duration_and_errors(self):
+        from prometheus_client import REGISTRY
+        from src.metrics import stage_timer
+
+        def sample(name):
+            return REGISTRY.get_sample_value(name, {"stage": "test_stage"}) or 0
+
+        before = sample("pipeline_stage_duration_seconds_count")
+        with stage_timer("test_stage"):
+            pass
+        with pytest.raises(RuntimeError):
+            with stage_timer("test_stage"):
+                raise RuntimeError("boom")
+        assert sample("pipeline_stage_duration_seconds_count") == before + 2
+        assert sample("pipeline_stage_errors_total") >= 1
+
+    def test_metrics_endpoint_labels_routes_by_template(self):
+        from fastapi.testclient import TestClient
+        from api.main import app
+        from src.metrics import register_runtime_collector
+        register_runtime_collector()
+        client = TestClient(app)
+        client.get("/health")
+        body = client.get("/metrics").text
+        assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+        assert "cache_hit_ratio" in body
+
+
+class TestTracing:
+    """Testes de propagacao de trace pela fila."""
+
+    def test_trace_context_survives_queue_round_trip(self, tmp_path, monkeypatch):
+        import json
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from src import tracing
+
+        path = tmp_path / "traces.jsonl"
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(tracing.JsonLinesSpanExporter(str(path))))
+        monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+
+        with tracing.span("POST /api/v1/videos/ingest") as ingest:
+            stored = tracing.inject_context()
+        with tracing.span("video.process", parent=tracing.extract_context(stored)) as process:
+            pass
+
+        assert process.get_span_context().trace_id == ingest.get_span_context().trace_id
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [s["name"] for s in spans] == ["POST /api/v1/videos/ingest", "video.process"]
+        assert tracing.extract_context(None) is None
+        assert tracing.extract_context("not json") is None
+
+    def test_claim_next_emits_queue_claim_span(self, tmp_path, monkeypatch):
+        import json
+        from unittest.mock import MagicMock
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from src import tracing
+        from src.services.queue_service import QueueService
+
+        path = tmp_path / "traces.jsonl"
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(tracing.JsonLinesSpanExporter(str(path))))
+        monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+
+        queue = QueueService.__new__(QueueService)
+        queue.worker_id = "worker-test"
+        queue.engine = MagicMock()
+        conn = queue.engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.fetchone.return_value = (7, 42, "pending", 5, 0, 3, None, None, None, None)
+
+        task = queue.claim_next()
+
+        assert task.video_id == 42 and task.attempts == 1
+        (claim,) = [json.loads(line) for line in path.read_text().splitlines()]
+        assert claim["name"] == "queue.claim"
+        assert claim["attributes"] == {"queue.worker_id": "worker-test", "video.id": 42, "queue.attempt": 1}
+
+
+class TestRateLimiter:
+    """Testes do rate limiter compartilhado."""
+
+    class QuotaError(Exception):
+        code = 429
+
+    def test_call_retries_on_429_and_backs_off(self):
+        from src.services.rate_limiter import RateLimiter
+        limiter = RateLimiter({"embed": (6000, 2)}, max_retries=3)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise self.QuotaError("RESOURCE_EXHAUSTED {'retryDelay': '0.01s'}")
+            return "ok"
+
+        assert limiter.call("embed", "m", flaky) == "ok"
+        bucket = limiter.bucket("embed", "m")
+        assert len(calls) == 2
+        assert bucket.throttled == 1
+        assert bucket.rate < bucket.max_rate
+
+    def test_call_propagates_non_retryable_errors(self):
+        from src.services.rate_limiter import RateLimiter
+        limiter = RateLimiter({"embed": (6000, 2)})
+
+        def broken():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            limiter.call("embed", "m", broken)
+        assert limiter.bucket("embed", "m").throttled == 0
+
+    def test_interactive_preempts_background(self):
+        """Com o bucket ocupado, a chamada interativa passa na frente da background."""
+        import threading
+        import time
+        from src.services.rate_limiter import (
+            PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TokenBucket,
+        )
+        bucket = TokenBucket("t", requests_per_minute=6000, max_concurrency=1)
+        bucket.acquire()
+        order = []
+
+        def worker(priority, name):
+            bucket.acquire(priority)
+            order.append(name)
+            bucket.release()
+
+        background = threading.Thread(target=worker, args=(PRIORITY_BACKGROUND, "background"))
+        background.start()
+        time.sleep(0.05)
+        interactive = threading.Thread(target=worker, args=(PRIORITY_INTERACTIVE, "interactive"))
+        interactive.start()
+        time.sleep(0.05)
+        bucket.release()
+        background.join(5)
+        interactive.join(5)
+        assert order == ["interactive", "background"]
+
+
 class TestComponents:
     """Testes dos componentes UI."""
 
@@ -354,6 +1079,892 @@ class TestDatabaseServicePagination:
         except Exception as e:
             pytest.skip(f"Banco de dados nao acessivel: {e}")
 
+    def test_projection_selects_only_its_columns(self):
+        from sqlalchemy import select
+        from src.services.database_service import VideoSummaryRow, projection_columns
+        sql = str(select(*projection_columns(VideoSummaryRow)))
+        assert "videos.processing_status" in sql
+        assert "scenes" not in sql
+        assert "newsflare_metadata" not in sql
+
+    def test_rag_context_projection_feeds_composer(self):
+        """VideoRAGContext tem todos os campos lidos por compose_rag_context."""
+        from dataclasses import fields
+        from src.services.context_composer import ContextComposer
+        from src.services.database_service import VideoRAGContext
+        values = {f.name: None for f in fields(VideoRAGContext)}
+        values.update(id=1, filename="a.mp4", event_headline="Queda", key_moments=[{"t": 1}])
+        context = ContextComposer().compose_rag_context(VideoRAGContext(**values), score=0.9)
+        assert context["event_headline"] == "Queda"
+        assert context["key_moments"] == [{"t": 1}]
+
+    def test_list_endpoint_pages_by_cursor(self):
+        """GET /videos devolve next_cursor e o repassa como (created_at, id)."""
+        from datetime import datetime
+        from unittest.mock import MagicMock
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from api.dependencies import get_db, verify_api_key
+        from api.routers import videos
+        from src.services.database_service import VideoSummaryRow
+
+        created = datetime(2026, 1, 2, 3, 4, 5)
+        db = MagicMock()
+        db.list_videos_keyset.return_value = (
+            [VideoSummaryRow(7, "a.mp4", "analyzed", None, None, None, "local", created)],
+            True,
+        )
+        app = FastAPI()
+        app.include_router(videos.router)
+        app.dependency_overrides[get_db] = lambda: db
+        app.dependency_overrides[verify_api_key] = lambda: None
+        client = TestClient(app)
+
+        page = client.get("/videos", params={"status": "analyzed", "limit": 1}).json()
+        assert page["has_more"] is True
+        assert page["total"] is None
+        client.get("/videos", params={"cursor": page["next_cursor"]})
+        assert db.list_videos_keyset.call_args.kwargs["after"] == (created, 7)
+        assert client.get("/videos", params={"cursor": "nope"}).status_code == 400
+
+    def test_summary_projection_validates_as_schema(self):
+        from api.schemas.responses import VideoSummary
+        from src.services.database_service import VideoSummaryRow
+        row = VideoSummaryRow(1, "a.mp4", "analyzed", None, "tenso", None, "local", None)
+        assert VideoSummary.model_validate(row).filename == "a.mp4"
+
+
+class TestBenchmarks:
+    """Testes dos fakes usados em benchmarks/ (sem Google, Qdrant ou PostgreSQL)."""
+
+    def test_hashing_embedder_is_deterministic_and_semantic(self):
+        import numpy as np
+        from benchmarks.fakes import HashingEmbedder
+
+        embedder = HashingEmbedder(64)
+        query = embedder.embed("urso invade supermercado")
+        assert query == HashingEmbedder(64).embed("urso invade supermercado")
+        related = embedder.embed("Urso invade supermercado na cidade")
+        unrelated = embedder.embed("tornado destroi fazenda")
+        assert np.dot(query, related) > np.dot(query, unrelated)
+
+    def test_in_memory_queue_orders_by_priority(self):
+        from benchmarks.fakes import InMemoryQueue
+
+        queue = InMemoryQueue()
+        queue.enqueue(1)
+        queue.enqueue(2, priority=5)
+        assert queue.enqueue(1) is None
+        task = queue.claim_next()
+        assert task.video_id == 2
+        queue.complete(task.id)
+        stats = queue.get_stats()
+        assert (stats.pending, stats.completed, stats.total) == (1, 1, 2)
+
+    def test_pipeline_with_fake_client_and_local_qdrant(self, tmp_path):
+        """Fluxo completo do VideoProcessor em SQLite + Qdrant em memoria."""
+        from qdrant_client import QdrantClient
+        from benchmarks.fakes import FakeGenAIClient, HashingEmbedder, install_fake_client
+        from src.models import Base
+        from src.services.database_service import DatabaseService
+        from src.services.embedding_service import EmbeddingService
+        from src.services.gemini_service import GeminiService
+        from src.services.google_client import close_clients
+        from src.services.qdrant_service import QdrantService
+        from src.services.video_processor import VideoProcessor
+
+        embedder = HashingEmbedder(32)
+        install_fake_client("test-bench", FakeGenAIClient(embedder))
+        try:
+            db = DatabaseService(f"sqlite:///{tmp_path / 'bench.db'}")
+            Base.metadata.create_all(db.engine)
+            qdrant = QdrantService("", 0, "t", 32, client=QdrantClient(":memory:"))
+            processor = VideoProcessor(
+                db,
+                GeminiService(api_key="test-bench", model="m"),
+                EmbeddingService(api_key="test-bench", model="e", dimensions=32),
+                qdrant,
+            )
+            video = db.create_video("a.mp4", str(tmp_path / "a.mp4"))
+
+            result = processor.process_video_id(video.id)
+
+            assert result.success, result.error
+            assert db.get_video(video.id).unified_embedding_id == str(video.id)
+            hits = qdrant.search_unified(embedder.embed(db.get_video(video.id).event_headline))
+            assert hits[0]["id"] == video.id
+        finally:
+            close_clients()
+
+
+class TestReranker:
+    """Testes do rerank local entre a busca e a geracao RAG."""
+
+    def _candidates(self):
+        return [
+            {"id": 1, "score": 0.90, "payload": {"standalone_score": 1, "visual_quality_score": 1, "viral_potential": 1}},
+            {"id": 2, "score": 0.89, "payload": {"standalone_score": 9, "visual_quality_score": 9, "viral_potential": 9}},
+            {"id": 3, "score": 0.10, "payload": {"standalone_score": 10, "visual_quality_score": 10, "viral_potential": 10}},
+        ]
+
+    def test_feature_reranker_prefers_quality_among_relevant(self):
+        from src.services.reranker import FeatureReranker
+
+        ranked = FeatureReranker().rerank("q", self._candidates(), top_k=2)
+        assert [r["id"] for r in ranked] == [2, 1]
+        assert ranked[0]["score"] == 0.89
+        assert ranked[0]["rerank_score"] > ranked[1]["rerank_score"]
+
+    def test_rerank_without_reranker_keeps_search_order(self):
+        from src.services.reranker import rerank
+
+        assert [r["id"] for r in rerank(None, "q", self._candidates(), 2)] == [1, 2]
+
+    def test_cross_encoder_without_dependencies_falls_back(self, monkeypatch):
+        from src.services import reranker
+
+        monkeypatch.setattr(reranker.settings, "rerank_model_path", "/nao/existe.onnx")
+        assert isinstance(reranker.get_reranker("cross_encoder"), reranker.FeatureReranker)
+        assert reranker.get_reranker("none") is None
+        with pytest.raises(ValueError):
+            reranker.get_reranker("outro")
+
+    def test_rag_query_sends_only_top_reranked_clips_to_gemini(self):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import rag
+        from src.services.reranker import FeatureReranker
+
+        qdrant = MagicMock()
+        qdrant.search_unified.return_value = self._candidates()
+        db = MagicMock()
+        db.get_videos_by_ids_dict.side_effect = lambda ids, projection=None: {
+            i: MagicMock(id=i, filename=f"{i}.mp4", category=None, emotional_tone=None)
+            for i in ids
+        }
+        gemini = MagicMock(model="m")
+        gemini.generate_rag_response.return_value = "ok"
+        composer = MagicMock()
+        composer.compose_rag_context.side_effect = lambda video, score: {"video_id": video.id}
+
+        overrides = {
+            deps.get_embedding: MagicMock(),
+            deps.get_qdrant: qdrant,
+            deps.get_db: db,
+            deps.get_gemini: gemini,
+            deps.get_composer: composer,
+            deps.get_reranker: FeatureReranker(),
+            deps.verify_api_key: None,
+        }
+        client = _client(rag.router, overrides)
+
+        body = client.post("/rag/query", json={"query": "q", "limit": 1}).json()
+
+        assert qdrant.search_unified.call_args.kwargs["limit"] >= 3
+        assert [s["video_id"] for s in body["sources"]] == [2]
+        assert gemini.generate_rag_response.call_args.kwargs["clips_context"] == [{"video_id": 2}]
+
+
+class TestCompilationBuilder:
+    """Testes do montador de compilados (MMR com orcamento de duracao)."""
+
+    def test_select_respects_budget_and_skips_near_duplicates(self):
+        import numpy as np
+        from src.services.compilation_builder import select_with_budget
+
+        # Clips 0 e 1 sao quase identicos; 2 e diferente e um pouco menos relevante
+        vectors = np.array([[1.0, 0.0], [0.999, 0.045], [0.6, 0.8], [0.0, 1.0]])
+        relevance = np.array([0.95, 0.94, 0.80, 0.30])
+        durations = np.array([10_000, 10_000, 10_000, 40_000])
+
+        order = select_with_budget(vectors, relevance, durations, target_ms=20_000, lambda_=0.5)
+
+        assert order == [0, 2]
+        assert durations[order].sum() <= 20_000 * 1.05
+        # So relevancia: pega os dois quase identicos
+        assert select_with_budget(vectors, relevance, durations, 20_000, lambda_=1.0) == [0, 1]
+
+    def test_build_endpoint_returns_edit_list(self):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import compilations
+        from src.services.database_service import VideoClipTrim
+
+        qdrant = MagicMock()
+        qdrant.search_unified.return_value = [
+            {"id": 1, "score": 0.9, "payload": {}, "vector": [1.0, 0.0]},
+            {"id": 2, "score": 0.8, "payload": {}, "vector": [0.0, 1.0]},
+        ]
+        db = MagicMock()
+        db.get_videos_by_ids_dict.side_effect = lambda ids, projection=None: {
+            i: VideoClipTrim(
+                id=i, filename=f"{i}.mp4", file_path=None, duration_seconds=30.0,
+                trim_in_ms=2_000, trim_out_ms=12_000, money_shot_ms=5_000,
+                event_headline=None, narration_suggestion=None, emotional_tone=None,
+                camera_type=None, audio_usability=None,
+            )
+            for i in ids
+        }
+        embedding = MagicMock()
+        theme_index = MagicMock()
+        theme_index.centroid.return_value = [1.0, 0.2]
+
+        overrides = {
+            deps.get_embedding: embedding,
+            deps.get_qdrant: qdrant,
+            deps.get_db: db,
+            deps.get_theme_index: theme_index,
+            deps.verify_api_key: None,
+        }
+        client = _client(compilations.router, overrides)
+
+        body = client.post(
+            "/compilations/build",
+            json={"theme": "animais_estrada", "target_duration_seconds": 20},
+        ).json()
+
+        assert qdrant.search_unified.call_args.kwargs["filters"]["compilation_theme"] == "animais_estrada"
+        assert qdrant.search_unified.call_args.kwargs["with_vectors"] is True
+        # Sem texto livre o centroide do tema substitui o embedding da query
+        embedding.generate.assert_not_called()
+        assert [c["video_id"] for c in body["clips"]] == [1, 2]
+        assert body["clips"][0]["trim_in_ms"] == 2_000
+        assert body["total_duration_ms"] == 20_000
+
+        bad = client.post("/compilations/build", json={"theme": "NAO_EXISTE", "target_duration_seconds": 20})
+        assert bad.status_code == 400
+
+
+class TestDiversity:
+    """Testes da diversificacao (MMR / DPP) sobre os vetores dos candidatos."""
+
+    def _candidates(self):
+        # 1 e 2 sao quase o mesmo clip; 3 e outro angulo, pouco menos relevante
+        return [
+            {"id": 1, "score": 0.9, "payload": {}, "vector": [1.0, 0.0, 0.0]},
+            {"id": 2, "score": 0.9, "payload": {}, "vector": [0.99, 0.1, 0.0]},
+            {"id": 3, "score": 0.8, "payload": {}, "vector": [0.7, 0.0, 0.7]},
+            {"id": 4, "score": 0.1, "payload": {}, "vector": [0.0, 1.0, 0.0]},
+        ]
+
+    @pytest.mark.parametrize("method", ["mmr", "dpp"])
+    def test_diversify_skips_near_duplicates(self, method):
+        from src.services.diversity import diversify
+
+        results = diversify(self._candidates(), [1.0, 0.0, 0.3], top_k=2, method=method)
+
+        assert [r["id"] for r in results] == [1, 3]
+        assert all("vector" not in r for r in results)
+
+    def test_mmr_without_diversity_is_relevance_order(self):
+        import numpy as np
+        from src.services.diversity import mmr, similarity_matrix
+
+        vectors = np.array([c["vector"] for c in self._candidates()])
+        relevance = np.array([0.9, 0.85, 0.8, 0.1])
+        assert mmr(similarity_matrix(vectors), relevance, k=3, lambda_=1.0) == [0, 1, 2]
+
+    def test_search_with_diversify_fetches_vectors(self):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import search
+        from src.services.cache import TTLCache
+
+        qdrant = MagicMock()
+        qdrant.search_unified.return_value = self._candidates()
+        embedding = MagicMock()
+        embedding.generate.return_value = [1.0, 0.0, 0.3]
+
+        overrides = {
+            deps.get_embedding: embedding,
+            deps.get_qdrant: qdrant,
+            deps.get_db: MagicMock(),
+            deps.get_query_embedding_cache: TTLCache("query_embedding_test", ttl=60),
+            deps.verify_api_key: None,
+        }
+        client = _client(search.router, overrides)
+
+        body = client.post("/search", json={"query": "q", "limit": 2, "diversify": "mmr"}).json()
+
+        assert qdrant.search_unified.call_args.kwargs["with_vectors"] is True
+        assert qdrant.search_unified.call_args.kwargs["limit"] >= 4
+        assert [r["id"] for r in body["results"]] == [1, 3]
+
+
+class TestThemeIndex:
+    """Testes dos centroides de tema (rebuild e atualizacao incremental)."""
+
+    def _index(self):
+        from unittest.mock import MagicMock
+        from qdrant_client import QdrantClient
+        from src.services.qdrant_service import QdrantService
+        from src.services.theme_index import ThemeIndex
+
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        embedding = MagicMock()
+        embedding.generate.return_value = [0.0, 0.0, 0.0, 1.0]
+        return qdrant, ThemeIndex(qdrant, embedding)
+
+    def test_incremental_updates_match_rebuild(self):
+        import numpy as np
+
+        qdrant, index = self._index()
+        index.rebuild()
+        assert index.is_built()
+
+        # Clips novos, reanalise (troca de tema) e delecao, sem novo rebuild
+        clips = {
+            1: ([1.0, 0.0, 0.0, 0.0], ["animais_estrada"]),
+            2: ([0.9, 0.1, 0.0, 0.0], ["animais_estrada", "acidentes_transito"]),
+            3: ([0.0, 1.0, 0.0, 0.0], ["acidentes_transito"]),
+        }
+        for video_id, (vector, themes) in clips.items():
+            index.update_clip(video_id, vector, themes)
+            qdrant.index_unified(video_id, vector, {"compilation_themes": themes})
+        index.update_clip(2, [0.9, 0.1, 0.0, 0.0], ["acidentes_transito"])
+        qdrant.index_unified(2, [0.9, 0.1, 0.0, 0.0], {"compilation_themes": ["acidentes_transito"]})
+        index.remove_clip(3)
+        qdrant.delete(3)
+
+        incremental = {t.theme: t.clip_count for t in index.list_themes()}
+        road = np.array(index.centroid("animais_estrada"))
+        counts = index.rebuild()
+
+        assert incremental["animais_estrada"] == counts["animais_estrada"] == 1
+        assert incremental["acidentes_transito"] == counts["acidentes_transito"] == 1
+        assert np.allclose(road, index.centroid("animais_estrada"), atol=1e-5)
+        # Embedding so no rebuild (uma chamada por tema, duas vezes)
+        assert index.embedding.generate.call_count == 2 * len(counts)
+
+    def test_nearest_themes_suggests_tagged_theme(self):
+        qdrant, index = self._index()
+        qdrant.index_unified(1, [1.0, 0.0, 0.0, 0.0], {"compilation_themes": ["animais_estrada"]})
+        index.rebuild()
+
+        matches = index.nearest_themes([0.95, 0.05, 0.0, 0.1], limit=2)
+
+        assert matches[0].theme == "animais_estrada"
+        assert matches[0].clip_count == 1
+        assert matches[0].score > matches[1].score
+
+
+class TestThemeClassifier:
+    """Testes do classificador local de compilation_themes."""
+
+    def test_fit_predict_and_roundtrip(self, tmp_path):
+        import numpy as np
+        from src.services.theme_classifier import ThemeClassifier, theme_features
+
+        rng = np.random.default_rng(0)
+        centers = {"animais_estrada": rng.normal(size=8), "acidentes_transito": rng.normal(size=8)}
+        features, labels = [], []
+        for theme, center in centers.items():
+            for _ in range(40):
+                features.append(theme_features(center + 0.1 * rng.normal(size=8), center))
+                labels.append([theme])
+
+        model = ThemeClassifier.fit(np.array(features), labels)
+        probe = theme_features(centers["acidentes_transito"], centers["acidentes_transito"])
+        prediction = model.predict(probe)[0]
+
+        assert prediction.themes == ["acidentes_transito"]
+        assert prediction.confidence > 0.9
+        path = tmp_path / "themes.npz"
+        model.save(str(path))
+        loaded = ThemeClassifier.load(str(path))
+        assert loaded.themes == model.themes
+        assert np.allclose(loaded.predict_proba(probe), model.predict_proba(probe))
+
+    def test_missing_model_loads_as_none(self, tmp_path):
+        from src.services.theme_classifier import load_theme_classifier
+
+        assert load_theme_classifier(str(tmp_path / "nao_existe.npz")) is None
+
+
+class TestMetadataChanges:
+    """Testes da classificacao de mudancas de metadata e dos jobs de re-embedding."""
+
+    def test_change_impact(self):
+        from src.services.context_composer import change_impact
+
+        assert change_impact({"license_type", "newsflare_metadata"}).reembed is False
+        assert change_impact({"license_type", "newsflare_metadata"}).payload is False
+        assert change_impact({"is_exclusive"}).payload is True
+        assert change_impact({"is_exclusive"}).reembed is False
+        assert change_impact({"source_description"}).reembed is True
+        category = change_impact({"category"})
+        assert category.reembed and category.payload
+
+    def _client(self, video):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import videos
+        from src.services.context_composer import ContextComposer
+
+        db = MagicMock()
+        db.get_video.return_value = video
+        db.update_source_metadata.return_value = video
+        qdrant, queue = MagicMock(), MagicMock()
+        overrides = {
+            deps.get_db: db,
+            deps.get_composer: ContextComposer(),
+            deps.get_qdrant: qdrant,
+            deps.get_queue: queue,
+            deps.verify_api_key: None,
+        }
+        return _client(videos.router, overrides), qdrant, queue
+
+    def test_metadata_update_routes_changes(self):
+        from types import SimpleNamespace
+
+        video = SimpleNamespace(
+            id=1, filename="a.mp4", processing_status="analyzed", source="newsflare",
+            license_type="rf", is_exclusive=False, source_description="velho",
+            category=None, emotional_tone=None, intensity=None, viral_potential=None,
+            camera_type=None, audio_usability=None, compilation_themes=["x"],
+            standalone_score=None, visual_quality_score=None, location_country=None,
+            location_environment=None, event_headline=None,
+        )
+        client, qdrant, queue = self._client(video)
+
+        body = client.post("/videos/1/metadata", json={"license_type": "rm"}).json()
+        assert (body["payload_updated"], body["reembed_queued"]) == (False, False)
+
+        body = client.post("/videos/1/metadata", json={"is_exclusive": True}).json()
+        assert (body["payload_updated"], body["reembed_queued"]) == (True, False)
+        payload = qdrant.update_unified_payload.call_args.args[1]
+        assert payload["compilation_themes"] == ["x"]
+        queue.enqueue_reembed.assert_not_called()
+
+        body = client.post("/videos/1/metadata", json={"description": "novo"}).json()
+        assert body["reembed_queued"] is True
+        queue.enqueue_reembed.assert_called_once_with(1)
+
+    def test_bulk_metadata_sync(self, tmp_path):
+        """Sync em lote em SQLite + Qdrant em memoria: so o que mudou e propagado."""
+        from qdrant_client import QdrantClient
+        from api import dependencies as deps
+        from api.routers import videos
+        from benchmarks.fakes import InMemoryQueue
+        from src.models import Base
+        from src.services.database_service import DatabaseService
+        from src.services.qdrant_service import QdrantService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'bulk.db'}")
+        Base.metadata.create_all(db.engine)
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        queue = InMemoryQueue()
+        analyzed = db.create_video("a.mp4", "a.mp4")
+        pending = db.create_video("b.mp4", "b.mp4")
+        db.update_source_metadata(pending.id, {"newsflare_id": "NF-2"})
+        db._update_videos([analyzed.id], processing_status="analyzed", unified_embedding_id=str(analyzed.id))
+        qdrant.index_unified(analyzed.id, [1.0, 0.0, 0.0, 0.0], {"is_exclusive": False})
+
+        overrides = {deps.get_db: db, deps.get_qdrant: qdrant, deps.get_queue: queue, deps.verify_api_key: None}
+        client = _client(videos.router, overrides)
+        items = [
+            {"video_id": analyzed.id, "is_exclusive": True, "description": "novo"},
+            {"newsflare_id": "NF-2", "license_type": "rm"},
+            {"newsflare_id": "NF-404"},
+        ]
+
+        body = client.post("/videos/metadata/bulk", json={"items": items}).json()
+
+        assert (body["received"], body["updated"], body["not_found"]) == (3, 2, ["NF-404"])
+        assert (body["payload_updated"], body["reembed_queued"]) == (1, 1)
+        point = qdrant.client.retrieve(qdrant.unified_collection, [analyzed.id])[0]
+        assert point.payload == {"is_exclusive": True, "source": "newsflare"}
+        assert db.get_video(pending.id).license_type == "rm"
+        assert queue.claim_next().video_id == analyzed.id
+
+        again = client.post("/videos/metadata/bulk", json={"items": items}).json()
+        assert (again["updated"], again["unchanged"], again["reembed_queued"]) == (0, 2, 0)
+
+    def test_bulk_metadata_reports_newsflare_id_conflicts(self, tmp_path):
+        """newsflare_id de outro video vira conflito do item; datas com fuso nao regravam."""
+        from qdrant_client import QdrantClient
+        from api import dependencies as deps
+        from api.routers import videos
+        from benchmarks.fakes import InMemoryQueue
+        from src.models import Base
+        from src.services.database_service import DatabaseService
+        from src.services.qdrant_service import QdrantService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'bulk.db'}")
+        Base.metadata.create_all(db.engine)
+        first = db.create_video("a.mp4", "a.mp4")
+        second = db.create_video("b.mp4", "b.mp4")
+        db.update_source_metadata(first.id, {"newsflare_id": "NF-1"})
+
+        overrides = {
+            deps.get_db: db,
+            deps.get_qdrant: QdrantService("", 0, "t", 4, client=QdrantClient(":memory:")),
+            deps.get_queue: InMemoryQueue(),
+            deps.verify_api_key: None,
+        }
+        client = _client(videos.router, overrides)
+        items = [
+            {"video_id": second.id, "newsflare_id": "NF-1", "uploader": "bia"},
+            {"newsflare_id": "NF-1", "filming_date": "2024-05-01T10:00:00-03:00"},
+        ]
+
+        body = client.post("/videos/metadata/bulk", json={"items": items}).json()
+
+        assert body["conflicts"] == [{"video_id": second.id, "newsflare_id": "NF-1", "owner_video_id": first.id}]
+        assert body["updated"] == 1
+        assert db.get_video(second.id).uploader is None
+        assert db.get_video(first.id).event_date.isoformat() == "2024-05-01T13:00:00"
+
+        again = client.post("/videos/metadata/bulk", json={"items": items[1:]}).json()
+        assert (again["updated"], again["unchanged"]) == (0, 1)
+
+    def test_reembed_jobs_coalesce_per_video(self):
+        from benchmarks.fakes import InMemoryQueue
+
+        queue = InMemoryQueue()
+        assert queue.enqueue_reembed(1) is True
+        assert queue.enqueue_reembed(1) is False  # ainda pendente
+        task = queue.claim_next()
+        assert task.options == {"reembed": True}
+        assert queue.enqueue_reembed(1) is False  # em processamento: requeue
+        queue.complete(task.id)
+        assert queue.claim_next().options == {"reembed": True}
+        assert queue.claim_next() is None
+
+    def test_reembed_job_only_regenerates_unified_embedding(self):
+        from unittest.mock import MagicMock
+        from src.services.queue_service import QueueTask
+        from src.services.video_processor import VideoProcessor
+
+        db = MagicMock()
+        db.get_video.return_value = MagicMock(id=1, processing_status="analyzed")
+        gemini, embedding, qdrant = MagicMock(), MagicMock(), MagicMock()
+        embedding.generate_unified.return_value = [0.1]
+        qdrant.index_unified.return_value = "1"
+        processor = VideoProcessor(db, gemini, embedding, qdrant)
+        processor.composer = MagicMock()
+        processor.composer.compose_embedding_text.return_value = "texto"
+
+        task = QueueTask(1, 1, "processing", -10, 1, 3, None, None, options={"reembed": True})
+        result = processor.process(task)
+
+        assert result.success is True
+        db.set_analyzing.assert_not_called()
+        gemini.upload_video.assert_not_called()
+        embedding.generate_unified.assert_called_once_with("texto")
+        db.update_unified_embedding.assert_called_once_with(1, "1")
+
+
+class TestPayloadSync:
+    """Testes do sync incremental Postgres -> payload do Qdrant."""
+
+    def test_payload_diff(self):
+        from src.services.payload_sync import payload_diff
+
+        expected = {"category": "news", "is_exclusive": True, "compilation_themes": []}
+        assert payload_diff(expected, {"category": "news", "is_exclusive": False, "compilation_themes": []}) == {
+            "is_exclusive": True
+        }
+        assert payload_diff({"camera_type": None}, {}) == {}
+
+    def test_sync_pushes_only_drifted_fields(self, tmp_path):
+        from qdrant_client import QdrantClient
+        from src.models import Base
+        from src.services.context_composer import ContextComposer
+        from src.services.database_service import DatabaseService
+        from src.services.payload_sync import WATERMARK_NAME, PayloadSync
+        from src.services.qdrant_service import QdrantService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'sync.db'}")
+        Base.metadata.create_all(db.engine)
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        composer = ContextComposer()
+        ids = [db.create_video(f"{i}.mp4", f"{i}.mp4").id for i in range(3)]
+        db._update_videos(ids, category="news", unified_embedding_id="x")
+        for video_id in ids[:2]:
+            qdrant.index_unified(video_id, [1.0, 0.0, 0.0, 0.0], composer.compose_unified_payload(db.get_video(video_id)))
+
+        db._update_videos([ids[0]], category="sports")
+        result = PayloadSync(db, qdrant, composer).run()
+
+        assert (result.scanned, result.changed, result.updated) == (3, 1, 1)
+        assert result.missing_ids == [ids[2]]
+        point = qdrant.client.retrieve(qdrant.unified_collection, [ids[0]])[0]
+        assert point.payload["category"] == "sports"
+        assert db.get_watermark(WATERMARK_NAME) == result.watermark
+
+        again = PayloadSync(db, qdrant, composer).run()
+        assert again.changed == 0
+
+
+class TestFilterPlanner:
+    """Testes do planner de filtros SQL (has_id x pos-filtro)."""
+
+    def _planner(self, ids, post_ids=None, matched=0, total=0, max_ids=10):
+        from unittest.mock import MagicMock
+        from src.services.filter_planner import FilterPlanner
+
+        db, qdrant = MagicMock(), MagicMock()
+        db.filter_video_ids.side_effect = [ids] + ([post_ids] if post_ids is not None else [])
+        db.count_filtered_videos.return_value = matched
+        db.count_with_unified_embedding.return_value = total
+        qdrant.search_unified.return_value = [{"id": i, "score": 1.0 / i, "payload": {}} for i in range(1, 21)]
+        return FilterPlanner(db, qdrant, max_ids=max_ids, max_candidates=50), db, qdrant
+
+    def test_split_filters(self):
+        from src.services.filter_planner import split_filters
+
+        payload, sql = split_filters({"category": "news", "uploader": "ana", "visual_tags": [], "camera_type": None})
+        assert (payload, sql) == ({"category": "news"}, {"uploader": "ana"})
+
+    def test_payload_only_filters_skip_database(self):
+        planner, db, qdrant = self._planner([])
+        planner.search_unified([0.1], limit=5, filters={"category": "news"})
+        db.filter_video_ids.assert_not_called()
+        assert qdrant.search_unified.call_args.kwargs["filters"] == {"category": "news"}
+
+    def test_selective_sql_filter_becomes_has_id(self):
+        planner, _, qdrant = self._planner([3, 7])
+        planner.search_unified([0.1], limit=5, filters={"uploader": "ana", "category": "news"})
+        assert qdrant.search_unified.call_args.kwargs["filters"] == {"category": "news", "video_ids": [3, 7]}
+
+    def test_no_match_skips_vector_search(self):
+        planner, _, qdrant = self._planner([])
+        assert planner.search_unified([0.1], limit=5, filters={"uploader": "ninguem"}) == []
+        qdrant.search_unified.assert_not_called()
+
+    def test_broad_sql_filter_is_post_filtered(self):
+        # 11 IDs > max_ids=10; metade dos videos indexados passa no filtro
+        planner, db, qdrant = self._planner(list(range(11)), post_ids=[2, 4, 6], matched=50, total=100)
+        hits = planner.search_unified([0.1], limit=2, filters={"visual_tags": ["carro"]})
+        assert qdrant.search_unified.call_args.kwargs["limit"] == 8
+        assert "video_ids" not in (qdrant.search_unified.call_args.kwargs["filters"] or {})
+        assert [h["id"] for h in hits] == [2, 4]
+
+    def test_has_id_search_against_sqlite_and_local_qdrant(self, tmp_path):
+        from qdrant_client import QdrantClient
+        from src.models import Base
+        from src.services.database_service import DatabaseService
+        from src.services.filter_planner import FilterPlanner
+        from src.services.qdrant_service import QdrantService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'filters.db'}")
+        Base.metadata.create_all(db.engine)
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        for i, uploader in enumerate(["ana", "bia", "ana"]):
+            video = db.create_video(f"{i}.mp4", f"{i}.mp4")
+            db.update_source_metadata(video.id, {"uploader": uploader, "unified_embedding_id": str(video.id)})
+            qdrant.index_unified(video.id, [1.0, float(i), 0.0, 0.0], {"category": "news"})
+
+        hits = FilterPlanner(db, qdrant).search_unified([1.0, 0.0, 0.0, 0.0], limit=5, filters={"uploader": "ana"})
+
+        assert sorted(h["id"] for h in hits) == [1, 3]
+
+
+class TestFacets:
+    """Testes das contagens por valor (/search/facets)."""
+
+    def _setup(self, tmp_path):
+        from qdrant_client import QdrantClient
+        from src.models import Base
+        from src.services.context_composer import ContextComposer
+        from src.services.database_service import DatabaseService
+        from src.services.qdrant_service import QdrantService
+
+        db = DatabaseService(f"sqlite:///{tmp_path / 'facets.db'}")
+        Base.metadata.create_all(db.engine)
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        rows = [("news", ["a", "b"], "ana"), ("news", ["a"], "bia"), ("sports", [], "ana")]
+        for i, (category, themes, uploader) in enumerate(rows):
+            video = db.create_video(f"{i}.mp4", f"{i}.mp4")
+            db.update_source_metadata(video.id, {"uploader": uploader, "unified_embedding_id": str(video.id)})
+            db._update_videos([video.id], category=category, compilation_themes=themes)
+            payload = ContextComposer().compose_unified_payload(db.get_video(video.id))
+            qdrant.index_unified(video.id, [1.0, float(i), 0.0, 0.0], payload)
+        return db, qdrant
+
+    def test_count_payload_values(self):
+        from src.services.facets import count_payload_values, top_values
+
+        hits = [{"payload": {"category": "news", "compilation_themes": ["a", "b"]}}, {"payload": {"category": None}}]
+        counts = count_payload_values(hits, ["category", "compilation_themes"])
+        assert counts == {"category": {"news": 1}, "compilation_themes": {"a": 1, "b": 1}}
+        assert [v.value for v in top_values({"b": 2, "a": 2, "c": 5}, 2)] == ["c", "a"]
+
+    def test_qdrant_and_postgres_backends_agree(self, tmp_path):
+        from src.services.facets import BACKEND_POSTGRES, BACKEND_QDRANT, FacetService
+
+        db, qdrant = self._setup(tmp_path)
+        service = FacetService(db, qdrant)
+
+        from_qdrant = service.compute(fields=("category", "compilation_themes"))
+        from_postgres = service.compute(fields=("category", "compilation_themes"), filters={"uploader": "ana"})
+
+        assert (from_qdrant.backend, from_qdrant.total) == (BACKEND_QDRANT, 3)
+        assert [(v.value, v.count) for v in from_qdrant.facets["compilation_themes"]] == [("a", 2), ("b", 1)]
+        assert (from_postgres.backend, from_postgres.total) == (BACKEND_POSTGRES, 2)
+        assert {v.value: v.count for v in from_postgres.facets["category"]} == {"news": 1, "sports": 1}
+
+    def test_facets_route_caches_per_signature(self, tmp_path):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import search
+        from src.services.cache import TTLCache
+
+        db, qdrant = self._setup(tmp_path)
+        embedding = MagicMock()
+        embedding.generate.return_value = [1.0, 0.0, 0.0, 0.0]
+        overrides = {
+            deps.get_db: db,
+            deps.get_qdrant: qdrant,
+            deps.get_embedding: embedding,
+            deps.get_facets_cache: TTLCache("facets_test", ttl=60),
+            deps.get_query_embedding_cache: TTLCache("query_embedding_test", ttl=60),
+            deps.verify_api_key: None,
+        }
+        client = _client(search.router, overrides)
+
+        body = {"query": "q", "fields": ["category"], "top_k": 2}
+        first = client.post("/search/facets", json=body).json()
+        second = client.post("/search/facets", json=body).json()
+        # A busca da UI com a mesma query reaproveita o embedding das facetas
+        assert client.post("/search", json={"query": "q", "limit": 2}).status_code == 200
+
+        assert first == second
+        assert (first["backend"], first["total"]) == ("query", 2)
+        embedding.generate.assert_called_once()
+        assert client.post("/search/facets", json={"fields": ["filename"]}).status_code == 400
+
+
+class TestGroupedSearch:
+    """Testes da busca agrupada (group_by em /search e /rag/query)."""
+
+    def _qdrant(self):
+        from types import SimpleNamespace
+        from qdrant_client import QdrantClient
+        from src.services.context_composer import ContextComposer, PAYLOAD_FIELDS
+        from src.services.qdrant_service import QdrantService
+
+        qdrant = QdrantService("", 0, "t", 4, client=QdrantClient(":memory:"))
+        # Tres clips da ana (mais proximos da query), um da bia e um sem uploader
+        for i, uploader in enumerate(["Ana", "ana", "bia", "Ána", None], 1):
+            video = SimpleNamespace(**dict.fromkeys(PAYLOAD_FIELDS.values()), newsflare_id=None)
+            video.id, video.uploader, video.event_headline = i, uploader, None
+            payload = ContextComposer().compose_unified_payload(video)
+            qdrant.index_unified(i, [1.0, 0.1 * i, 0.0, 0.0], payload)
+        return qdrant
+
+    def test_group_key(self):
+        from src.services.context_composer import group_key, payload_changes
+
+        assert group_key("group_uploader", " Ána ", 1) == "ana"
+        assert group_key("group_newsflare_event", "NF12345-2", 1) == "NF12345"
+        assert group_key("group_event", "Flood in São Paulo!", 1) == group_key(
+            "group_event", "SAO PAULO flood", 2
+        )
+        assert group_key("group_event", "Flood hits Sao Paulo streets after rain", 1) == (
+            group_key("group_event", "Flood hits São Paulo on 12 March 2024", 2)
+        ) == "flood hits paulo sao"
+        assert group_key("group_uploader", None, 7) == "video:7"
+        assert payload_changes({"uploader": "Bia", "license_type": "x"}, 3) == {"group_uploader": "bia"}
+
+    def test_search_groups_in_one_call(self):
+        from src.services.context_composer import GROUP_BY_FIELDS
+
+        groups = self._qdrant().search_unified_groups(
+            [1.0, 0.0, 0.0, 0.0], group_by=GROUP_BY_FIELDS["uploader"], limit=3, group_size=2
+        )
+
+        assert [g["key"] for g in groups] == ["ana", "bia", "video:5"]
+        assert [h["id"] for h in groups[0]["hits"]] == [1, 2]
+
+    def test_post_filter_drops_hits_per_group(self):
+        from unittest.mock import MagicMock
+        from src.services.filter_planner import FilterPlanner
+
+        db, qdrant = MagicMock(), MagicMock()
+        db.filter_video_ids.side_effect = [list(range(11)), [2, 3]]
+        db.count_filtered_videos.return_value = 50
+        db.count_with_unified_embedding.return_value = 100
+        qdrant.search_unified_groups.return_value = [
+            {"key": "ana", "hits": [{"id": 1}, {"id": 2}]},
+            {"key": "bia", "hits": [{"id": 4}]},
+            {"key": "caio", "hits": [{"id": 3}]},
+        ]
+        planner = FilterPlanner(db, qdrant, max_ids=10, max_candidates=50)
+
+        groups = planner.search_unified_groups([0.1], "group_uploader", limit=2, filters={"visual_tags": ["carro"]})
+
+        assert qdrant.search_unified_groups.call_args.kwargs["limit"] == 4
+        assert groups == [{"key": "ana", "hits": [{"id": 2}]}, {"key": "caio", "hits": [{"id": 3}]}]
+
+    def test_search_route_returns_groups(self):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import search
+        from src.services.cache import TTLCache
+
+        embedding = MagicMock()
+        embedding.generate.return_value = [1.0, 0.0, 0.0, 0.0]
+        overrides = {
+            deps.get_db: MagicMock(),
+            deps.get_qdrant: self._qdrant(),
+            deps.get_embedding: embedding,
+            deps.get_query_embedding_cache: TTLCache("query_embedding_test", ttl=60),
+            deps.verify_api_key: None,
+        }
+        client = _client(search.router, overrides)
+
+        body = {"query": "q", "limit": 2, "group_by": "uploader"}
+        response = client.post("/search", json=body).json()
+
+        assert [g["key"] for g in response["groups"]] == ["ana", "bia"]
+        assert [r["id"] for r in response["results"]] == [1, 3]
+        assert client.post("/search", json=body | {"diversify": "mmr"}).status_code == 400
+
+    def test_rag_query_keeps_best_reranked_clip_per_group(self):
+        from unittest.mock import MagicMock
+        from api import dependencies as deps
+        from api.routers import rag
+
+        planner = MagicMock()
+        planner.search_unified_groups.return_value = [
+            {"key": "ana", "hits": [{"id": 1, "score": 0.9}, {"id": 2, "score": 0.8}]},
+            {"key": "bia", "hits": [{"id": 3, "score": 0.5}]},
+        ]
+        db = MagicMock()
+        db.get_videos_by_ids_dict.side_effect = lambda ids, projection=None: {
+            i: MagicMock(id=i, filename=f"{i}.mp4", category=None, emotional_tone=None)
+            for i in ids
+        }
+        # Reranker inverte os clips da ana: 2 > 1 > 3
+        order = {2: 3.0, 1: 2.0, 3: 1.0}
+        reranker = MagicMock()
+        reranker.rerank.side_effect = lambda query, candidates, top_k, videos: sorted(
+            ({**c, "rerank_score": order[c["id"]]} for c in candidates),
+            key=lambda c: -c["rerank_score"],
+        )[:top_k]
+        gemini = MagicMock(model="m")
+        gemini.generate_rag_response.return_value = "ok"
+        composer = MagicMock()
+        composer.compose_rag_context.side_effect = lambda video, score: {"video_id": video.id}
+
+        overrides = {
+            deps.get_embedding: MagicMock(),
+            deps.get_filter_planner: planner,
+            deps.get_db: db,
+            deps.get_gemini: gemini,
+            deps.get_composer: composer,
+            deps.get_reranker: reranker,
+            deps.verify_api_key: None,
+        }
+        client = _client(rag.router, overrides)
+
+        body = {"query": "q", "limit": 2, "group_by": "uploader", "group_size": 2}
+        sources = client.post("/rag/query", json=body).json()["sources"]
+
+        assert [(s["video_id"], s["group"]) for s in sources] == [(2, "ana"), (3, "bia")]
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])